@@ -0,0 +1,36 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+
+# Cambios pendientes del borrado en curso: {funcion de aplicacion: [cambios]}
+_pending = ContextVar('batching_pending', default=None)
+
+
+@contextmanager
+def batched_changes():
+    """
+    Junta los cambios que las senales post_delete registran durante un
+    borrado por queryset (una senal por fila) y los aplica al salir, una
+    vez por funcion. Debe usarse dentro de la transaccion del borrado.
+    """
+    if _pending.get() is not None:
+        # Anidado: el bloque externo aplica los cambios
+        yield
+        return
+    pending = {}
+    token = _pending.set(pending)
+    try:
+        yield
+    finally:
+        _pending.reset(token)
+    for apply, changes in pending.items():
+        apply(changes)
+
+
+def record_change(apply, change):
+    """Registra el cambio en el lote en curso o, sin lote, lo aplica de inmediato"""
+    pending = _pending.get()
+    if pending is None:
+        apply([change])
+    else:
+        pending.setdefault(apply, []).append(change)
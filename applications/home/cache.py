@@ -0,0 +1,36 @@
+import time
+
+from django.core.cache import cache
+
+
+# Grupos de fragmentos cacheados; cada uno se invalida subiendo su version
+CATALOG = 'catalog'
+GROUPS = 'groups'
+
+
+def _version_key(name):
+    return f'cache_version:{name}'
+
+
+def get_version(name):
+    """Version actual de un grupo de fragmentos cacheados"""
+    # Se parte de un timestamp para no reutilizar versiones viejas si la clave fue desalojada
+    return cache.get_or_set(_version_key(name), time.time_ns, None)
+
+
+def bump_version(name):
+    """Invalida todos los fragmentos del grupo pasando a una version nueva"""
+    try:
+        cache.incr(_version_key(name))
+    except ValueError:
+        cache.set(_version_key(name), time.time_ns(), None)
+
+
+def cached_choices(name, queryset, empty_label):
+    """Opciones de un select del catalogo cacheadas por version"""
+    key = f'choices:{name}:{get_version(CATALOG)}'
+    choices = cache.get(key)
+    if choices is None:
+        choices = [(obj.pk, str(obj)) for obj in queryset]
+        cache.set(key, choices, None)
+    return [('', empty_label)] + choices
@@ -0,0 +1,47 @@
+import statistics
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+
+
+class Command(BaseCommand):
+    help = 'Mide throughput y latencia de un endpoint HTTP con peticiones concurrentes (WSGI vs ASGI)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('url', help='URL a medir, p.ej. http://127.0.0.1:8000/sales/sales/get_customers/')
+        parser.add_argument('--requests', type=int, default=500, help='Total de peticiones')
+        parser.add_argument('--concurrency', type=int, default=20, help='Peticiones simultaneas')
+        parser.add_argument('--session', help='Valor de la cookie sessionid para endpoints con login')
+
+    def handle(self, *args, **options):
+        headers = {'X-Requested-With': 'XMLHttpRequest'}
+        if options['session']:
+            headers['Cookie'] = f"sessionid={options['session']}"
+
+        def fetch(_):
+            request = urllib.request.Request(options['url'], headers=headers)
+            start = time.perf_counter()
+            try:
+                with urllib.request.urlopen(request, timeout=30) as response:
+                    response.read()
+                    ok = response.status == 200
+            except Exception:
+                ok = False
+            return ok, time.perf_counter() - start
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=options['concurrency']) as pool:
+            results = list(pool.map(fetch, range(options['requests'])))
+        elapsed = time.perf_counter() - start
+
+        latencies = sorted(latency for _, latency in results)
+        errors = sum(1 for ok, _ in results if not ok)
+        p95 = latencies[int(len(latencies) * 0.95) - 1] if latencies else 0
+
+        self.stdout.write(f"Peticiones: {len(results)}  Errores: {errors}  Concurrencia: {options['concurrency']}")
+        self.stdout.write(f"Throughput: {len(results) / elapsed:.1f} req/s")
+        self.stdout.write(
+            f"Latencia p50: {statistics.median(latencies) * 1000:.1f} ms  p95: {p95 * 1000:.1f} ms"
+        )
@@ -0,0 +1,81 @@
+import random
+import statistics
+import time
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from applications.home.money import document_lines, line_totals, money
+from applications.sales.models import SaleDetail
+
+
+class Command(BaseCommand):
+    help = 'Compara el calculo de lineas con float (calculo anterior) y con Decimal en documentos grandes'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lines', type=int, default=10000, help='Lineas por documento')
+        parser.add_argument('--iterations', type=int, default=10, help='Documentos por modo')
+        parser.add_argument('--seed', type=int, default=1)
+
+    def _lines(self, count, seed):
+        # Valores como llegan de la base de datos: enteros y Decimal con 2 decimales
+        rnd = random.Random(seed)
+        cents = lambda low, high: Decimal(rnd.randint(low, high)).scaleb(-2)
+        return [(rnd.randint(1, 20), cents(1, 99999), cents(0, 500), cents(0, 300)) for _ in range(count)]
+
+    def _float_path(self, lines, prep_subtotal, prep_total):
+        # Calculo anterior de SaleDetail.save(): float y re-cuantizado al guardar
+        rows, total = [], 0.0
+        for quantity, unit_price, tax, discount in lines:
+            subtotal = float(quantity) * float(unit_price)
+            total_price = float(subtotal) + float(tax) - float(discount)
+            rows.append((prep_subtotal(subtotal), prep_total(total_price)))
+            total += total_price
+        return rows, prep_total(total)
+
+    def _decimal_lines(self, lines, prep_subtotal, prep_total):
+        rows = []
+        for quantity, unit_price, tax, discount in lines:
+            subtotal, total_price = line_totals(quantity, unit_price, tax, discount)
+            rows.append((prep_subtotal(subtotal), prep_total(total_price)))
+        return rows, sum(total for _, total in rows)
+
+    def _decimal_document(self, lines, prep_subtotal, prep_total):
+        totals, sums = document_lines(lines)
+        return [(prep_subtotal(subtotal), prep_total(total)) for subtotal, total in totals], sums['total']
+
+    def _measure(self, func, iterations, *args):
+        timings = []
+        for _ in range(iterations):
+            start = time.perf_counter()
+            result = func(*args)
+            timings.append(time.perf_counter() - start)
+        return timings, result
+
+    def handle(self, *args, **options):
+        lines = self._lines(options['lines'], options['seed'])
+        # Preparacion que hace Django al escribir cada DecimalField
+        fields = SaleDetail._meta
+        prep_subtotal = lambda value: fields.get_field('subtotal').get_db_prep_save(value, connection)
+        prep_total = lambda value: fields.get_field('total_price').get_db_prep_save(value, connection)
+
+        modes = [
+            ('float (anterior)', self._float_path),
+            ('Decimal por linea (line_totals)', self._decimal_lines),
+            ('Decimal por documento (document_lines)', self._decimal_document),
+        ]
+        results = {}
+        for label, func in modes:
+            timings, result = self._measure(func, options['iterations'], lines, prep_subtotal, prep_total)
+            results[label] = result
+            self.stdout.write(
+                f"{label}: media {statistics.mean(timings) * 1000:.1f} ms  p50 {statistics.median(timings) * 1000:.1f} ms"
+            )
+
+        float_rows, float_total = results['float (anterior)']
+        exact_rows, exact_total = results['Decimal por documento (document_lines)']
+        drift = sum(1 for a, b in zip(float_rows, exact_rows) if money(a[1]) != b[1])
+        self.stdout.write(f"Lineas por documento: {options['lines']}  Documentos por modo: {options['iterations']}")
+        self.stdout.write(f'Lineas con diferencia float vs Decimal: {drift}')
+        self.stdout.write(f'Total del documento: float {float_total}  Decimal {exact_total}')
@@ -0,0 +1,60 @@
+import statistics
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.test import RequestFactory, override_settings
+from django.utils import timezone
+
+from applications.home.pdf import PDF_BACKENDS, get_pdf_backend
+from applications.sales.models import Sale
+from applications.sales.reports import print_sale_invoice, sales_report_to_pdf
+
+
+class Command(BaseCommand):
+    help = 'Compara los motores de PDF generando la factura de la ultima venta y el reporte del mes'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--backends', nargs='+', default=list(PDF_BACKENDS), help='Motores a comparar')
+        parser.add_argument('--iterations', type=int, default=20, help='Documentos por motor')
+
+    def _documents(self, user):
+        sale = Sale.objects.order_by('-id').first()
+        if sale is None:
+            raise CommandError('Se necesita al menos una venta para la medicion')
+
+        today = timezone.localdate()
+        factory = RequestFactory()
+        invoice = factory.get('/')
+        report = factory.get('/', {'start_date': today.replace(day=1).isoformat(), 'end_date': today.isoformat()})
+        invoice.user = report.user = user
+        return [
+            (f'Factura {sale.invoice_number}', lambda: print_sale_invoice(invoice, sale.id)),
+            ('Reporte mensual de ventas', lambda: sales_report_to_pdf(report)),
+        ]
+
+    def handle(self, *args, **options):
+        user = User.objects.filter(is_superuser=True).first()
+        documents = self._documents(user)
+
+        for name in options['backends']:
+            backend = get_pdf_backend(name)
+            start = time.perf_counter()
+            try:
+                backend.warm_up()
+            except ImportError as exc:
+                self.stdout.write(f'{name}: no disponible ({exc})')
+                continue
+            self.stdout.write(f'{name}: arranque {(time.perf_counter() - start) * 1000:.1f} ms')
+
+            with override_settings(PDF_BACKEND=name):
+                for label, render in documents:
+                    timings = []
+                    for _ in range(options['iterations']):
+                        start = time.perf_counter()
+                        response = render()
+                        timings.append(time.perf_counter() - start)
+                    self.stdout.write(
+                        f"  {label}: media {statistics.mean(timings) * 1000:.1f} ms  "
+                        f"p50 {statistics.median(timings) * 1000:.1f} ms  {len(response.content) / 1024:.1f} KB"
+                    )
@@ -0,0 +1,45 @@
+import statistics
+from collections import defaultdict
+
+from django.core.management.base import BaseCommand
+
+from applications.home.startup import measure_boot
+
+
+class Command(BaseCommand):
+    help = 'Mide el arranque de un worker (python -X importtime): tiempo, memoria y modulos mas lentos de importar'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--module', default='pos.wsgi', help='Modulo de entrada del worker (pos.wsgi o pos.asgi)')
+        parser.add_argument('--runs', type=int, default=3, help='Arranques por modo')
+        parser.add_argument('--top', type=int, default=10, help='Paquetes a listar por tiempo de importacion')
+
+    def handle(self, *args, **options):
+        modes = [
+            ('PDF bajo demanda', {'PDF_WARMUP': 'False'}),
+            ('PDF precargado (PDF_WARMUP)', {'PDF_WARMUP': 'True'}),
+        ]
+        for label, env in modes:
+            boots = [measure_boot(options['module'], env) for _ in range(options['runs'])]
+            seconds = statistics.median(boot['seconds'] for boot in boots)
+            rss = statistics.median(boot['rss_kb'] for boot in boots)
+            self.stdout.write(f'{label}: arranque {seconds * 1000:.0f} ms  memoria {rss / 1024:.1f} MB')
+            heavy = sorted({name.split('.')[0] for name in boots[-1]['heavy']})
+            self.stdout.write(f"  Modulos pesados cargados: {', '.join(heavy) or 'ninguno'}")
+
+            # Tiempo acumulado por paquete de primer nivel, mediana de los arranques
+            packages = defaultdict(list)
+            for boot in boots:
+                totals = defaultdict(int)
+                for module, _, cumulative, level in boot['imports']:
+                    if level == 0:
+                        totals[module.split('.')[0]] += cumulative
+                for package, total in totals.items():
+                    packages[package].append(total)
+            ranking = sorted(
+                ((statistics.median(times), package) for package, times in packages.items()), reverse=True,
+            )
+            for micros, package in ranking[:options['top']]:
+                self.stdout.write(f'  {micros / 1000:8.1f} ms  {package}')
+
+        self.stdout.write(f"Modulo: {options['module']}  Arranques por modo: {options['runs']}")
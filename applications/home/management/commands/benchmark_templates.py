@@ -0,0 +1,79 @@
+import statistics
+import time
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.template.backends.django import DjangoTemplates
+from django.test import RequestFactory
+
+from applications.inv.models import Product
+from applications.sales.forms import SaleForm
+
+
+BASE_LOADERS = [
+    'django.template.loaders.filesystem.Loader',
+    'django.template.loaders.app_directories.Loader',
+]
+
+
+class Command(BaseCommand):
+    help = 'Compara el tiempo de render de una plantilla sin cache de plantillas y con el loader en cache'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--template', default='sales/sale.html', help='Plantilla a medir')
+        parser.add_argument('--iterations', type=int, default=200, help='Renders por modo')
+        parser.add_argument('--username', help='Usuario para request.user (por defecto el primer superusuario)')
+
+    def _backend(self, cached, debug):
+        options = dict(settings.TEMPLATES[0]['OPTIONS'])
+        options['debug'] = debug
+        options['loaders'] = [('django.template.loaders.cached.Loader', BASE_LOADERS)] if cached else BASE_LOADERS
+        return DjangoTemplates({
+            'NAME': 'benchmark',
+            'DIRS': settings.TEMPLATES[0]['DIRS'],
+            'APP_DIRS': False,
+            'OPTIONS': options,
+        })
+
+    def _measure(self, backend, name, context, request, iterations):
+        # Primer render fuera de la medicion (llena la cache del loader y de fragmentos)
+        backend.get_template(name).render(context, request)
+        timings = []
+        for _ in range(iterations):
+            start = time.perf_counter()
+            backend.get_template(name).render(context, request)
+            timings.append(time.perf_counter() - start)
+        return timings
+
+    def handle(self, *args, **options):
+        users = User.objects.filter(username=options['username']) if options['username'] else User.objects.filter(is_superuser=True)
+        user = users.first()
+        if user is None:
+            raise CommandError('No se encontro el usuario para la medicion')
+
+        request = RequestFactory().get('/')
+        request.user = user
+        # El catalogo se evalua una vez para medir solo el render
+        context = {
+            'products': list(Product.objects.filter(status=True)),
+            'header': None,
+            'sale_items': None,
+            'sale_form': SaleForm(),
+        }
+
+        modes = [
+            ('Sin cache (lee y compila en cada render)', self._backend(cached=False, debug=True)),
+            ('Loader en cache (produccion)', self._backend(cached=True, debug=False)),
+        ]
+        results = []
+        for label, backend in modes:
+            timings = self._measure(backend, options['template'], context, request, options['iterations'])
+            mean = statistics.mean(timings)
+            results.append(mean)
+            self.stdout.write(
+                f"{label}: media {mean * 1000:.2f} ms  p50 {statistics.median(timings) * 1000:.2f} ms"
+            )
+
+        self.stdout.write(f"Plantilla: {options['template']}  Renders por modo: {options['iterations']}")
+        self.stdout.write(f'Mejora: {results[0] / results[1]:.1f}x')
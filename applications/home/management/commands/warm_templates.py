@@ -0,0 +1,20 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from applications.home.warmup import warm_templates
+
+
+class Command(BaseCommand):
+    help = 'Compila todas las plantillas de templates/ y reporta errores de sintaxis'
+
+    def handle(self, *args, **options):
+        start = time.perf_counter()
+        compiled, errors = warm_templates()
+        elapsed = time.perf_counter() - start
+
+        for name, exc in errors:
+            self.stderr.write(f'{name}: {exc}')
+        self.stdout.write(f'Plantillas compiladas: {compiled} en {elapsed * 1000:.1f} ms')
+        if errors:
+            raise CommandError(f'{len(errors)} plantillas con errores')
@@ -1,8 +1,16 @@
+from asgiref.sync import sync_to_async
+
 from django.core.exceptions import PermissionDenied
 from django.contrib.auth.mixins import UserPassesTestMixin
 from django.contrib import messages
 from django.shortcuts import redirect
+from django.http import JsonResponse
 from django.urls import reverse_lazy
+from django.utils.dateparse import parse_date
+from django.utils.http import urlencode
+
+from .pagination import KeysetPaginator
+from .replica import replica_reads
 
 
 class AdminRequiredMixin(UserPassesTestMixin):
@@ -27,4 +35,121 @@ class SellerRequiredMixin(UserPassesTestMixin):
         if self.request.user.is_authenticated:
             messages.error(self.request, '❌ No tienes permisos para acceder a esta sección.')
             return redirect(reverse_lazy('home:home'))
-        return super().handle_no_permission()
\ No newline at end of file
+        return super().handle_no_permission()
+
+class AsyncLoginRequiredMixin:
+    """Version async de LoginRequiredMixin para endpoints AJAX (responde JSON en lugar de redirigir)"""
+
+    async def dispatch(self, request, *args, **kwargs):
+        user = await request.auser()
+        if not user.is_authenticated:
+            return JsonResponse({'success': False, 'error': 'Sesión expirada, inicie sesión nuevamente'}, status=401)
+        return await super().dispatch(request, *args, **kwargs)
+
+
+class AsyncAdminRequiredMixin:
+    """Version async de AdminRequiredMixin para endpoints AJAX; valida permission_required si se define"""
+    permission_required = None
+
+    async def dispatch(self, request, *args, **kwargs):
+        user = await request.auser()
+        if not user.is_authenticated:
+            return JsonResponse({'success': False, 'error': 'Sesión expirada, inicie sesión nuevamente'}, status=401)
+        allowed = await user.groups.filter(name='Admin').aexists()
+        if allowed and self.permission_required:
+            allowed = await user.ahas_perm(self.permission_required)
+        if not allowed:
+            return JsonResponse({'success': False, 'error': '❌ No tienes permisos para acceder a esta sección.'}, status=403)
+        return await super().dispatch(request, *args, **kwargs)
+
+
+class AsyncToggleStatusMixin:
+    """
+    Alterna el campo status de un registro. Las vistas definen el modelo, el
+    parametro POST con el id, la clave con el nombre en la respuesta y el
+    mensaje cuando no existe.
+    """
+    model = None
+    id_param = None
+    name_key = None
+    not_found_error = 'Registro no encontrado'
+
+    async def post(self, request, *args, **kwargs):
+        try:
+            obj = await self.model.objects.aget(id=request.POST.get(self.id_param))
+        except (self.model.DoesNotExist, ValueError):
+            return JsonResponse({'success': False, 'error': self.not_found_error})
+
+        # toggle_status usa el save() propio de cada modelo
+        new_status = await sync_to_async(obj.toggle_status)()
+        data = {'success': True, 'new_status': new_status}
+        if self.name_key:
+            data[self.name_key] = obj.name
+        return JsonResponse(data)
+
+
+class ReplicaReadMixin:
+    """Envia las lecturas de la vista a la replica (ver applications/home/replica.py)"""
+
+    @classmethod
+    def as_view(cls, **initkwargs):
+        return replica_reads(super().as_view(**initkwargs))
+
+
+class KeysetPaginationMixin:
+    """
+    Pagina un ListView por keyset sobre (keyset_field, id), del mas reciente
+    al mas antiguo. Acepta ?start_date=&end_date= (aplicados antes de paginar),
+    ?after= / ?before= con el cursor de la pagina y ?format=json, que responde
+    con serialize() de cada registro.
+    """
+    keyset_field = None
+    paginate_by = 50
+
+    def get_paginate_by(self, queryset):
+        # La paginacion por OFFSET de ListView no se usa
+        return None
+
+    def get_date_range(self):
+        try:
+            return parse_date(self.request.GET.get('start_date', '')), parse_date(self.request.GET.get('end_date', ''))
+        except ValueError:
+            return None, None
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        start_date, end_date = self.get_date_range()
+        if start_date:
+            queryset = queryset.filter(**{f'{self.keyset_field}__gte': start_date})
+        if end_date:
+            queryset = queryset.filter(**{f'{self.keyset_field}__lte': end_date})
+        return queryset
+
+    def get_context_data(self, **kwargs):
+        paginator = KeysetPaginator(self.object_list, self.keyset_field, self.paginate_by)
+        page = paginator.page(after=self.request.GET.get('after'), before=self.request.GET.get('before'))
+        kwargs['object_list'] = page.object_list
+        context = super().get_context_data(**kwargs)
+
+        start_date, end_date = self.get_date_range()
+        filters = {key: value for key, value in (('start_date', start_date), ('end_date', end_date)) if value}
+        context.update({
+            'page': page,
+            'start_date': start_date,
+            'end_date': end_date,
+            'filter_query': urlencode(filters),
+        })
+        return context
+
+    def serialize(self, obj):
+        raise NotImplementedError
+
+    def render_to_response(self, context, **response_kwargs):
+        if self.request.GET.get('format') != 'json':
+            return super().render_to_response(context, **response_kwargs)
+        page = context['page']
+        return JsonResponse({
+            'results': [self.serialize(obj) for obj in page.object_list],
+            'next': page.next_cursor,
+            'previous': page.previous_cursor,
+        })
@@ -1,5 +1,9 @@
-from django.db import models
-from django.contrib.auth.models import User
+from django.db import models, transaction
+from django.db.models.signals import post_save, post_delete, m2m_changed
+from django.dispatch import receiver
+from django.contrib.auth.models import User, Group
+
+from .cache import GROUPS, bump_version
 
 # Create your models here.
 
@@ -12,4 +16,12 @@ class BaseModel(models.Model):
     modified_by = models.IntegerField("Modificado por", null=True, blank=True)
 
     class Meta:
-        abstract = True
\ No newline at end of file
+        abstract = True
+
+
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+@receiver(m2m_changed, sender=User.groups.through)
+def invalidate_group_fragments(sender, **kwargs):
+    """El menu lateral depende de los grupos del usuario"""
+    transaction.on_commit(lambda: bump_version(GROUPS))
@@ -0,0 +1,79 @@
+from decimal import ROUND_HALF_UP, Context, Decimal
+
+
+# Los montos se guardan con 2 decimales (DecimalField decimal_places=2)
+CENT = Decimal('0.01')
+ZERO = Decimal('0.00')
+HUNDRED = Decimal(100)
+
+# Contexto precalculado: redondeo comercial y precision de sobra para max_digits=10
+MONEY_CONTEXT = Context(prec=28, rounding=ROUND_HALF_UP)
+
+
+def to_decimal(value):
+    """Convierte enteros, cadenas, floats y None en Decimal sin pasar por float"""
+    if isinstance(value, Decimal):
+        return value
+    if value is None or value == '':
+        return ZERO
+    if isinstance(value, float):
+        # repr da el decimal mas corto que representa al float (0.1 -> '0.1')
+        return Decimal(repr(value))
+    return Decimal(value if isinstance(value, int) else str(value).strip())
+
+
+def money(value):
+    """Monto redondeado a centimos"""
+    return to_decimal(value).quantize(CENT, context=MONEY_CONTEXT)
+
+
+def line_totals(quantity, unit_price, tax=0, discount=0):
+    """(subtotal, total) de una linea: cantidad x precio, mas impuesto, menos descuento"""
+    subtotal = money(to_decimal(quantity) * money(unit_price))
+    return subtotal, subtotal + money(tax) - money(discount)
+
+
+def document_total(subtotal, discount=0, tax=0):
+    """Total de la cabecera de un documento"""
+    return money(subtotal) - money(discount) + money(tax)
+
+
+def document_lines(lines):
+    """
+    Totales de todas las lineas de un documento en una pasada.
+    lines: iterable de (cantidad, precio, impuesto, descuento).
+    Devuelve ([(subtotal, total), ...], {'subtotal', 'tax', 'discount', 'total'}).
+    """
+    totals = []
+    append = totals.append
+    subtotal_sum = tax_sum = discount_sum = ZERO
+    for quantity, unit_price, tax, discount in lines:
+        subtotal = money(to_decimal(quantity) * money(unit_price))
+        tax, discount = money(tax), money(discount)
+        append((subtotal, subtotal + tax - discount))
+        subtotal_sum += subtotal
+        tax_sum += tax
+        discount_sum += discount
+    return totals, {
+        'subtotal': subtotal_sum,
+        'tax': tax_sum,
+        'discount': discount_sum,
+        'total': subtotal_sum + tax_sum - discount_sum,
+    }
+
+
+def percentage(value, total):
+    """(value / total) * 100 con 2 decimales; 0 si total no es positivo"""
+    total = to_decimal(total)
+    if total <= 0:
+        return ZERO
+    return money(MONEY_CONTEXT.divide(to_decimal(value) * HUNDRED, total))
+
+
+def divide(value, divisor):
+    """value / divisor con 2 decimales; 0 si el divisor es 0"""
+    divisor = to_decimal(divisor)
+    if not divisor:
+        return ZERO
+    return money(MONEY_CONTEXT.divide(to_decimal(value), divisor))
+
@@ -0,0 +1,87 @@
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+
+
+CURSOR_SEPARATOR = '_'
+
+
+class KeysetPage:
+    """Una pagina de resultados con los cursores para ir a la siguiente y a la anterior"""
+
+    def __init__(self, object_list, next_cursor=None, previous_cursor=None):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+    @property
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+
+class KeysetPaginator:
+    """
+    Paginacion por busqueda (keyset) sobre (field, id) en orden descendente.
+    Cada pagina continua desde el ultimo registro visto en lugar de usar
+    OFFSET, asi una pagina antigua cuesta lo mismo que la primera si existe
+    un indice sobre (field, id).
+    """
+
+    def __init__(self, queryset, field, per_page):
+        self.queryset = queryset
+        self.field = field
+        self.per_page = per_page
+        self.model_field = queryset.model._meta.get_field(field)
+
+    def encode(self, obj):
+        value = self.model_field.value_to_string(obj)
+        return f'{value}{CURSOR_SEPARATOR}{obj.pk}'
+
+    def decode(self, cursor):
+        """(valor, id) del cursor; None si no es valido"""
+        value, _, pk = (cursor or '').rpartition(CURSOR_SEPARATOR)
+        try:
+            return self.model_field.to_python(value), int(pk)
+        except (ValidationError, ValueError):
+            return None
+
+    def _seek(self, queryset, position, lookup):
+        value, pk = position
+        field = self.field
+        # El filtro redundante field__lte/gte acota el rango del indice
+        return queryset.filter(
+            Q(**{f'{field}__{lookup}': value}) | Q(**{field: value, f'pk__{lookup}': pk}),
+            **{f'{field}__{lookup}e': value},
+        )
+
+    def page(self, after=None, before=None):
+        """Pagina siguiente a after, anterior a before, o la primera"""
+        after, before = self.decode(after), self.decode(before)
+        field = self.field
+        if before:
+            queryset = self._seek(self.queryset, before, 'gt').order_by(field, 'pk')
+        else:
+            queryset = self.queryset.order_by(f'-{field}', '-pk')
+            if after:
+                queryset = self._seek(queryset, after, 'lt')
+
+        # Un registro de mas indica si hay otra pagina en esa direccion
+        rows = list(queryset[:self.per_page + 1])
+        has_more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        if before:
+            rows.reverse()
+            has_next, has_previous = True, has_more
+        else:
+            has_next, has_previous = has_more, bool(after)
+
+        if not rows:
+            return KeysetPage(rows)
+        return KeysetPage(
+            rows,
+            next_cursor=self.encode(rows[-1]) if has_next else None,
+            previous_cursor=self.encode(rows[0]) if has_previous else None,
+        )
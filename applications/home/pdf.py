@@ -0,0 +1,148 @@
+import io
+import os
+from functools import lru_cache
+from pathlib import Path
+from urllib.parse import urlparse
+
+from django.conf import settings
+from django.contrib.staticfiles import finders
+from django.core.exceptions import ImproperlyConfigured
+from django.http import HttpResponse
+from django.template.loader import get_template
+from django.utils.module_loading import import_string
+
+
+@lru_cache(maxsize=512)
+def _resolve_uri(uri):
+    result = finders.find(uri)
+
+    if result:
+        if not isinstance(result, (list, tuple)):
+            result = [result]
+        result = list(os.path.realpath(path) for path in result)
+        path = result[0]
+    else:
+        static_url = settings.STATIC_URL    # Usually /static/
+        static_root = settings.STATIC_ROOT  # Usually /home/user/project_static/
+        media_url = settings.MEDIA_URL      # Usually /media/
+        media_root = settings.MEDIA_ROOT    # Usually /home/user/project_static/media/
+
+        if uri.startswith(media_url):
+            path = os.path.join(media_root, uri.replace(media_url, ""))
+        elif uri.startswith(static_url):
+            path = os.path.join(static_root, uri.replace(static_url, ""))
+        else:
+            return uri
+
+    # make sure that file exists
+    if not os.path.isfile(path):
+        raise RuntimeError(
+            f'media URI must start with {settings.STATIC_URL} or {settings.MEDIA_URL}'
+        )
+    return path
+
+
+def link_callback(uri, rel):
+    """
+    Convert HTML URIs to absolute system paths so the PDF engine can access
+    those resources. Resolved paths are memoised per process.
+    """
+    return _resolve_uri(uri)
+
+
+# Documento minimo con las fuentes base de los reportes, para el arranque
+WARMUP_HTML = (
+    '<html><body>'
+    '<p style="font-family: Helvetica">Warm-up</p>'
+    '<p style="font-family: Courier"><b>0123456789</b></p>'
+    '<table><tr><td>1</td><td>2</td></tr></table>'
+    '</body></html>'
+)
+
+
+class PdfBackend:
+    """Interfaz de los motores de PDF: convierte HTML en un PDF escrito en dest"""
+    name = None
+
+    def render(self, html, dest):
+        """Escribe el PDF en dest y devuelve True si no hubo errores"""
+        raise NotImplementedError
+
+    def warm_up(self):
+        """Carga el motor y sus fuentes renderizando un documento minimo"""
+        self.render(WARMUP_HTML, io.BytesIO())
+
+
+class XhtmlToPdfBackend(PdfBackend):
+    name = 'xhtml2pdf'
+
+    def render(self, html, dest):
+        from xhtml2pdf import pisa
+
+        pisa_status = pisa.CreatePDF(
+            html,
+            dest=dest,
+            link_callback=link_callback,
+        )
+        return not pisa_status.err
+
+
+class WeasyPrintBackend(PdfBackend):
+    """Motor opcional (pip install weasyprint), con mejor soporte de CSS"""
+    name = 'weasyprint'
+
+    @staticmethod
+    def _url_fetcher(url):
+        from weasyprint import default_url_fetcher
+
+        parsed = urlparse(url)
+        if parsed.scheme == 'file':
+            path = link_callback(parsed.path, None)
+            if path != parsed.path:
+                url = Path(path).as_uri()
+        return default_url_fetcher(url)
+
+    def render(self, html, dest):
+        from weasyprint import HTML
+
+        HTML(string=html, base_url='file:///', url_fetcher=self._url_fetcher).write_pdf(dest)
+        return True
+
+
+PDF_BACKENDS = {
+    XhtmlToPdfBackend.name: XhtmlToPdfBackend,
+    WeasyPrintBackend.name: WeasyPrintBackend,
+}
+
+_instances = {}
+
+
+def get_pdf_backend(name=None):
+    """
+    Motor de PDF configurado en settings.PDF_BACKEND: un nombre registrado en
+    PDF_BACKENDS o la ruta de una subclase de PdfBackend.
+    """
+    name = name or settings.PDF_BACKEND
+    if name not in _instances:
+        if name in PDF_BACKENDS:
+            backend_class = PDF_BACKENDS[name]
+        else:
+            try:
+                backend_class = import_string(name)
+            except ImportError:
+                raise ImproperlyConfigured(f'Motor de PDF desconocido: {name}')
+        _instances[name] = backend_class()
+    return _instances[name]
+
+
+def render_to_pdf(template_path, context, filename, backend=None):
+    """Renderiza la plantilla y devuelve la respuesta PDF en linea"""
+    response = HttpResponse(content_type='application/pdf')
+    response['Content-Disposition'] = f'inline; filename="{filename}"'
+    template = get_template(template_path)
+    html = template.render(context)
+
+    if not get_pdf_backend(backend).render(html, response):
+        return HttpResponse('We had some errors <pre>' + html + '</pre>')
+
+    return response
@@ -0,0 +1,156 @@
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections
+
+
+# Alias de la replica de solo lectura en DATABASES (opcional)
+REPLICA = 'replica'
+# Cookie con el instante hasta el que el usuario lee de la base principal
+PIN_COOKIE = 'pos_primary_until'
+LAG_CACHE_KEY = 'replica_lag'
+LAG_CHECK_SECONDS = 5
+
+LAG_QUERY = """
+    SELECT CASE
+        WHEN NOT pg_is_in_recovery() THEN 0
+        WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)
+    END
+"""
+
+# Alias de lectura de la vista en curso; None usa la base principal
+_read_alias = ContextVar('replica_read_alias', default=None)
+# Estado de la solicitud en curso; es un dict para que las escrituras hechas
+# en hilos de sync_to_async tambien se vean desde el middleware
+_request_state = ContextVar('replica_request_state', default=None)
+
+
+def replica_configured():
+    return REPLICA in settings.DATABASES
+
+
+def replica_lag():
+    """
+    Segundos de retraso de la replica, consultados como mucho cada
+    LAG_CHECK_SECONDS. Si la replica no responde el retraso es infinito.
+    """
+    lag = cache.get(LAG_CACHE_KEY)
+    if lag is None:
+        connection = connections[REPLICA]
+        try:
+            if connection.vendor == 'postgresql':
+                with connection.cursor() as cursor:
+                    cursor.execute(LAG_QUERY)
+                    lag = float(cursor.fetchone()[0])
+            else:
+                connection.ensure_connection()
+                lag = 0.0
+        except DatabaseError:
+            lag = float('inf')
+        cache.set(LAG_CACHE_KEY, lag, LAG_CHECK_SECONDS)
+    return lag
+
+
+def is_pinned(request):
+    """El usuario escribio hace menos de REPLICA_PIN_SECONDS y debe leer lo que escribio"""
+    try:
+        return float(request.COOKIES.get(PIN_COOKIE, 0)) > time.time()
+    except ValueError:
+        return False
+
+
+def use_replica(request):
+    return (
+        replica_configured()
+        and not is_pinned(request)
+        and replica_lag() <= settings.REPLICA_MAX_LAG
+    )
+
+
+def replica_reads(view):
+    """
+    Envia a la replica las lecturas de una vista de reportes, dashboard o
+    listado. Se usa la base principal si no hay replica, si esta atrasada mas
+    de REPLICA_MAX_LAG segundos o si el usuario acaba de escribir.
+    """
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if not use_replica(request):
+            return view(request, *args, **kwargs)
+        # Sesion y usuario se leen de la principal: un login reciente puede
+        # no haber llegado aun a la replica
+        getattr(request, 'user', None) and request.user.is_authenticated
+        token = _read_alias.set(REPLICA)
+        try:
+            response = view(request, *args, **kwargs)
+            # Las TemplateResponse evaluan sus querysets al renderizar
+            if hasattr(response, 'render') and not response.is_rendered:
+                response.render()
+            return response
+        finally:
+            _read_alias.reset(token)
+    return wrapper
+
+
+@contextmanager
+def primary_reads():
+    """
+    Lee de la base principal dentro de una vista con replica_reads: para lo
+    que se escribe y se vuelve a leer en la misma solicitud, o para calculos
+    que se guardan y no deben salir de una replica atrasada.
+    """
+    token = _read_alias.set(None)
+    try:
+        yield
+    finally:
+        _read_alias.reset(token)
+
+
+class ReplicaRouter:
+    """
+    Lecturas a la replica solo dentro de vistas con replica_reads; escrituras
+    y migraciones siempre en la base principal.
+    """
+
+    def db_for_read(self, model, **hints):
+        return _read_alias.get()
+
+    def db_for_write(self, model, **hints):
+        state = _request_state.get()
+        if state is not None:
+            state['wrote'] = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # La replica es una copia de la principal
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == DEFAULT_DB_ALIAS
+
+
+class ReplicaPinMiddleware:
+    """
+    Lectura de lo escrito: despues de una escritura el usuario lee de la base
+    principal durante REPLICA_PIN_SECONDS, aunque la replica aun no la tenga.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        state = {'wrote': False}
+        token = _request_state.set(state)
+        try:
+            response = self.get_response(request)
+        finally:
+            _request_state.reset(token)
+        if state['wrote'] and replica_configured():
+            pin = settings.REPLICA_PIN_SECONDS
+            response.set_cookie(PIN_COOKIE, str(time.time() + pin), max_age=pin, httponly=True, samesite='Lax')
+        return response
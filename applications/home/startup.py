@@ -0,0 +1,52 @@
+import json
+import os
+import re
+import subprocess
+import sys
+
+
+# Modulos que solo deben cargarse al generar el primer PDF
+HEAVY_MODULES = ('xhtml2pdf', 'reportlab', 'html5lib', 'PIL', 'weasyprint')
+
+# Arranque de un worker: el modulo WSGI/ASGI y luego el URLconf (importa todas las vistas)
+BOOT_SCRIPT = '''
+import importlib, json, resource, sys, time
+start = time.perf_counter()
+importlib.import_module(sys.argv[1])
+from django.urls import get_resolver
+get_resolver().url_patterns
+print(json.dumps({
+    'seconds': time.perf_counter() - start,
+    'rss_kb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+    'heavy': sorted(name for name in sys.modules if name.split('.')[0] in %r),
+}))
+''' % (HEAVY_MODULES,)
+
+IMPORT_TIME_LINE = re.compile(r'^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)')
+
+
+def parse_import_time(output):
+    """Lineas de -X importtime: [(modulo, propio us, acumulado us, nivel)]"""
+    rows = []
+    for line in output.splitlines():
+        match = IMPORT_TIME_LINE.match(line)
+        if match:
+            own, cumulative, indent, module = match.groups()
+            rows.append((module, int(own), int(cumulative), len(indent) // 2))
+    return rows
+
+
+def measure_boot(module='pos.wsgi', env=None):
+    """
+    Arranca un proceso nuevo como lo haria un worker con python -X importtime
+    y devuelve segundos, memoria maxima (KB), modulos pesados cargados y los
+    tiempos de importacion. env se suma al entorno actual (p. ej. PDF_WARMUP).
+    """
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', BOOT_SCRIPT, module],
+        env={**os.environ, **(env or {})},
+        capture_output=True, text=True, check=True,
+    )
+    boot = json.loads(result.stdout.strip().splitlines()[-1])
+    boot['imports'] = parse_import_time(result.stderr)
+    return boot
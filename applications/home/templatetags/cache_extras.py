@@ -0,0 +1,16 @@
+# home/templatetags/cache_extras.py
+from django import template
+from django.conf import settings
+
+from applications.home.cache import get_version
+
+register = template.Library()
+
+@register.simple_tag
+def cache_version(name):
+    """
+    Version actual de un grupo de fragmentos, para usarla en la clave de
+    {% cache %}. Incluye TEMPLATE_CACHE_VERSION: un despliegue que la sube no
+    reutiliza fragmentos de las plantillas anteriores.
+    """
+    return f'{settings.TEMPLATE_CACHE_VERSION}.{get_version(name)}'
@@ -0,0 +1,54 @@
+from django.contrib.auth.models import Group, User
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from applications.inv.models import Brand, Category, Product, SubCategory, UnitMeasure
+
+
+class QueryCountMixin:
+    """
+    Limita el numero de consultas SQL por vista: si una pagina vuelve a hacer
+    una consulta por fila (N+1) la prueba falla y muestra las consultas.
+    """
+
+    def assertMaxQueries(self, maximum, url, **extra):
+        # Sin cache de fragmentos se mide el peor caso
+        cache.clear()
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(url, **extra)
+        self.assertEqual(response.status_code, 200, url)
+        queries = '\n'.join(query['sql'] for query in context.captured_queries)
+        self.assertLessEqual(
+            len(context), maximum,
+            f'{url} ejecuto {len(context)} consultas (maximo {maximum}):\n{queries}'
+        )
+        return response
+
+
+def create_admin(username='admin'):
+    """Superusuario en el grupo Admin"""
+    user = User.objects.create_superuser(username, f'{username}@example.com', 'clave-prueba')
+    user.groups.add(Group.objects.get_or_create(name='Admin')[0])
+    return user
+
+
+def create_products(user, count):
+    """Productos con categoria, subcategoria y marca distintas para detectar N+1"""
+    unit = UnitMeasure(name='unidad', created_by=user)
+    unit.save()
+    products = []
+    for i in range(count):
+        category = Category(name=f'categoria {i}', created_by=user)
+        category.save()
+        subcategory = SubCategory(name=f'subcategoria {i}', category=category, created_by=user)
+        subcategory.save()
+        brand = Brand(name=f'marca {i}', created_by=user)
+        brand.save()
+        product = Product(
+            code=f'P{i:03d}', name=f'producto {i}', subcategory=subcategory, brand=brand,
+            unit_measure=unit, price=10, last_purchase_price=4, average_cost=4, stock=100, created_by=user,
+        )
+        product.save()
+        products.append(product)
+    return products
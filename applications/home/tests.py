@@ -1,3 +1,129 @@
-from django.test import TestCase
+import time
+from decimal import Decimal
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.db import router
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, TestCase
+from django.urls import reverse
+
+from .money import ZERO, divide, document_lines, line_totals, money, percentage
+from .replica import PIN_COOKIE, REPLICA, ReplicaPinMiddleware, replica_reads
+from .startup import measure_boot
+from .testing import QueryCountMixin, create_admin
+
+
+class UserListQueryCountTest(QueryCountMixin, TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_admin()
+        for i in range(5):
+            create_admin(f'usuario{i}')
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def test_user_list(self):
+        self.assertMaxQueries(6, reverse('home:user_list'))
+
+
+@mock.patch('applications.home.replica.replica_configured', return_value=True)
+class ReplicaRoutingTest(SimpleTestCase):
+    """Lecturas de reportes y listados a la replica con lectura de lo escrito"""
+
+    @staticmethod
+    @replica_reads
+    def read_alias(request):
+        return router.db_for_read(User)
+
+    def test_reads_go_to_replica(self, configured):
+        with mock.patch('applications.home.replica.replica_lag', return_value=0):
+            self.assertEqual(self.read_alias(RequestFactory().get('/')), REPLICA)
+        # Fuera de la vista se lee de la principal
+        self.assertEqual(router.db_for_read(User), 'default')
+
+    def test_lagging_replica_falls_back_to_primary(self, configured):
+        with mock.patch('applications.home.replica.replica_lag', return_value=60):
+            self.assertEqual(self.read_alias(RequestFactory().get('/')), 'default')
+
+    def test_user_reads_own_writes(self, configured):
+        def write(request):
+            router.db_for_write(User)
+            return HttpResponse()
+
+        response = ReplicaPinMiddleware(write)(RequestFactory().post('/'))
+        request = RequestFactory().get('/')
+        request.COOKIES[PIN_COOKIE] = response.cookies[PIN_COOKIE].value
+        with mock.patch('applications.home.replica.replica_lag', return_value=0):
+            self.assertEqual(self.read_alias(request), 'default')
+            request.COOKIES[PIN_COOKIE] = str(time.time() - 1)
+            self.assertEqual(self.read_alias(request), REPLICA)
+
+
+class WorkerBootTest(SimpleTestCase):
+    def test_pdf_engine_is_not_loaded_at_boot(self):
+        boot = measure_boot('pos.wsgi', {'PDF_WARMUP': 'False'})
+        self.assertEqual(boot['heavy'], [])
+        self.assertTrue(any(module == 'applications.sales.views' for module, *_ in boot['imports']))
+
+
+class MoneyTest(SimpleTestCase):
+    """Redondeo comercial (half-up) a centimos y entradas vacias"""
+
+    def assertMoney(self, value, expected):
+        # Mismo valor y siempre con 2 decimales
+        self.assertEqual(str(value), expected)
+
+    def test_half_up_rounding(self):
+        self.assertMoney(money('0.005'), '0.01')
+        self.assertMoney(money('-0.005'), '-0.01')
+        # round() daria 2.67 por la representacion binaria del float
+        self.assertMoney(money(2.675), '2.68')
+        self.assertMoney(money(None), '0.00')
+        self.assertMoney(money(''), '0.00')
+
+    def test_line_totals(self):
+        # El precio se redondea antes de multiplicar: 3 x 0.34
+        subtotal, total = line_totals(3, '0.335')
+        self.assertMoney(subtotal, '1.02')
+        self.assertMoney(total, '1.02')
+
+        subtotal, total = line_totals('1.5', '2.25', tax='0.125', discount=None)
+        self.assertMoney(subtotal, '3.38')
+        self.assertMoney(total, '3.51')
+
+        self.assertEqual(line_totals(None, None, None, None), (ZERO, ZERO))
+
+    def test_document_lines(self):
+        totals, summary = document_lines([(2, '1.005', '0.105', 0), ('1', 10, None, '0.5')])
+        self.assertEqual(totals, [(Decimal('2.02'), Decimal('2.13')), (Decimal('10.00'), Decimal('9.50'))])
+        self.assertEqual(summary, {
+            'subtotal': Decimal('12.02'), 'tax': Decimal('0.11'),
+            'discount': Decimal('0.50'), 'total': Decimal('11.63'),
+        })
+
+    def test_document_lines_empty(self):
+        totals, summary = document_lines([])
+        self.assertEqual(totals, [])
+        self.assertEqual(summary, {'subtotal': ZERO, 'tax': ZERO, 'discount': ZERO, 'total': ZERO})
+        self.assertMoney(summary['total'], '0.00')
+
+    def test_divide(self):
+        self.assertMoney(divide(2, 3), '0.67')
+        self.assertMoney(divide('1', 3), '0.33')
+        self.assertMoney(divide('0.125', 1), '0.13')
+        self.assertMoney(divide(None, 4), '0.00')
+        self.assertMoney(divide(10, 0), '0.00')
+        self.assertMoney(divide(10, '0.00'), '0.00')
+        self.assertMoney(divide(10, None), '0.00')
+
+    def test_percentage(self):
+        self.assertMoney(percentage(1, 8), '12.50')
+        self.assertMoney(percentage(2, 3), '66.67')
+        self.assertMoney(percentage('0.005', 1), '0.50')
+        self.assertMoney(percentage(None, 10), '0.00')
+        self.assertMoney(percentage(5, 0), '0.00')
+        self.assertMoney(percentage(5, -10), '0.00')
+        self.assertMoney(percentage(5, None), '0.00')
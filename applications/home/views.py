@@ -1,6 +1,6 @@
 from datetime import datetime, timedelta
 
-from django.shortcuts import render, get_object_or_404, redirect
+from django.shortcuts import render, get_object_or_404, aget_object_or_404, redirect
 from django.contrib.auth.views import LoginView, LogoutView
 from django.views.generic import TemplateView, ListView, CreateView, UpdateView, DeleteView, View
 from django.contrib.auth.mixins import LoginRequiredMixin, PermissionRequiredMixin
@@ -11,14 +11,15 @@ from django.http import JsonResponse
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required
 from django.utils import timezone
-from django.db.models import Sum, Count, Avg, Q
+from django.db.models import Sum, Count, Avg, Q, F
 from django.db.models.functions import TruncMonth, TruncDay
 
 from applications.inv.models import Product, Category, Brand
 from applications.sales.models import Sale, SaleDetail, Customer
 from applications.purchases.models import PurchaseOrder, Supplier
 from .forms import CustomUserCreationForm, CustomUserChangeForm
-from .mixins import AdminRequiredMixin, SellerRequiredMixin
+from .mixins import AdminRequiredMixin, SellerRequiredMixin, AsyncAdminRequiredMixin
+from .replica import replica_reads
 
 
 # Create your views here.
@@ -98,14 +99,14 @@ class UserDeleteView(LoginRequiredMixin,AdminRequiredMixin, PermissionRequiredMi
             return JsonResponse({'success': True, 'message': 'Usuario eliminado exitosamente'})
         return super().delete(request, *args, **kwargs)
 
-class ToggleUserStatusView(LoginRequiredMixin, AdminRequiredMixin, PermissionRequiredMixin, View):
+class ToggleUserStatusView(AsyncAdminRequiredMixin, View):
     permission_required = 'auth.change_user'
     
-    def post(self, request, *args, **kwargs):
+    async def post(self, request, *args, **kwargs):
         user_id = request.POST.get('user_id')
-        user = get_object_or_404(User, id=user_id)
+        user = await aget_object_or_404(User, id=user_id)
         user.is_active = not user.is_active
-        user.save()
+        await user.asave(update_fields=['is_active'])
         
         return JsonResponse({
             'success': True, 
@@ -140,6 +141,7 @@ class NewLogoutView(LogoutView):
 
 
 @login_required
+@replica_reads
 def dashboard_view(request):
     # Fechas para filtros
     today = timezone.now().date()
@@ -177,16 +179,19 @@ def dashboard_view(request):
         total_revenue=Sum('total_price')
     ).order_by('-total_sold')[:10]
     
-    # Productos con stock bajo (menos de 10 unidades)
+    # Productos con stock bajo: en o bajo su punto de reorden precalculado
+    # (menos de 10 unidades si aun no se ha calculado)
     low_stock_products = Product.objects.filter(
-        stock__lt=10,
+        Q(reorder__isnull=False, stock__lte=F('reorder__reorder_point'), reorder__daily_velocity__gt=0) |
+        Q(reorder__isnull=True, stock__lt=10),
         status=True
     ).order_by('stock')[:10]
     
     # Compras del mes
     monthly_purchases = PurchaseOrder.objects.filter(
         buy_date__gte=start_of_month,
-        status=True
+        status=True,
+        draft=False,
     ).aggregate(
         total=Sum('total_amount'),
         count=Count('id')
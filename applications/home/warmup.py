@@ -0,0 +1,37 @@
+from pathlib import Path
+
+from django.conf import settings
+from django.template import TemplateSyntaxError
+from django.template.loader import get_template
+
+
+def template_names():
+    """Nombres de todas las plantillas .html de los directorios de TEMPLATES"""
+    for directory in settings.TEMPLATES[0]['DIRS']:
+        root = Path(directory)
+        for path in sorted(root.rglob('*.html')):
+            yield path.relative_to(root).as_posix()
+
+
+def warm_templates():
+    """
+    Compila todas las plantillas para que el loader en cache las tenga listas
+    antes de la primera peticion. Devuelve (compiladas, [(nombre, error)]).
+    """
+    compiled = 0
+    errors = []
+    for name in template_names():
+        try:
+            get_template(name)
+        except TemplateSyntaxError as exc:
+            errors.append((name, exc))
+        else:
+            compiled += 1
+    return compiled, errors
+
+
+def warm_pdf_backend():
+    """Importa el motor de PDF configurado y renderiza un documento minimo"""
+    from .pdf import get_pdf_backend
+
+    get_pdf_backend().warm_up()
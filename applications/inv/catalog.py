@@ -0,0 +1,73 @@
+from datetime import datetime, timedelta, timezone
+
+from django.core.cache import cache
+from django.db.models import Max
+
+from .models import Product
+
+
+# Columnas del catalogo; cada producto viaja como una lista en este orden
+CATALOG_FIELDS = ['id', 'code', 'bar_code', 'name', 'price', 'stock']
+
+# Una fila puede confirmarse con un updated_at anterior al maximo ya publicado;
+# las deltas repiten este margen y los clientes aplican los cambios por id
+DELTA_OVERLAP = timedelta(seconds=60)
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+MICROSECOND = timedelta(microseconds=1)
+SNAPSHOT_KEY = 'catalog_snapshot:latest'
+
+
+def catalog_version():
+    """
+    Version del catalogo: el updated_at mas reciente de Product en
+    microsegundos (una consulta sobre el indice de updated_at).
+    """
+    latest = Product.objects.aggregate(latest=Max('updated_at'))['latest']
+    if latest is None:
+        return '0'
+    return str((latest - EPOCH) // MICROSECOND)
+
+
+def version_to_datetime(version):
+    """Fecha de una version; ValueError si no es valida"""
+    return EPOCH + int(version) * MICROSECOND
+
+
+def _rows(queryset):
+    return [
+        [id, code, bar_code, name, str(price), stock]
+        for id, code, bar_code, name, price, stock in queryset.values_list(*CATALOG_FIELDS)
+    ]
+
+
+def catalog_snapshot(version=None):
+    """
+    Catalogo activo completo. Solo se cachea la ultima version en una clave
+    fija: cada version nueva reemplaza a la anterior en vez de acumularse.
+    """
+    version = version or catalog_version()
+    snapshot = cache.get(SNAPSHOT_KEY)
+    if snapshot is None or snapshot['version'] != version:
+        snapshot = {
+            'version': version,
+            'fields': CATALOG_FIELDS,
+            'products': _rows(Product.objects.filter(status=True).order_by('id')),
+        }
+        cache.set(SNAPSHOT_KEY, snapshot, None)
+    return snapshot
+
+
+def catalog_delta(since, version=None):
+    """
+    Productos modificados despues de la version since: los activos van en
+    products y los desactivados en removed.
+    """
+    version = version or catalog_version()
+    changed = Product.objects.filter(updated_at__gt=version_to_datetime(since) - DELTA_OVERLAP).order_by('id')
+    return {
+        'version': version,
+        'since': since,
+        'fields': CATALOG_FIELDS,
+        'products': _rows(changed.filter(status=True)),
+        'removed': list(changed.filter(status=False).values_list('id', flat=True)),
+    }
@@ -1,5 +1,6 @@
 from django import forms
 
+from applications.home.cache import cached_choices
 from .models import Category, SubCategory, Brand, UnitMeasure, Product
 
 class CategoryForm(forms.ModelForm):
@@ -135,22 +136,28 @@ class ProductForm(forms.ModelForm):
         # Filtrar solo las Subcategorías activas para el queryset
         self.fields['subcategory'].queryset = SubCategory.objects.filter(status=True).order_by('name')
         
-        # Mejorar la presentación del select de Subcategoría
-        self.fields['subcategory'].empty_label = "Seleccione una Subcategoría"
+        # Las opciones se toman de la cache del catalogo; el queryset solo se usa al validar
+        self.fields['subcategory'].choices = cached_choices(
+            'subcategory',
+            self.fields['subcategory'].queryset.select_related('category'),
+            "Seleccione una Subcategoría",
+        )
         self.fields['subcategory'].widget.attrs.update({'class': 'form-control'})
 
          # Filtrar solo las Marcas activas para el queryset
         self.fields['brand'].queryset = Brand.objects.filter(status=True).order_by('name')
         
         # Mejorar la presentación del select de categoría
-        self.fields['brand'].empty_label = "Seleccione una Marca"
+        self.fields['brand'].choices = cached_choices('brand', self.fields['brand'].queryset, "Seleccione una Marca")
         self.fields['brand'].widget.attrs.update({'class': 'form-control'})
 
          # Filtrar solo las unidades de medidas activas para el queryset
         self.fields['unit_measure'].queryset = UnitMeasure.objects.filter(status=True).order_by('name')
         
         # Mejorar la presentación del select de categoría
-        self.fields['unit_measure'].empty_label = "Seleccione una Unidad de Medida"
+        self.fields['unit_measure'].choices = cached_choices(
+            'unit_measure', self.fields['unit_measure'].queryset, "Seleccione una Unidad de Medida"
+        )
         self.fields['unit_measure'].widget.attrs.update({'class': 'form-control'})
 
     def clean_name(self):
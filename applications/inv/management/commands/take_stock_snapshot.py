@@ -0,0 +1,42 @@
+from datetime import datetime
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from applications.inv.valuation import take_stock_snapshot
+
+
+class Command(BaseCommand):
+    help = (
+        'Guarda un snapshot del stock para la valorizacion de inventario (programar a fin de mes/dia); '
+        'una fecha pasada se reconstruye desde el snapshot o el stock mas cercano'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--date', help='Fecha del snapshot (YYYY-MM-DD), por defecto hoy; no puede ser futura')
+        parser.add_argument('--username', help='Usuario que registra el snapshot, por defecto el primer superusuario')
+
+    def handle(self, *args, **options):
+        if options['date']:
+            try:
+                snapshot_date = datetime.strptime(options['date'], '%Y-%m-%d').date()
+            except ValueError:
+                raise CommandError('Formato de fecha invalido, use YYYY-MM-DD')
+        else:
+            snapshot_date = timezone.localdate()
+
+        if options['username']:
+            user = User.objects.filter(username=options['username']).first()
+        else:
+            user = User.objects.filter(is_superuser=True).order_by('id').first()
+        if not user:
+            raise CommandError('No se encontro un usuario para registrar el snapshot')
+
+        try:
+            snapshot = take_stock_snapshot(snapshot_date, user)
+        except ValueError as e:
+            raise CommandError(str(e))
+        self.stdout.write(self.style.SUCCESS(
+            f'Snapshot {snapshot.snapshot_date} guardado con {snapshot.items.count()} productos'
+        ))
@@ -0,0 +1,48 @@
+# Generated by Django 5.2.5 on 2026-10-19 12:58
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inv', '0007_alter_product_brand_alter_product_subcategory_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StockSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status', models.BooleanField(default=True, verbose_name='Estado')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Fecha de creacion')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Fecha de modificacion')),
+                ('modified_by', models.IntegerField(blank=True, null=True, verbose_name='Modificado por')),
+                ('snapshot_date', models.DateField(unique=True, verbose_name='Fecha del Snapshot')),
+                ('created_by', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='%(class)s_created_by', to=settings.AUTH_USER_MODEL, verbose_name='Creado por')),
+            ],
+            options={
+                'verbose_name': 'Snapshot de Stock',
+                'verbose_name_plural': 'Snapshots de Stock',
+                'ordering': ['-snapshot_date'],
+            },
+        ),
+        migrations.CreateModel(
+            name='StockSnapshotItem',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('quantity', models.IntegerField(default=0, verbose_name='Cantidad')),
+                ('unit_cost', models.DecimalField(decimal_places=2, default=0.0, max_digits=10, verbose_name='Costo Unitario')),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='snapshot_items', to='inv.product')),
+                ('snapshot', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='items', to='inv.stocksnapshot')),
+            ],
+            options={
+                'verbose_name': 'Item de Snapshot',
+                'verbose_name_plural': 'Items de Snapshot',
+                'unique_together': {('snapshot', 'product')},
+            },
+        ),
+    ]
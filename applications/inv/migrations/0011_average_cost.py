@@ -0,0 +1,26 @@
+# Generated by Django 5.2.5 on 2026-10-19 13:44
+
+from django.db import migrations, models
+from django.db.models import F
+
+
+def copy_last_purchase_price(apps, schema_editor):
+    """El costo promedio parte del ultimo precio de compra conocido"""
+    Product = apps.get_model('inv', 'Product')
+    Product.objects.update(average_cost=F('last_purchase_price'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inv', '0010_product_updated_at_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='average_cost',
+            field=models.DecimalField(decimal_places=2, default=0.0, max_digits=10, verbose_name='Costo Promedio'),
+        ),
+        migrations.RunPython(copy_last_purchase_price, migrations.RunPython.noop),
+    ]
@@ -1,9 +1,33 @@
-from django.db import models
+from django.conf import settings
+from django.db import models, transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from django.db.models import Case, F, IntegerField, Value, When
+from django.db.models.functions import Greatest, Upper
+from django.utils import timezone
+from django.contrib.postgres.indexes import GinIndex, OpClass
+from django.contrib.postgres.search import SearchVector
+
 from applications.home.models import BaseModel
+from applications.home.cache import CATALOG, bump_version
 
 
 # Create your models here.
 
+# Costo unitario que se copia a cada linea de venta (SALE_COST_METHOD)
+COST_AVERAGE = 'average'
+COST_LAST = 'last'
+SALE_COST_FIELDS = {
+    COST_AVERAGE: 'average_cost',
+    COST_LAST: 'last_purchase_price',
+}
+
+
+def sale_cost_field():
+    """Campo de Product con el costo de venta segun SALE_COST_METHOD"""
+    return SALE_COST_FIELDS[settings.SALE_COST_METHOD]
+
+
 class Category(BaseModel):
     name = models.CharField("Categoria", max_length=100, unique=True)
     description = models.TextField("Descripcion", blank=True, null=True)
@@ -56,6 +80,9 @@ class Brand(BaseModel):
         verbose_name = "Marca"
         verbose_name_plural = "Marcas"
         ordering = ['name']
+        indexes = [
+            GinIndex(OpClass(Upper('name'), name='gin_trgm_ops'), name='brand_name_trgm_idx'),
+        ]
 
     def __str__(self):
         return self.name
@@ -90,6 +117,14 @@ class UnitMeasure(BaseModel):
         self.save()
         return self.status
     
+# Campos que muestran los fragmentos y selects cacheados del catalogo. El
+# stock y los costos cambian con cada venta o compra y no invalidan la cache.
+FRAGMENT_FIELDS = (
+    'code', 'bar_code', 'name', 'description', 'subcategory_id', 'brand_id',
+    'price', 'unit_measure_id', 'status',
+)
+
+
 class Product(BaseModel):
     code = models.CharField("Codigo", max_length=50, unique=True)
     bar_code = models.CharField("Codigo de Barras", max_length=50, blank=True, unique=True, null=True)
@@ -101,6 +136,7 @@ class Product(BaseModel):
     stock = models.PositiveIntegerField("Stock", default=0)
     unit_measure = models.ForeignKey(UnitMeasure, on_delete=models.CASCADE, related_name='products')
     last_purchase_price = models.DecimalField("Ultimo Precio de Compra", max_digits=10, decimal_places=2, default=0.00)
+    average_cost = models.DecimalField("Costo Promedio", max_digits=10, decimal_places=2, default=0.00)
     last_buy_date = models.DateField("Ultima Fecha de Compra", blank=True, null=True)
 
 
@@ -109,17 +145,109 @@ class Product(BaseModel):
         verbose_name_plural = "Productos"
         ordering = ['name']
         unique_together = ('subcategory', 'name')
+        indexes = [
+            # icontains genera UPPER(campo) LIKE '%x%', cubierto por los indices trigram
+            GinIndex(OpClass(Upper('name'), name='gin_trgm_ops'), name='product_name_trgm_idx'),
+            GinIndex(OpClass(Upper('code'), name='gin_trgm_ops'), name='product_code_trgm_idx'),
+            GinIndex(SearchVector('name', 'description', config='spanish'), name='product_search_vector_idx'),
+            # Version y deltas del catalogo (applications/inv/catalog.py)
+            models.Index(fields=['updated_at'], name='product_updated_at_idx'),
+        ]
 
     def __str__(self):
         return f'{self.brand.name}: {self.name}'
     
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._catalog_loaded = instance.catalog_values()
+        return instance
+
+    def catalog_values(self):
+        """Valores cargados de FRAGMENT_FIELDS (los diferidos se omiten)"""
+        return {field: self.__dict__[field] for field in FRAGMENT_FIELDS if field in self.__dict__}
+
+    def catalog_changed(self):
+        """Algun campo del catalogo cambio desde que se leyo (un producto nuevo siempre)"""
+        loaded = getattr(self, '_catalog_loaded', None)
+        if loaded is None:
+            return True
+        return any(self.__dict__.get(field) != value for field, value in loaded.items())
+
     def save(self):
         self.name = self.name.upper()
         return super(Product, self).save()
+
+    def sale_cost(self):
+        """Costo unitario a copiar en una linea de venta (promedio o ultimo costo)"""
+        return getattr(self, sale_cost_field())
     
     def toggle_status(self):
         self.status = not self.status
         self.save()
         return self.status
-    
 
+
+class StockSnapshot(BaseModel):
+    """Foto periodica del stock usada como punto de partida para la valorizacion historica"""
+    snapshot_date = models.DateField("Fecha del Snapshot", unique=True)
+
+    class Meta:
+        verbose_name = "Snapshot de Stock"
+        verbose_name_plural = "Snapshots de Stock"
+        ordering = ['-snapshot_date']
+
+    def __str__(self):
+        return f'Snapshot {self.snapshot_date}'
+
+class StockSnapshotItem(models.Model):
+    snapshot = models.ForeignKey(StockSnapshot, on_delete=models.CASCADE, related_name='items')
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='snapshot_items')
+    quantity = models.IntegerField("Cantidad", default=0)
+    unit_cost = models.DecimalField("Costo Unitario", max_digits=10, decimal_places=2, default=0.00)
+
+    class Meta:
+        verbose_name = "Item de Snapshot"
+        verbose_name_plural = "Items de Snapshot"
+        unique_together = ('snapshot', 'product')
+
+    def __str__(self):
+        return f'{self.snapshot.snapshot_date} - {self.product_id}: {self.quantity}'
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+@receiver(post_save, sender=SubCategory)
+@receiver(post_delete, sender=SubCategory)
+@receiver(post_save, sender=Brand)
+@receiver(post_delete, sender=Brand)
+@receiver(post_save, sender=UnitMeasure)
+@receiver(post_delete, sender=UnitMeasure)
+@receiver(post_delete, sender=Product)
+def invalidate_catalog_fragments(sender, **kwargs):
+    """Cualquier cambio en el catalogo invalida los selects y listas cacheadas"""
+    transaction.on_commit(lambda: bump_version(CATALOG))
+
+
+@receiver(post_save, sender=Product)
+def invalidate_catalog_on_product_save(sender, instance, **kwargs):
+    """Un producto invalida la cache solo si cambio un campo de FRAGMENT_FIELDS, no por stock"""
+    if instance.catalog_changed():
+        transaction.on_commit(lambda: bump_version(CATALOG))
+    instance._catalog_loaded = instance.catalog_values()
+
+
+def adjust_stock(quantities, now=None):
+    """Suma a cada producto su cantidad ({id: cantidad}) con un solo UPDATE, sin bajar de cero"""
+    quantities = {pk: quantity for pk, quantity in quantities.items() if quantity}
+    if not quantities:
+        return
+    delta = Case(
+        *[When(pk=pk, then=Value(quantity)) for pk, quantity in quantities.items()],
+        output_field=IntegerField(),
+    )
+    Product.objects.filter(pk__in=quantities).update(
+        stock=Greatest(F('stock') + delta, 0),
+        # update() no aplica auto_now; updated_at versiona el catalogo
+        updated_at=now or timezone.now(),
+    )
@@ -0,0 +1,54 @@
+import csv
+from datetime import datetime
+
+from django.shortcuts import render
+from django.http import HttpResponse
+from django.utils import timezone
+from django.contrib.auth.decorators import login_required
+
+from applications.home.pdf import render_to_pdf
+from applications.home.replica import replica_reads
+from .models import StockSnapshot
+from .valuation import inventory_valuation, GROUP_BY_BRAND, GROUP_BY_CATEGORY
+
+
+@login_required(login_url='/login/')
+def inventory_valuation_filter(request):
+    """Vista para mostrar el formulario de filtros de la valorizacion de inventario"""
+    snapshots = StockSnapshot.objects.values_list('snapshot_date', flat=True)[:12]
+    return render(request, 'inv/valuation_filter.html', {'snapshots': snapshots})
+
+
+@login_required(login_url='/login/')
+@replica_reads
+def inventory_valuation_report(request):
+    """Valorizacion de inventario a una fecha en PDF o CSV"""
+    template_path = 'inv/valuation_report.html'
+    today = timezone.now()
+
+    date_param = request.GET.get('date')
+    try:
+        as_of = datetime.strptime(date_param, '%Y-%m-%d').date() if date_param else timezone.localdate()
+    except ValueError:
+        as_of = timezone.localdate()
+
+    group_by = request.GET.get('group_by')
+    if group_by not in (GROUP_BY_BRAND, GROUP_BY_CATEGORY):
+        group_by = GROUP_BY_CATEGORY
+
+    valuation = inventory_valuation(as_of, group_by)
+
+    if request.GET.get('format') == 'csv':
+        response = HttpResponse(content_type='text/csv')
+        response['Content-Disposition'] = f'attachment; filename="valorizacion_inventario_{as_of}.csv"'
+        writer = csv.writer(response)
+        writer.writerow(['Codigo', 'Producto', 'Categoria' if group_by == GROUP_BY_CATEGORY else 'Marca',
+                         'Cantidad', 'Costo Unitario', 'Valor'])
+        for row in valuation['rows']:
+            writer.writerow([row['code'], row['name'], row['group'], row['quantity'], row['unit_cost'], row['value']])
+        writer.writerow(['', 'TOTAL', '', valuation['total_quantity'], '', valuation['total_value']])
+        return response
+
+    context = dict(valuation, today=today, request=request)
+
+    return render_to_pdf(template_path, context, f'valorizacion_inventario_{as_of}.pdf')
@@ -0,0 +1,49 @@
+from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVector, TrigramSimilarity
+from django.db.models import Case, FloatField, Q, Value, When
+
+from .models import Brand, Product
+
+
+SEARCH_CONFIG = 'spanish'
+
+# Debe coincidir con la expresion de product_search_vector_idx para usar el indice
+PRODUCT_SEARCH_VECTOR = SearchVector('name', 'description', config=SEARCH_CONFIG)
+
+
+def search_products(term, queryset=None):
+    """
+    Busca productos por codigo, codigo de barras, nombre, descripcion o marca
+    y los ordena por relevancia.
+
+    Cada palabra del termino debe aparecer (como subcadena) en el nombre, el
+    codigo o la marca; ademas se aceptan coincidencias de texto completo sobre
+    nombre y descripcion. Las subcadenas usan los indices trigram (pg_trgm) y
+    el texto completo el indice GIN del vector de busqueda.
+    """
+    if queryset is None:
+        queryset = Product.objects.all()
+
+    term = term.strip()
+    if not term:
+        return queryset
+
+    query = SearchQuery(term, config=SEARCH_CONFIG, search_type='websearch')
+
+    words = Q()
+    for word in term.split():
+        # Las marcas son pocas: resolverlas antes evita un join dentro del OR
+        brand_ids = list(Brand.objects.filter(name__icontains=word).values_list('id', flat=True))
+        words &= Q(name__icontains=word) | Q(code__icontains=word) | Q(brand_id__in=brand_ids)
+
+    return queryset.alias(
+        search=PRODUCT_SEARCH_VECTOR,
+    ).filter(
+        Q(code__iexact=term) | Q(bar_code=term) | Q(search=query) | words
+    ).annotate(
+        exact=Case(
+            When(Q(code__iexact=term) | Q(bar_code=term), then=Value(1.0)),
+            default=Value(0.0),
+            output_field=FloatField(),
+        ),
+        rank=SearchRank(PRODUCT_SEARCH_VECTOR, query) + TrigramSimilarity('name', term),
+    ).order_by('-exact', '-rank', 'name')
@@ -1,3 +1,176 @@
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
 from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from applications.home.cache import CATALOG, get_version
+from applications.home.testing import QueryCountMixin, create_admin, create_products
+from applications.purchases.models import PurchaseItem, PurchaseOrder, Supplier
+from applications.sales.models import ControlSequence, Customer, Sale, SaleDetail
+from .catalog import SNAPSHOT_KEY, catalog_snapshot
+from .models import Product, StockSnapshot, StockSnapshotItem, adjust_stock
+from .valuation import stock_as_of, take_stock_snapshot
+
+
+class ListQueryCountTest(QueryCountMixin, TestCase):
+    """Las listas del inventario no deben consultar por cada fila"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_admin()
+        create_products(cls.user, 8)
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def test_category_list(self):
+        self.assertMaxQueries(5, reverse('inv:category_list'))
+
+    def test_sub_category_list(self):
+        self.assertMaxQueries(5, reverse('inv:sub_category_list'))
+
+    def test_brand_list(self):
+        self.assertMaxQueries(5, reverse('inv:brand_list'))
+
+    def test_unit_measure_list(self):
+        self.assertMaxQueries(5, reverse('inv:unit_measure_list'))
+
+    def test_product_list(self):
+        self.assertMaxQueries(5, reverse('inv:products_list'))
+
+
+class CatalogTest(TestCase):
+    """Catalogo versionado con ETag y deltas por updated_at"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_admin()
+        cls.products = create_products(cls.user, 3)
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def test_snapshot_and_etag(self):
+        response = self.client.get(reverse('inv:catalog'))
+        data = response.json()
+        self.assertEqual(data['fields'], ['id', 'code', 'bar_code', 'name', 'price', 'stock'])
+        self.assertEqual(len(data['products']), 3)
+
+        cached = self.client.get(reverse('inv:catalog'), HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(cached.status_code, 304)
+
+    def test_delta_since_version(self):
+        version = self.client.get(reverse('inv:catalog')).json()['version']
+        with mock.patch('applications.inv.catalog.DELTA_OVERLAP', timedelta(0)):
+            self.assertEqual(self.client.get(reverse('inv:catalog_delta'), {'since': version}).json()['products'], [])
+
+            changed, removed = self.products[0], self.products[1]
+            changed.price = 12
+            changed.save()
+            removed.toggle_status()
+            data = self.client.get(reverse('inv:catalog_delta'), {'since': version}).json()
+
+        self.assertEqual([row[0] for row in data['products']], [changed.id])
+        self.assertEqual(data['removed'], [removed.id])
+        self.assertNotEqual(data['version'], version)
+
+    def test_snapshot_keeps_only_latest_version(self):
+        cache.clear()
+        first = catalog_snapshot()
+        product = self.products[0]
+        product.price = 12
+        product.save()
+        second = catalog_snapshot()
+
+        self.assertNotEqual(second['version'], first['version'])
+        self.assertEqual(cache.get(SNAPSHOT_KEY), second)
+        self.assertFalse(cache.has_key(f"catalog_snapshot:{first['version']}"))
+        with self.assertNumQueries(1):
+            self.assertEqual(catalog_snapshot(), second)
+
+    def test_delta_invalid_version(self):
+        response = self.client.get(reverse('inv:catalog_delta'), {'since': 'x'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_stock_changes_keep_cached_fragments(self):
+        version = get_version(CATALOG)
+        product = Product.objects.get(pk=self.products[0].pk)
+        with self.captureOnCommitCallbacks(execute=True):
+            product.stock -= 1
+            product.save()
+            adjust_stock({product.pk: 3})
+        self.assertEqual(get_version(CATALOG), version)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            product.price = 15
+            product.save()
+        self.assertNotEqual(get_version(CATALOG), version)
+
+
+class StockAsOfTest(TestCase):
+    """Stock historico desde el checkpoint mas cercano, hacia adelante o hacia atras"""
+
+    @classmethod
+    def days_ago(cls, days):
+        return timezone.localdate() - timedelta(days=days)
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_admin()
+        cls.product, cls.other = create_products(cls.user, 2)
+        cls.today = timezone.localdate()
+
+        # Snapshot hace 8 dias con 100; compra de 20 hace 5 dias; venta de 5 hace 3 dias
+        snapshot = StockSnapshot.objects.create(snapshot_date=cls.days_ago(8), created_by=cls.user)
+        StockSnapshotItem.objects.bulk_create([
+            StockSnapshotItem(snapshot=snapshot, product=product, quantity=100, unit_cost=4)
+            for product in (cls.product, cls.other)
+        ])
+        supplier = Supplier(name='proveedor', phone='555-0', created_by=cls.user)
+        supplier.save()
+        order = PurchaseOrder(
+            order_date=cls.days_ago(5), buy_date=cls.days_ago(5), order_number='oc-1', supplier=supplier, created_by=cls.user,
+        )
+        order.save()
+        PurchaseItem(purchase_order=order, product=cls.product, quantity=20, unit_price=4, subtotal=80, total_price=80, created_by=cls.user).save()
+
+        ControlSequence.objects.create(name='sale_invoice')
+        customer = Customer(name='cliente', last_name='prueba', dni='00000001', gender=Customer.OTHER, created_by=cls.user)
+        customer.save()
+        sale = Sale(customer=customer, created_by=cls.user)
+        sale.save()
+        SaleDetail(sale=sale, product=cls.product, quantity=5, unit_price=10, subtotal=50, total_price=50, created_by=cls.user).save()
+        Sale.objects.filter(pk=sale.pk).update(date=cls.days_ago(3))
+
+    def quantity(self, days):
+        return stock_as_of(self.days_ago(days))[self.product.pk][0]
+
+    def test_current_stock(self):
+        self.assertEqual(self.quantity(0), 115)
+
+    def test_forward_from_snapshot(self):
+        # Mas cerca del snapshot: 100 + 20 comprados
+        self.assertEqual(self.quantity(5), 120)
+        self.assertEqual(self.quantity(7), 100)
+
+    def test_backward_from_current_stock(self):
+        # Mas cerca de hoy: 115 + 5 vendidos hace 3 dias
+        self.assertEqual(self.quantity(2), 115)
+        self.assertEqual(self.quantity(3), 115)
+        self.assertEqual(stock_as_of(self.days_ago(2))[self.other.pk][0], 100)
+
+    def test_past_snapshot_is_rebuilt_not_current(self):
+        snapshot = take_stock_snapshot(self.days_ago(5), self.user)
+        self.assertEqual(snapshot.items.get(product=self.product).quantity, 120)
 
-# Create your tests here.
+    def test_existing_or_future_snapshot_is_rejected(self):
+        with self.assertRaises(ValueError):
+            take_stock_snapshot(self.days_ago(8), self.user)
+        self.assertEqual(StockSnapshot.objects.get(snapshot_date=self.days_ago(8)).items.get(product=self.product).quantity, 100)
+        with self.assertRaises(CommandError):
+            call_command('take_stock_snapshot', date=(self.today + timedelta(days=1)).isoformat(), stdout=StringIO())
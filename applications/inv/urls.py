@@ -2,6 +2,7 @@ from django.contrib import admin
 from django.urls import path
 
 from . import views
+from . import reports
 
 app_name = 'inv'
 urlpatterns = [
@@ -29,4 +30,10 @@ urlpatterns = [
     path('create_product/', views.CreateProductView.as_view(), name='create_product'),
     path('update_product/<pk>/', views.UpdateProductView.as_view(), name='update_product'),
     path('toggle-product-status/', views.ToggleProductStatusView.as_view(), name='toggle_product_status'),
+    path('product/search/', views.ProductSearchView.as_view(), name='product_search'),
+    path('catalog/', views.catalog_json, name='catalog'),
+    path('catalog/delta/', views.catalog_delta_json, name='catalog_delta'),
+    # Report URLs
+    path('valuation/filter/', reports.inventory_valuation_filter, name='inventory_valuation_filter'),
+    path('valuation/report/', reports.inventory_valuation_report, name='inventory_valuation_report'),
 ]
\ No newline at end of file
@@ -0,0 +1,172 @@
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Sum
+from django.utils import timezone
+
+from .models import Product, StockSnapshot, StockSnapshotItem
+
+
+GROUP_BY_CATEGORY = 'category'
+GROUP_BY_BRAND = 'brand'
+
+
+def _purchased_between(start, end):
+    """Unidades compradas por producto con fecha de compra en (start, end]"""
+    from applications.purchases.models import PurchaseItem
+
+    rows = PurchaseItem.objects.filter(
+        purchase_order__draft=False,
+        purchase_order__buy_date__gt=start,
+        purchase_order__buy_date__lte=end,
+    ).order_by().values('product_id').annotate(qty=Sum('quantity'))
+    return {row['product_id']: row['qty'] for row in rows}
+
+
+def _sold_between(start, end):
+    """Unidades vendidas (items activos) por producto con fecha de venta en (start, end]"""
+    from applications.sales.models import SaleDetail
+
+    rows = SaleDetail.objects.filter(
+        status=True,
+        sale__date__gt=start,
+        sale__date__lte=end,
+    ).order_by().values('product_id').annotate(qty=Sum('quantity'))
+    return {row['product_id']: row['qty'] for row in rows}
+
+
+def _nearest_checkpoint(as_of):
+    """
+    Devuelve el punto de partida mas cercano a la fecha: el snapshot anterior,
+    el snapshot posterior o el stock actual (checkpoint de hoy).
+    """
+    today = timezone.localdate()
+    candidates = [(today, None)]
+
+    before = StockSnapshot.objects.filter(snapshot_date__lte=as_of).order_by('-snapshot_date').first()
+    if before:
+        candidates.append((before.snapshot_date, before))
+    after = StockSnapshot.objects.filter(snapshot_date__gt=as_of).order_by('snapshot_date').first()
+    if after:
+        candidates.append((after.snapshot_date, after))
+
+    return min(candidates, key=lambda c: abs((c[0] - as_of).days))
+
+
+def stock_as_of(as_of):
+    """
+    Calcula el stock y costo unitario por producto a una fecha dada partiendo
+    del checkpoint mas cercano y aplicando solo los movimientos intermedios.
+    Devuelve {product_id: (cantidad, costo_unitario)}.
+    """
+    checkpoint_date, snapshot = _nearest_checkpoint(as_of)
+
+    if snapshot is None:
+        base = {
+            pk: (stock, cost)
+            for pk, stock, cost in Product.objects.values_list('id', 'stock', 'last_purchase_price')
+        }
+    else:
+        base = {
+            pk: (qty, cost)
+            for pk, qty, cost in snapshot.items.values_list('product_id', 'quantity', 'unit_cost')
+        }
+
+    if checkpoint_date == as_of:
+        return base
+
+    # Hacia adelante se suman compras y restan ventas, hacia atras lo contrario
+    if checkpoint_date < as_of:
+        sign = 1
+        purchased = _purchased_between(checkpoint_date, as_of)
+        sold = _sold_between(checkpoint_date, as_of)
+    else:
+        sign = -1
+        purchased = _purchased_between(as_of, checkpoint_date)
+        sold = _sold_between(as_of, checkpoint_date)
+
+    missing = (set(purchased) | set(sold)) - set(base)
+    if missing:
+        for pk, cost in Product.objects.filter(pk__in=missing).values_list('id', 'last_purchase_price'):
+            base[pk] = (0, cost)
+
+    result = {}
+    for pk, (qty, cost) in base.items():
+        delta = purchased.get(pk, 0) - sold.get(pk, 0)
+        result[pk] = (qty + sign * delta, cost)
+    return result
+
+
+def inventory_valuation(as_of, group_by=GROUP_BY_CATEGORY):
+    """
+    Valorizacion de inventario (cantidad x ultimo precio de compra) a una
+    fecha, agrupada por categoria o marca.
+    """
+    stock = stock_as_of(as_of)
+    group_field = 'brand__name' if group_by == GROUP_BY_BRAND else 'subcategory__category__name'
+
+    products = Product.objects.values_list('id', 'code', 'name', group_field).order_by(group_field, 'name')
+
+    rows = []
+    groups = {}
+    total_quantity = 0
+    total_value = Decimal('0.00')
+    for pk, code, name, group_name in products:
+        quantity, unit_cost = stock.get(pk, (0, Decimal('0.00')))
+        if not quantity:
+            continue
+        value = Decimal(quantity) * unit_cost
+        rows.append({
+            'code': code,
+            'name': name,
+            'group': group_name,
+            'quantity': quantity,
+            'unit_cost': unit_cost,
+            'value': value,
+        })
+        group = groups.setdefault(group_name, {'name': group_name, 'products': 0, 'quantity': 0, 'value': Decimal('0.00')})
+        group['products'] += 1
+        group['quantity'] += quantity
+        group['value'] += value
+        total_quantity += quantity
+        total_value += value
+
+    return {
+        'as_of': as_of,
+        'group_by': group_by,
+        'rows': rows,
+        'groups': sorted(groups.values(), key=lambda g: g['value'], reverse=True),
+        'total_quantity': total_quantity,
+        'total_value': total_value,
+    }
+
+
+def take_stock_snapshot(snapshot_date, user):
+    """
+    Guarda el stock de todos los productos como snapshot de la fecha. Hoy se
+    toma el stock actual (reemplaza el snapshot de hoy); una fecha pasada se
+    reconstruye con stock_as_of y no reemplaza un snapshot existente, porque
+    es el punto de partida de la valorizacion historica. ValueError si la
+    fecha es futura o ya tiene snapshot.
+    """
+    today = timezone.localdate()
+    if snapshot_date > today:
+        raise ValueError('No se puede tomar un snapshot de una fecha futura')
+    if snapshot_date < today and StockSnapshot.objects.filter(snapshot_date=snapshot_date).exists():
+        raise ValueError(f'Ya existe un snapshot del {snapshot_date}')
+
+    with transaction.atomic():
+        if snapshot_date == today:
+            StockSnapshot.objects.filter(snapshot_date=snapshot_date).delete()
+            rows = Product.objects.values_list('id', 'stock', 'last_purchase_price').iterator(chunk_size=5000)
+        else:
+            rows = ((pk, qty, cost) for pk, (qty, cost) in stock_as_of(snapshot_date).items())
+        snapshot = StockSnapshot.objects.create(snapshot_date=snapshot_date, created_by=user)
+        StockSnapshotItem.objects.bulk_create(
+            (
+                StockSnapshotItem(snapshot=snapshot, product_id=pk, quantity=stock, unit_cost=cost)
+                for pk, stock, cost in rows
+            ),
+            batch_size=5000,
+        )
+    return snapshot
@@ -1,13 +1,21 @@
+from asgiref.sync import sync_to_async
+
 from django.shortcuts import render
 from django.views.generic import ListView, CreateView, UpdateView, DeleteView, View
 from django.urls import reverse_lazy
 from django.contrib.auth.mixins import LoginRequiredMixin, PermissionRequiredMixin
 from django.contrib import messages
 from django.http import JsonResponse
+from django.contrib.auth.decorators import login_required
+from django.views.decorators.cache import cache_control
+from django.views.decorators.gzip import gzip_page
+from django.views.decorators.http import condition
 
 from .models import Category, SubCategory, Brand, UnitMeasure, Product
 from .forms import CategoryForm, SubCategoryForm, BrandForm, UnitMeasureForm, ProductForm
-from applications.home.mixins import AdminRequiredMixin, SellerRequiredMixin
+from .search import search_products
+from .catalog import catalog_delta, catalog_snapshot, catalog_version
+from applications.home.mixins import AdminRequiredMixin, SellerRequiredMixin, AsyncAdminRequiredMixin, AsyncLoginRequiredMixin, AsyncToggleStatusMixin, ReplicaReadMixin
 # Create your views here.
 
 # Category Views
@@ -34,16 +42,11 @@ class CreateCategoryView(LoginRequiredMixin, AdminRequiredMixin, CreateView):
         )
         return response
     
-class ToggleCategoryStatusView(AdminRequiredMixin, View):
-    def post(self, request, *args, **kwargs):
-        category_id = request.POST.get('category_id')
-        try:
-            category = Category.objects.get(id=category_id)
-            new_status = category.toggle_status()
-
-            return JsonResponse({'success': True, 'new_status': new_status, 'category_name': category.name})
-        except Category.DoesNotExist:
-            return JsonResponse({'success': False, 'error': 'Categoría no encontrada'})
+class ToggleCategoryStatusView(AsyncAdminRequiredMixin, AsyncToggleStatusMixin, View):
+    model = Category
+    id_param = 'category_id'
+    name_key = 'category_name'
+    not_found_error = 'Categoría no encontrada'
         
 class UpdateCategoryView(LoginRequiredMixin, AdminRequiredMixin, UpdateView):
     model = Category
@@ -65,6 +68,7 @@ class UpdateCategoryView(LoginRequiredMixin, AdminRequiredMixin, UpdateView):
 
 class SubCategoryListView(LoginRequiredMixin, AdminRequiredMixin, ListView):
     model = SubCategory
+    queryset = SubCategory.objects.select_related('category')
     template_name = 'inv/sub_category_list.html'
     context_object_name = 'subcategories'
     login_url = reverse_lazy('home:login')
@@ -86,15 +90,11 @@ class CreateSubCategoryView(LoginRequiredMixin, AdminRequiredMixin, CreateView):
         return response
     
 
-class ToggleSubCategoryStatusView(AdminRequiredMixin, View):
-    def post(self, request, *args, **kwargs):
-        sub_category_id = request.POST.get('sub_category_id')
-        try:
-            subcategory = SubCategory.objects.get(id=sub_category_id)
-            new_status = subcategory.toggle_status()
-            return JsonResponse({'success': True, 'new_status': new_status, 'sub_category_name': subcategory.name})
-        except SubCategory.DoesNotExist:
-            return JsonResponse({'success': False, 'error': 'Sub Categoría no encontrada'})
+class ToggleSubCategoryStatusView(AsyncAdminRequiredMixin, AsyncToggleStatusMixin, View):
+    model = SubCategory
+    id_param = 'sub_category_id'
+    name_key = 'sub_category_name'
+    not_found_error = 'Sub Categoría no encontrada'
         
 class UpdateSubCategoryView(LoginRequiredMixin, AdminRequiredMixin, UpdateView):
     model = SubCategory
@@ -136,16 +136,11 @@ class CreateBrandView(LoginRequiredMixin, AdminRequiredMixin, CreateView):
         return response
     
 
-class ToggleBrandStatusView(AdminRequiredMixin, View):
-    def post(self, request, *args, **kwargs):
-        brand_id = request.POST.get('brand_id')
-        try:
-            brand = Brand.objects.get(id=brand_id)
-            new_status = brand.toggle_status()
-            return JsonResponse({'success': True, 'new_status': new_status, 'brand_name': brand.name})
-            
-        except Brand.DoesNotExist:
-            return JsonResponse({'success': False, 'error': 'Marca no encontrada'})
+class ToggleBrandStatusView(AsyncAdminRequiredMixin, AsyncToggleStatusMixin, View):
+    model = Brand
+    id_param = 'brand_id'
+    name_key = 'brand_name'
+    not_found_error = 'Marca no encontrada'
         
 class UpdateBrandView(LoginRequiredMixin, AdminRequiredMixin, UpdateView):
     model = Brand
@@ -186,15 +181,11 @@ class CreateUnitMeasureView(LoginRequiredMixin, AdminRequiredMixin, CreateView):
         )
         return response
     
-class ToggleUnitMeasureStatusView(AdminRequiredMixin, View):
-    def post(self, request, *args, **kwargs):
-        unit_measure_id = request.POST.get('unit_measure_id')
-        try:
-            unit_measure = UnitMeasure.objects.get(id=unit_measure_id)
-            new_status = unit_measure.toggle_status()
-            return JsonResponse({'success': True, 'new_status': new_status, 'unit_measure_name': unit_measure.name})
-        except Brand.DoesNotExist:
-            return JsonResponse({'success': False, 'error': 'Unidad de medida no encontrada'})
+class ToggleUnitMeasureStatusView(AsyncAdminRequiredMixin, AsyncToggleStatusMixin, View):
+    model = UnitMeasure
+    id_param = 'unit_measure_id'
+    name_key = 'unit_measure_name'
+    not_found_error = 'Unidad de medida no encontrada'
         
 class UpdateUnitMeasureView(LoginRequiredMixin, AdminRequiredMixin, UpdateView):
     model = UnitMeasure
@@ -213,12 +204,24 @@ class UpdateUnitMeasureView(LoginRequiredMixin, AdminRequiredMixin, UpdateView):
         return response
     
 # Product Views
-class ProductListView(LoginRequiredMixin, ListView):
+class ProductListView(LoginRequiredMixin, ReplicaReadMixin, ListView):
     model = Product
     template_name = 'inv/products_list.html'
     context_object_name = 'products'
     login_url = reverse_lazy('home:login')
 
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        term = self.request.GET.get('q', '').strip()
+        if term:
+            queryset = search_products(term, queryset)
+        return queryset
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['q'] = self.request.GET.get('q', '').strip()
+        return context
+
 class CreateProductView(LoginRequiredMixin, AdminRequiredMixin, CreateView):
     model = Product
     form_class = ProductForm
@@ -235,15 +238,11 @@ class CreateProductView(LoginRequiredMixin, AdminRequiredMixin, CreateView):
         )
         return response
     
-class ToggleProductStatusView(AdminRequiredMixin, View):
-    def post(self, request, *args, **kwargs):
-        product_id = request.POST.get('product_id')
-        try:
-            product = Product.objects.get(id=product_id)
-            new_status = product.toggle_status()
-            return JsonResponse({'success': True, 'new_status': new_status, 'product_name': product.name})
-        except Product.DoesNotExist:
-            return JsonResponse({'success': False, 'error': 'Producto no encontrada'})
+class ToggleProductStatusView(AsyncAdminRequiredMixin, AsyncToggleStatusMixin, View):
+    model = Product
+    id_param = 'product_id'
+    name_key = 'product_name'
+    not_found_error = 'Producto no encontrada'
         
 class UpdateProductView(AdminRequiredMixin, LoginRequiredMixin, UpdateView):
     model = Product
@@ -259,4 +258,59 @@ class UpdateProductView(AdminRequiredMixin, LoginRequiredMixin, UpdateView):
             self.request, 
             f'✅ El producto "{form.instance.name}" ha sido Actualizado exitosamente.'
         )
-        return response
\ No newline at end of file
+        return response
+
+class ProductSearchView(AsyncLoginRequiredMixin, View):
+    """Busqueda de productos activos por codigo, codigo de barras, nombre o marca (AJAX)"""
+    max_results = 20
+
+    async def get(self, request, *args, **kwargs):
+        term = request.GET.get('q', '').strip()
+        if not term:
+            return JsonResponse({'products': []})
+
+        # search_products consulta las marcas al armar el filtro
+        products = await sync_to_async(search_products)(term, Product.objects.filter(status=True))
+        products = products.values('id', 'code', 'bar_code', 'name', 'price', 'stock')[:self.max_results]
+
+        data = [
+            {
+                'id': product['id'],
+                'code': product['code'],
+                'bar_code': product['bar_code'],
+                'name': product['name'],
+                'price': str(product['price']),
+                'stock': product['stock'],
+            }
+            async for product in products
+        ]
+        return JsonResponse({'products': data})
+
+
+def _catalog_etag(request, **kwargs):
+    # La version se guarda en el request para no consultarla de nuevo en la vista
+    request.catalog_version = catalog_version()
+    since = request.GET.get('since')
+    return f'{request.catalog_version}-{since}' if since else request.catalog_version
+
+
+@login_required(login_url='/login/')
+@gzip_page
+@cache_control(private=True, no_cache=True)
+@condition(etag_func=_catalog_etag)
+def catalog_json(request):
+    """Catalogo activo compacto y versionado; responde 304 si el ETag no cambio"""
+    return JsonResponse(catalog_snapshot(request.catalog_version))
+
+
+@login_required(login_url='/login/')
+@gzip_page
+@cache_control(private=True, no_cache=True)
+@condition(etag_func=_catalog_etag)
+def catalog_delta_json(request):
+    """Solo los productos que cambiaron desde ?since=<version>"""
+    try:
+        data = catalog_delta(request.GET['since'], request.catalog_version)
+    except (KeyError, ValueError, OverflowError):
+        return JsonResponse({'error': 'Version invalida'}, status=400)
+    return JsonResponse(data)
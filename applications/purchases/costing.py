@@ -0,0 +1,163 @@
+from collections import defaultdict
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import Case, DecimalField, F, IntegerField, OuterRef, Subquery, Sum, Value, When
+from django.db.models.functions import Greatest, Round
+from django.utils import timezone
+
+from applications.home.money import ZERO, divide, money
+from applications.inv.models import Product
+from applications.inv.valuation import stock_as_of
+
+
+# Costo neto de un item: subtotal menos descuento (el impuesto no es costo)
+NET_VALUE = F('subtotal') - F('discount')
+
+COST_FIELD = DecimalField(max_digits=10, decimal_places=2)
+
+
+def receipts_by_product(items):
+    """{producto: (cantidad, valor neto)} de un queryset de PurchaseItem"""
+    rows = items.order_by().values('product_id').annotate(qty=Sum('quantity'), value=Sum(NET_VALUE))
+    return {row['product_id']: (row['qty'], row['value']) for row in rows}
+
+
+def _per_product(values, output_field):
+    return Case(
+        *[When(pk=pk, then=Value(value)) for pk, value in values.items()],
+        output_field=output_field,
+    )
+
+
+def apply_receipts(receipts, buy_date=None, now=None):
+    """
+    Entrada de mercaderia: suma el stock y actualiza el costo promedio
+    ponderado y el ultimo precio de compra de cada producto con un solo
+    UPDATE. receipts es {producto: (cantidad, valor neto)}. El promedio usa el
+    stock anterior a la entrada (en el UPDATE las columnas valen lo previo).
+    """
+    receipts = {pk: (qty, value) for pk, (qty, value) in receipts.items() if qty}
+    if not receipts:
+        return
+    qty = _per_product({pk: qty for pk, (qty, _) in receipts.items()}, IntegerField())
+    value = _per_product({pk: value for pk, (_, value) in receipts.items()}, COST_FIELD)
+    updates = {
+        'stock': F('stock') + qty,
+        'average_cost': Round((F('stock') * F('average_cost') + value) / (F('stock') + qty), 2, output_field=COST_FIELD),
+        'last_purchase_price': Round(value / qty, 2, output_field=COST_FIELD),
+        # update() no aplica auto_now; updated_at versiona el catalogo
+        'updated_at': now or timezone.now(),
+    }
+    if buy_date:
+        updates['last_buy_date'] = buy_date
+    Product.objects.filter(pk__in=receipts).update(**updates)
+
+
+def reverse_receipts(removals, now=None):
+    """
+    Borrado de items recibidos: descuenta el stock y quita su valor del costo
+    promedio con un solo UPDATE. Si no queda stock el promedio se conserva.
+    """
+    removals = {pk: (qty, value) for pk, (qty, value) in removals.items() if qty}
+    if not removals:
+        return
+    qty = _per_product({pk: qty for pk, (qty, _) in removals.items()}, IntegerField())
+    average = Case(
+        *[
+            When(
+                pk=pk, stock__gt=removed,
+                then=Greatest(
+                    Round((F('stock') * F('average_cost') - Value(value)) / (F('stock') - removed), 2, output_field=COST_FIELD),
+                    Value(ZERO),
+                ),
+            )
+            for pk, (removed, value) in removals.items()
+        ],
+        default=F('average_cost'),
+        output_field=COST_FIELD,
+    )
+    Product.objects.filter(pk__in=removals).update(
+        stock=Greatest(F('stock') - qty, 0),
+        average_cost=average,
+        updated_at=now or timezone.now(),
+    )
+
+
+def stamp_item_costs(items):
+    """Guarda en cada item el costo promedio resultante de su entrada (un UPDATE)"""
+    average = Product.objects.filter(pk=OuterRef('product_id')).order_by().values('average_cost')[:1]
+    items.update(cost=Subquery(average))
+
+
+def recompute_costs(start, end, update_sales=False):
+    """
+    Recalcula en una pasada el costo promedio desde start hasta end: parte
+    del stock a la vispera de start (inv.valuation.stock_as_of) y del costo
+    del ultimo item recibido antes, recorre por dia las entradas y las ventas
+    y guarda el costo de cada item recibido. Si end es hoy actualiza tambien
+    Product.average_cost; con update_sales reescribe el costo de las lineas
+    de venta del rango. Devuelve (items, productos, lineas) actualizados.
+    """
+    from applications.sales.models import SaleDetail
+    from .models import PurchaseItem
+
+    on_hand = {pk: qty for pk, (qty, _) in stock_as_of(start - timedelta(days=1)).items()}
+    previous_cost = PurchaseItem.objects.filter(
+        product=OuterRef('pk'), purchase_order__draft=False, purchase_order__buy_date__lt=start,
+    ).order_by('-purchase_order__buy_date', '-id').values('cost')[:1]
+    average = {
+        pk: cost if cost is not None else fallback
+        for pk, cost, fallback in Product.objects.annotate(previous=Subquery(previous_cost))
+        .values_list('id', 'previous', 'average_cost')
+    }
+
+    # Eventos del rango agrupados por dia: entradas por item, ventas por producto
+    events = defaultdict(lambda: ([], {}))
+    items = PurchaseItem.objects.filter(
+        purchase_order__draft=False, purchase_order__buy_date__range=(start, end),
+    ).values_list('id', 'product_id', 'quantity', 'subtotal', 'discount', 'purchase_order__buy_date')
+    for pk, product_id, qty, subtotal, discount, day in items.order_by('purchase_order__buy_date', 'id'):
+        events[day][0].append((pk, product_id, qty, subtotal - discount))
+    sold = SaleDetail.objects.filter(status=True, sale__date__range=(start, end)).order_by().values(
+        'sale__date', 'product_id',
+    ).annotate(qty=Sum('quantity'))
+    for row in sold:
+        events[row['sale__date']][1][row['product_id']] = row['qty']
+
+    item_costs, sale_costs, received = {}, {}, set()
+    for day in sorted(events):
+        receipts, sales = events[day]
+        # Lo recibido en el dia entra antes de lo vendido
+        for pk, product_id, qty, value in receipts:
+            stock = max(on_hand.get(product_id, 0), 0)
+            cost = average.get(product_id, ZERO)
+            average[product_id] = divide(stock * cost + value, stock + qty) if stock + qty else money(cost)
+            on_hand[product_id] = stock + qty
+            item_costs[pk] = average[product_id]
+            received.add(product_id)
+        for product_id, qty in sales.items():
+            on_hand[product_id] = on_hand.get(product_id, 0) - qty
+            sale_costs.setdefault(day, {})[product_id] = average.get(product_id, ZERO)
+
+    with transaction.atomic():
+        if item_costs:
+            PurchaseItem.objects.filter(pk__in=item_costs).update(cost=_per_product(item_costs, COST_FIELD))
+        products = 0
+        if end >= timezone.localdate():
+            changed = {pk: average[pk] for pk in received}
+            if changed:
+                products = Product.objects.filter(pk__in=changed).update(
+                    average_cost=_per_product(changed, COST_FIELD), updated_at=timezone.now(),
+                )
+        lines = 0
+        if update_sales:
+            # Un UPDATE por dia con ventas
+            for day, costs in sale_costs.items():
+                lines += SaleDetail.objects.filter(sale__date=day, product_id__in=costs).update(
+                    unit_cost=Case(
+                        *[When(product_id=pk, then=Value(cost)) for pk, cost in costs.items()],
+                        output_field=COST_FIELD,
+                    ),
+                )
+    return len(item_costs), products, lines
@@ -6,13 +6,14 @@ from .models import Supplier, PurchaseOrder, PurchaseItem
 class SupplierForm(forms.ModelForm):
     class Meta:
         model = Supplier
-        fields = ['name', 'contact_person', 'phone', 'email', 'address', 'status']
+        fields = ['name', 'contact_person', 'phone', 'email', 'address', 'lead_time_days', 'status']
         widgets = {
             'name': forms.TextInput(attrs={'class': 'form-control', 'placeholder': 'Ingrese el nombre del proveedor...'}),
             'contact_person': forms.TextInput(attrs={'class': 'form-control', 'placeholder': 'Ingrese el nombre del contacto...'}),
             'phone': forms.TextInput(attrs={'class': 'form-control', 'unique': True, 'placeholder': 'Ingrese el telefono...'}),
             'email': forms.EmailInput(attrs={'class': 'form-control', 'placeholder': 'Ingrese el correo electronico...', 'unique': True}),
             'address': forms.Textarea(attrs={'class': 'form-control', 'placeholder': 'Ingrese la direccion...', 'rows': 3}),
+            'lead_time_days': forms.NumberInput(attrs={'class': 'form-control', 'min': '0'}),
         }
         labels = {
             'name': 'Proveedor',
@@ -20,6 +21,7 @@ class SupplierForm(forms.ModelForm):
             'phone': 'Telefono',
             'email': 'Email Address',
             'address': 'Direccion',
+            'lead_time_days': 'Dias de Entrega',
         }
 
 
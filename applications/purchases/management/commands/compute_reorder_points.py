@@ -0,0 +1,17 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from applications.purchases.reorder import compute_reorder_points
+
+
+class Command(BaseCommand):
+    help = 'Recalcula los puntos de reorden y cantidades sugeridas (programar cada noche)'
+
+    def handle(self, *args, **options):
+        start = time.perf_counter()
+        updated, removed = compute_reorder_points()
+        elapsed = time.perf_counter() - start
+        self.stdout.write(self.style.SUCCESS(
+            f'Puntos de reorden: {updated} actualizados, {removed} eliminados en {elapsed:.2f}s'
+        ))
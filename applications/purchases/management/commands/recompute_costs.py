@@ -0,0 +1,34 @@
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from applications.purchases.costing import recompute_costs
+
+
+class Command(BaseCommand):
+    help = (
+        'Recalcula en una pasada el costo promedio ponderado de los items de compra recibidos '
+        'en un rango de fechas (y de los productos si el rango llega a hoy)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--from', dest='start', required=True, help='Primer dia del rango (YYYY-MM-DD)')
+        parser.add_argument('--to', dest='end', help='Ultimo dia del rango (YYYY-MM-DD), por defecto hoy')
+        parser.add_argument('--update-sales', action='store_true', help='Reescribir tambien el costo de las lineas de venta del rango')
+
+    def handle(self, *args, **options):
+        try:
+            start = datetime.strptime(options['start'], '%Y-%m-%d').date()
+            end = datetime.strptime(options['end'], '%Y-%m-%d').date() if options['end'] else timezone.localdate()
+        except ValueError:
+            raise CommandError('Formato de fecha invalido, use YYYY-MM-DD')
+        if start > end:
+            raise CommandError('--from no puede ser posterior a --to')
+
+        items, products, lines = recompute_costs(start, end, update_sales=options['update_sales'])
+        self.stdout.write(f'Items de compra: {items}')
+        self.stdout.write(f'Productos: {products}')
+        if options['update_sales']:
+            self.stdout.write(f'Lineas de venta: {lines}')
+        self.stdout.write(self.style.SUCCESS(f'Costos recalculados del {start} al {end}'))
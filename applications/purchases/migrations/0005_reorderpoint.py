@@ -0,0 +1,42 @@
+# Generated by Django 5.2.5 on 2026-10-19 13:00
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inv', '0008_stocksnapshot'),
+        ('purchases', '0004_alter_purchaseitem_discount_alter_purchaseitem_tax_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='purchaseorder',
+            name='draft',
+            field=models.BooleanField(default=False, verbose_name='Borrador'),
+        ),
+        migrations.AddField(
+            model_name='supplier',
+            name='lead_time_days',
+            field=models.PositiveIntegerField(default=7, verbose_name='Tiempo de Entrega (dias)'),
+        ),
+        migrations.CreateModel(
+            name='ReorderPoint',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('daily_velocity', models.DecimalField(decimal_places=3, default=0, max_digits=10, verbose_name='Venta Diaria')),
+                ('lead_time_days', models.PositiveIntegerField(default=0, verbose_name='Tiempo de Entrega (dias)')),
+                ('reorder_point', models.PositiveIntegerField(default=0, verbose_name='Punto de Reorden')),
+                ('suggested_quantity', models.PositiveIntegerField(default=0, verbose_name='Cantidad Sugerida')),
+                ('computed_at', models.DateTimeField(verbose_name='Fecha de Calculo')),
+                ('product', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='reorder', to='inv.product', verbose_name='Producto')),
+                ('supplier', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='purchases.supplier', verbose_name='Proveedor')),
+            ],
+            options={
+                'verbose_name': 'Punto de Reorden',
+                'verbose_name_plural': 'Puntos de Reorden',
+            },
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.5 on 2026-10-19 13:24
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('purchases', '0005_reorderpoint'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='purchaseorder',
+            index=models.Index(fields=['buy_date', 'id'], name='purchase_buy_date_id_idx'),
+        ),
+    ]
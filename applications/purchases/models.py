@@ -1,10 +1,14 @@
-from django.db import models
+from django.db import models, transaction
 from django.db.models.signals import post_save, post_delete
 from django.dispatch import receiver
 from django.db.models import Sum
+from django.utils import timezone
 
+from applications.home.batching import batched_changes, record_change
 from applications.home.models import BaseModel
+from applications.home.money import document_total, line_totals, money
 from applications.inv.models import Product
+from .costing import apply_receipts, receipts_by_product, reverse_receipts, stamp_item_costs
 
 
 # Create your models here.
@@ -15,6 +19,7 @@ class Supplier(BaseModel):
     phone = models.CharField(max_length=20, verbose_name='Telefono', blank=True, null=True, unique=True)
     email = models.EmailField(verbose_name='Email Address', blank=True, null=True, unique=True)
     address = models.TextField(verbose_name='Direccion', blank=True, null=True)
+    lead_time_days = models.PositiveIntegerField(verbose_name='Tiempo de Entrega (dias)', default=7)
 
     class Meta:
         verbose_name = 'Proveedor'
@@ -41,26 +46,52 @@ class PurchaseOrder(BaseModel):
         discount = models.DecimalField(max_digits=10, decimal_places=2, verbose_name='Descuento', default=0.00)
         tax = models.DecimalField(max_digits=10, decimal_places=2, verbose_name='Impuesto', default=0.00)
         supplier = models.ForeignKey(Supplier, on_delete=models.CASCADE, verbose_name='Proveedor')
+        draft = models.BooleanField(verbose_name='Borrador', default=False)
         
         total_amount = models.DecimalField(max_digits=10, decimal_places=2, verbose_name='Monto Total')
 
         class Meta:
             verbose_name = 'Orden de Compra'
             verbose_name_plural = 'Ordenes de Compra'
+            indexes = [
+                # Paginacion por keyset del listado de compras
+                models.Index(fields=['buy_date', 'id'], name='purchase_buy_date_id_idx'),
+            ]
 
         def __str__(self):
             return self.order_number
 
         def save(self):
             self.order_number = self.order_number.upper()
-            self.total_amount = self.subtotal - self.discount + self.tax
+            self.total_amount = document_total(self.subtotal, self.discount, self.tax)
             return super(PurchaseOrder, self).save()
 
         def toggle_status(self):
             self.status = not self.status
             self.save()
             return self.status
+
+        def receive(self, user):
+            """Confirma un borrador y aplica su stock y costo promedio"""
+            with transaction.atomic():
+                # La mercaderia entra hoy, no el dia en que se creo el borrador: la
+                # valoracion historica y el recalculo de costos ordenan por buy_date
+                self.buy_date = timezone.localdate()
+                # Stock, costo promedio y ultimo precio en un UPDATE para toda la orden
+                apply_receipts(receipts_by_product(self.items.all()), buy_date=self.buy_date)
+                stamp_item_costs(self.items.all())
+                self.draft = False
+                self.modified_by = user.id
+                self.save()
         
+class PurchaseItemQuerySet(models.QuerySet):
+    """Borrado de items con un solo recalculo de stock y ordenes por lote"""
+
+    def delete(self):
+        with transaction.atomic(using=self.db), batched_changes():
+            return super().delete()
+
+
 class PurchaseItem(BaseModel):
     purchase_order = models.ForeignKey(PurchaseOrder, on_delete=models.CASCADE, verbose_name='Orden de Compra', related_name='items')
     product = models.ForeignKey(Product, on_delete=models.CASCADE, verbose_name='Producto')
@@ -72,6 +103,8 @@ class PurchaseItem(BaseModel):
     total_price = models.DecimalField(max_digits=10, decimal_places=2, verbose_name='Precio Total')
     cost = models.DecimalField(max_digits=10, decimal_places=2, verbose_name='Costo', default=0.00)
 
+    objects = PurchaseItemQuerySet.as_manager()
+
     class Meta:
         verbose_name = 'Item de Compra'
         verbose_name_plural = 'Items de Compra'
@@ -80,39 +113,66 @@ class PurchaseItem(BaseModel):
         return f"{self.product} - {self.purchase_order.order_number}"
 
     def save(self):
-        self.subtotal = float(self.quantity) * float(self.unit_price)
-        self.total_price = self.subtotal - float(self.discount) + float(self.tax)
+        self.subtotal, self.total_price = line_totals(self.quantity, self.unit_price, self.tax, self.discount)
         return super(PurchaseItem, self).save()
     
+class ReorderPoint(models.Model):
+    """Punto de reorden precalculado por producto (ver compute_reorder_points)"""
+    product = models.OneToOneField(Product, on_delete=models.CASCADE, related_name='reorder', verbose_name='Producto')
+    supplier = models.ForeignKey(Supplier, on_delete=models.SET_NULL, null=True, blank=True, verbose_name='Proveedor')
+    daily_velocity = models.DecimalField(max_digits=10, decimal_places=3, verbose_name='Venta Diaria', default=0)
+    lead_time_days = models.PositiveIntegerField(verbose_name='Tiempo de Entrega (dias)', default=0)
+    reorder_point = models.PositiveIntegerField(verbose_name='Punto de Reorden', default=0)
+    suggested_quantity = models.PositiveIntegerField(verbose_name='Cantidad Sugerida', default=0)
+    computed_at = models.DateTimeField(verbose_name='Fecha de Calculo')
+
+    class Meta:
+        verbose_name = 'Punto de Reorden'
+        verbose_name_plural = 'Puntos de Reorden'
+
+    def __str__(self):
+        return f"{self.product_id} - {self.reorder_point}"
+
+def recompute_purchase_totals(order_ids):
+    """Recalcula los totales de las ordenes con una consulta de agregados por lote"""
+    totals = {
+        row['purchase_order']: row
+        for row in PurchaseItem.objects.filter(purchase_order__in=order_ids).order_by()
+        .values('purchase_order').annotate(Sum('subtotal'), Sum('discount'), Sum('tax'))
+    }
+    for order in PurchaseOrder.objects.filter(pk__in=order_ids):
+        row = totals.get(order.pk, {})
+        order.subtotal = row.get('subtotal__sum') or 0
+        order.discount = row.get('discount__sum') or 0
+        order.tax = row.get('tax__sum') or 0
+        order.save()
+
+
+def apply_purchase_item_deletes(changes):
+    """Descuenta stock y costo de los items borrados de ordenes recibidas y recalcula sus ordenes"""
+    order_ids = {order_id for order_id, _, _, _ in changes}
+    # Los borradores no han movido stock ni costo
+    received = set(PurchaseOrder.objects.filter(pk__in=order_ids, draft=False).values_list('pk', flat=True))
+    removals = {}
+    for order_id, product_id, quantity, value in changes:
+        if order_id in received:
+            qty, total = removals.get(product_id, (0, 0))
+            removals[product_id] = (qty + quantity, total + value)
+    reverse_receipts(removals)
+    recompute_purchase_totals(order_ids)
+
+
 @receiver(post_delete, sender=PurchaseItem)
 def update_purchase_oder_delete(sender, instance, **kwargs):
-    id_product = instance.product.id
-    id_purchase = instance.purchase_order.id
-
-    header = PurchaseItem.objects.filter(pk=id_purchase).first()
-    if header:
-            sub_total = PurchaseItem.objects.filter(purchase_order=id_purchase).aggregate(Sum('subtotal'))
-            discount = PurchaseItem.objects.filter(purchase_order=id_purchase).aggregate(Sum('discount'))
-            tax = PurchaseItem.objects.filter(purchase_order=id_purchase).aggregate(Sum('tax'))
-            header.subtotal = sub_total["subtotal__sum"]
-            header.discount = discount["discount__sum"]
-            header.tax = tax["tax__sum"]
-            header.save()
-    
-    product = Product.objects.filter(pk=id_product).first()
-    if product:
-        quantity = float(product.stock) - float(instance.quantity)
-        product.stock = quantity
-        product.save()
+    value = money(instance.subtotal) - money(instance.discount)
+    record_change(apply_purchase_item_deletes, (instance.purchase_order_id, instance.product_id, instance.quantity, value))
 
 @receiver(post_save, sender=PurchaseItem)
 def update_purchase_oder_save(sender, instance, created, **kwargs):
-    id_product = instance.product.id
-    buy_date = instance.purchase_order.buy_date
-    
-    product = Product.objects.filter(pk=id_product).first()
-    if product:
-        quantity = float(product.stock) + float(instance.quantity)
-        product.stock = quantity
-        product.last_buy_date = buy_date
-        product.save()
\ No newline at end of file
+    # El stock de un borrador se aplica al recibir la orden
+    if instance.purchase_order.draft:
+        return
+
+    value = money(instance.subtotal) - money(instance.discount)
+    apply_receipts({instance.product_id: (int(instance.quantity), value)}, buy_date=instance.purchase_order.buy_date)
+    stamp_item_costs(PurchaseItem.objects.filter(pk=instance.pk))
@@ -0,0 +1,166 @@
+import math
+from datetime import timedelta
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Sum, OuterRef, Subquery
+from django.utils import timezone
+
+from applications.inv.models import Product
+from applications.sales.models import SaleDetail
+from .models import PurchaseOrder, PurchaseItem, ReorderPoint
+
+
+def compute_reorder_points():
+    """
+    Recalcula los puntos de reorden de todo el catalogo activo.
+
+    La velocidad de venta sale de una sola consulta agrupada sobre SaleDetail
+    y el proveedor/tiempo de entrega de la ultima compra recibida de cada
+    producto. Lo pedido en ordenes en borrador (aun no recibidas) cuenta como
+    stock en camino y se descuenta de la sugerencia. Solo se escriben las
+    filas cuyo resultado cambio.
+    Devuelve (filas actualizadas, filas eliminadas).
+    """
+    today = timezone.localdate()
+    now = timezone.now()
+    window = settings.REORDER_VELOCITY_DAYS
+    safety_days = settings.REORDER_SAFETY_DAYS
+    cover_days = settings.REORDER_COVER_DAYS
+    since = today - timedelta(days=window)
+
+    sold = dict(
+        SaleDetail.objects.filter(status=True, sale__date__gt=since)
+        .order_by().values('product_id').annotate(qty=Sum('quantity'))
+        .values_list('product_id', 'qty')
+    )
+    on_order = dict(
+        PurchaseItem.objects.filter(purchase_order__draft=True, purchase_order__status=True)
+        .order_by().values('product_id').annotate(qty=Sum('quantity'))
+        .values_list('product_id', 'qty')
+    )
+
+    last_purchase = PurchaseItem.objects.filter(
+        product=OuterRef('pk'),
+        purchase_order__draft=False,
+    ).order_by('-purchase_order__buy_date', '-id')
+    products = Product.objects.filter(status=True).annotate(
+        last_supplier_id=Subquery(last_purchase.values('purchase_order__supplier_id')[:1]),
+        last_lead_time=Subquery(last_purchase.values('purchase_order__supplier__lead_time_days')[:1]),
+    ).values_list('id', 'stock', 'last_supplier_id', 'last_lead_time')
+
+    existing = {
+        row[0]: row[1:]
+        for row in ReorderPoint.objects.values_list(
+            'product_id', 'supplier_id', 'daily_velocity', 'lead_time_days', 'reorder_point', 'suggested_quantity'
+        )
+    }
+
+    changed = []
+    for pk, stock, supplier_id, lead_time in products:
+        if lead_time is None:
+            lead_time = settings.REORDER_DEFAULT_LEAD_TIME_DAYS
+        velocity = (Decimal(sold.get(pk, 0)) / window).quantize(Decimal('0.001'))
+        reorder_point = math.ceil(velocity * (lead_time + safety_days))
+        # Posicion de inventario: existencias mas lo ya pedido
+        position = stock + on_order.get(pk, 0)
+        suggested = 0
+        if velocity and position <= reorder_point:
+            suggested = max(math.ceil(velocity * (lead_time + cover_days)) - position, 0)
+
+        values = (supplier_id, velocity, lead_time, reorder_point, suggested)
+        if existing.pop(pk, None) != values:
+            changed.append(ReorderPoint(
+                product_id=pk,
+                supplier_id=supplier_id,
+                daily_velocity=velocity,
+                lead_time_days=lead_time,
+                reorder_point=reorder_point,
+                suggested_quantity=suggested,
+                computed_at=now,
+            ))
+
+    with transaction.atomic():
+        ReorderPoint.objects.bulk_create(
+            changed,
+            batch_size=2000,
+            update_conflicts=True,
+            unique_fields=['product'],
+            update_fields=['supplier', 'daily_velocity', 'lead_time_days', 'reorder_point', 'suggested_quantity', 'computed_at'],
+        )
+        # Lo que queda en existing son productos inactivos
+        removed = ReorderPoint.objects.filter(product_id__in=list(existing)).delete()[0] if existing else 0
+
+    return len(changed), removed
+
+
+def pending_suggestions(supplier_ids=None):
+    """Sugerencias de compra pendientes agrupadas por proveedor"""
+    suggestions = ReorderPoint.objects.filter(
+        suggested_quantity__gt=0,
+        supplier__isnull=False,
+        product__status=True,
+    ).select_related('product', 'supplier').order_by('supplier__name', 'product__name')
+    if supplier_ids:
+        suggestions = suggestions.filter(supplier_id__in=supplier_ids)
+
+    grouped = {}
+    for suggestion in suggestions:
+        group = grouped.setdefault(suggestion.supplier_id, {
+            'supplier': suggestion.supplier,
+            'lines': [],
+            'total': Decimal('0.00'),
+        })
+        group['lines'].append(suggestion)
+        group['total'] += suggestion.suggested_quantity * suggestion.product.last_purchase_price
+    return list(grouped.values())
+
+
+def draft_purchase_orders(user, supplier_ids=None):
+    """
+    Crea una orden de compra en borrador por proveedor con las cantidades
+    sugeridas y deja esas sugerencias en cero: lo pedido ya cuenta como
+    stock en camino en el proximo calculo.
+    """
+    today = timezone.localdate()
+    stamp = timezone.localtime().strftime('%Y%m%d%H%M%S')
+    orders = []
+
+    with transaction.atomic():
+        # Dos envios simultaneos no deben pedir dos veces lo mismo
+        list(ReorderPoint.objects.select_for_update().filter(suggested_quantity__gt=0).values_list('pk', flat=True))
+        for group in pending_suggestions(supplier_ids):
+            supplier = group['supplier']
+            order = PurchaseOrder(
+                order_date=today,
+                buy_date=today,
+                order_number=f'SUG-{stamp}-{supplier.id}',
+                observations='Orden sugerida por punto de reorden',
+                supplier=supplier,
+                subtotal=group['total'],
+                discount=Decimal('0.00'),
+                tax=Decimal('0.00'),
+                draft=True,
+                created_by=user,
+            )
+            order.save()
+
+            items = []
+            for line in group['lines']:
+                price = line.product.last_purchase_price
+                amount = line.suggested_quantity * price
+                items.append(PurchaseItem(
+                    purchase_order=order,
+                    product=line.product,
+                    quantity=line.suggested_quantity,
+                    unit_price=price,
+                    subtotal=amount,
+                    total_price=amount,
+                    created_by=user,
+                ))
+            PurchaseItem.objects.bulk_create(items)
+            ReorderPoint.objects.filter(pk__in=[line.pk for line in group['lines']]).update(suggested_quantity=0)
+            orders.append(order)
+
+    return orders
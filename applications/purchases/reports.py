@@ -1,54 +1,17 @@
-import os
 from datetime import datetime
 
 from django.shortcuts import render
-from django.conf import settings
-from django.contrib.staticfiles import finders
 from django.http import HttpResponse
-from django.template.loader import get_template
 from django.utils import timezone
 from django.db.models import Sum, Count, Avg
 from django.db.models.functions import TruncMonth
 
-from xhtml2pdf import pisa
-
+from applications.home.pdf import render_to_pdf
+from applications.home.replica import replica_reads
 from .models import PurchaseOrder, PurchaseItem, Supplier
 
 
-def link_callback(uri, rel):
-    """
-    Convert HTML URIs to absolute system paths so xhtml2pdf can access those
-    resources
-    """
-    result = finders.find(uri)
-
-    if result:
-        if not isinstance(result, (list, tuple)):
-            result = [result]
-        result = list(os.path.realpath(path) for path in result)
-        path = result[0]
-    else:
-        static_url = settings.STATIC_URL    # Usually /static/
-        static_root = settings.STATIC_ROOT  # Usually /home/user/project_static/
-        media_url = settings.MEDIA_URL      # Usually /media/
-        media_root = settings.MEDIA_ROOT    # Usually /home/user/project_static/media/
-
-        if uri.startswith(media_url):
-            path = os.path.join(media_root, uri.replace(media_url, ""))
-        elif uri.startswith(static_url):
-            path = os.path.join(static_root, uri.replace(static_url, ""))
-        else:
-            return uri
-
-    # make sure that file exists
-    if not os.path.isfile(path):
-        raise RuntimeError(
-            f'media URI must start with {static_url} or {media_url}'
-        )
-    return path
-
-
-
+@replica_reads
 def purshase_repotr_to_pdf(request):
     template_path = 'purchases/purchase_report.html'
     today = timezone.now()
@@ -57,8 +20,8 @@ def purshase_repotr_to_pdf(request):
     start_date_str = request.GET.get('start_date')
     end_date_str = request.GET.get('end_date')
     
-    # Filtrar compras por rango de fechas si se proporciona
-    purchases = PurchaseOrder.objects.all()
+    # Filtrar compras por rango de fechas si se proporciona (los borradores no son compras)
+    purchases = PurchaseOrder.objects.filter(draft=False)
     
     if start_date_str and end_date_str:
         try:
@@ -165,22 +128,7 @@ def purshase_repotr_to_pdf(request):
         'request': request,
     }
 
-    response = HttpResponse(content_type='application/pdf')
-    response['Content-Disposition'] = 'inline; filename="reporte_compras_analitico.pdf"'
-    template = get_template(template_path)
-    html = template.render(context)
-    
-    # create a pdf
-    pisa_status = pisa.CreatePDF(
-       html,
-       dest=response,
-       link_callback=link_callback,
-    )
-
-    if pisa_status.err:
-       return HttpResponse('We had some errors <pre>' + html + '</pre>')
-
-    return response
+    return render_to_pdf(template_path, context, 'reporte_compras_analitico.pdf')
 
 def purchase_report_filter(request):
     """Vista para mostrar el formulario de filtros del reporte"""
@@ -192,11 +140,11 @@ def print_purchase_report(request, purchase_id):
     
     # Obtener la compra específica
     try:
-        purchase = PurchaseOrder.objects.get(id=purchase_id)
+        purchase = PurchaseOrder.objects.select_related('supplier').get(id=purchase_id)
     except PurchaseOrder.DoesNotExist:
         return HttpResponse('Purchase not found')
     
-    purchase_items = PurchaseItem.objects.filter(purchase_order=purchase)
+    purchase_items = PurchaseItem.objects.filter(purchase_order=purchase).select_related('product')
     
     context = {
         'obj': [purchase],  # Pasar como lista para mantener consistencia en la plantilla
@@ -209,19 +157,4 @@ def print_purchase_report(request, purchase_id):
         'request': request,
     }
 
-    response = HttpResponse(content_type='application/pdf')
-    response['Content-Disposition'] = f'inline; filename="reporte_compra_{purchase.order_number}.pdf"'
-    template = get_template(template_path)
-    html = template.render(context)
-    
-    # create a pdf
-    pisa_status = pisa.CreatePDF(
-       html,
-       dest=response,
-       link_callback=link_callback,
-    )
-
-    if pisa_status.err:
-       return HttpResponse('We had some errors <pre>' + html + '</pre>')
-
-    return response
+    return render_to_pdf(template_path, context, f'reporte_compra_{purchase.order_number}.pdf')
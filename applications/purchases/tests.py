@@ -1,3 +1,195 @@
-from django.test import TestCase
+from datetime import date, timedelta
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+from django.core.management import call_command
+from django.http import HttpResponse
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from applications.home.testing import QueryCountMixin, create_admin, create_products
+from applications.inv.models import Product
+from applications.sales.models import ControlSequence, Customer, Sale, SaleDetail
+from .models import PurchaseItem, PurchaseOrder, ReorderPoint, Supplier
+from .reorder import compute_reorder_points, draft_purchase_orders
+
+
+class PurchaseQueryCountTest(QueryCountMixin, TestCase):
+    """Listado, edicion e impresion de compras con un numero fijo de consultas"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_admin()
+        products = create_products(cls.user, 5)
+        for i in range(5):
+            supplier = Supplier(name=f'proveedor {i}', phone=f'555-{i}', created_by=cls.user)
+            supplier.save()
+            order = PurchaseOrder(
+                order_date=date.today(), buy_date=date.today(), order_number=f'oc-{i}',
+                supplier=supplier, created_by=cls.user,
+            )
+            order.save()
+            for product in products:
+                PurchaseItem(
+                    purchase_order=order, product=product, quantity=2, unit_price=4,
+                    total_price=8, created_by=cls.user,
+                ).save()
+        cls.order = order
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def test_supplier_list(self):
+        self.assertMaxQueries(5, reverse('purchases:suppliers_list'))
+
+    def test_purchase_list(self):
+        self.assertMaxQueries(5, reverse('purchases:purchase_list'))
+
+    def test_purchase_update(self):
+        self.assertMaxQueries(10, reverse('purchases:purchase_update', args=[self.order.id]))
+
+    def test_print_purchase_report(self):
+        self.assertMaxQueries(2, reverse('purchases:pirnt_purchase_report', args=[self.order.id]))
+
+    def test_bulk_item_delete_recomputes_once(self):
+        items = PurchaseItem.objects.filter(purchase_order=self.order).order_by('id')
+        removed = list(items.values_list('pk', 'product_id')[:3])
+        # Las consultas no dependen del numero de items borrados
+        with self.assertNumQueries(9):
+            PurchaseItem.objects.filter(pk__in=[pk for pk, _ in removed]).delete()
+
+        self.order.refresh_from_db()
+        self.assertEqual(self.order.subtotal, 16)
+        self.assertEqual(self.order.total_amount, 16)
+        stock = dict(Product.objects.values_list('id', 'stock'))
+        self.assertEqual({stock[product_id] for _, product_id in removed}, {108})
+
+
+class AverageCostTest(TestCase):
+    """Costo promedio ponderado al recibir y borrar items de compra"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_admin()
+        cls.product = create_products(cls.user, 1)[0]
+        cls.supplier = Supplier(name='proveedor', phone='555-9', created_by=cls.user)
+        cls.supplier.save()
+
+    def order(self, number, quantity, unit_price, draft=True, buy_date=None):
+        order = PurchaseOrder(
+            order_date=date.today(), buy_date=buy_date or date.today(), order_number=number,
+            supplier=self.supplier, draft=draft, created_by=self.user,
+        )
+        order.save()
+        item = PurchaseItem(
+            purchase_order=order, product=self.product, quantity=quantity, unit_price=unit_price,
+            total_price=quantity * unit_price, created_by=self.user,
+        )
+        item.save()
+        return order, item
+
+    def test_receive_updates_average_cost(self):
+        # 100 en stock a 4 + 100 a 6 = promedio 5
+        order, item = self.order('oc-1', 100, 6)
+        # Agregado de items, UPDATE de productos, UPDATE de costos de items y cabecera
+        with self.assertNumQueries(6):
+            order.receive(self.user)
+        product = Product.objects.get(pk=self.product.pk)
+        self.assertEqual(product.stock, 200)
+        self.assertEqual(product.average_cost, 5)
+        self.assertEqual(product.last_purchase_price, 6)
+        item.refresh_from_db()
+        self.assertEqual(item.cost, 5)
+
+    def test_receive_dates_the_order_today(self):
+        # Borrador creado hace 10 dias: el stock entra el dia en que se recibe
+        order, _ = self.order('oc-4', 10, 6, buy_date=timezone.localdate() - timedelta(days=10))
+        order.receive(self.user)
+        order.refresh_from_db()
+        self.assertEqual(order.buy_date, timezone.localdate())
+        self.assertEqual(Product.objects.get(pk=self.product.pk).last_buy_date, timezone.localdate())
+
+    def test_delete_received_item_restores_cost(self):
+        _, item = self.order('oc-2', 100, 6, draft=False)
+        self.assertEqual(Product.objects.get(pk=self.product.pk).average_cost, 5)
+        PurchaseItem.objects.filter(pk=item.pk).delete()
+        product = Product.objects.get(pk=self.product.pk)
+        self.assertEqual(product.stock, 100)
+        self.assertEqual(product.average_cost, 4)
+
+    def test_recompute_costs(self):
+        _, item = self.order('oc-3', 100, 6, draft=False)
+        # Costos desactualizados: el recalculo parte del costo previo al rango
+        PurchaseItem.objects.update(cost=0)
+        Product.objects.update(average_cost=4)
+        call_command('recompute_costs', '--from', date.today().isoformat(), stdout=StringIO())
+        item.refresh_from_db()
+        self.assertEqual(item.cost, 5)
+        self.assertEqual(Product.objects.get(pk=self.product.pk).average_cost, 5)
+
+
+@override_settings(
+    REORDER_VELOCITY_DAYS=10, REORDER_SAFETY_DAYS=0, REORDER_COVER_DAYS=10, REORDER_DEFAULT_LEAD_TIME_DAYS=5,
+)
+class ReorderTest(TestCase):
+    """Sugerencias de compra netas de lo ya pedido y ordenes en borrador una sola vez"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_admin()
+        cls.product, cls.idle = create_products(cls.user, 2)
+        cls.supplier = Supplier(name='proveedor', phone='555-0', lead_time_days=5, created_by=cls.user)
+        cls.supplier.save()
+        order = PurchaseOrder(
+            order_date=date.today(), buy_date=date.today(), order_number='oc-1', supplier=cls.supplier, created_by=cls.user,
+        )
+        order.save()
+        PurchaseItem(purchase_order=order, product=cls.product, quantity=1, unit_price=4, subtotal=4, total_price=4, created_by=cls.user).save()
+
+        ControlSequence.objects.create(name='sale_invoice')
+        customer = Customer(name='cliente', last_name='prueba', dni='00000001', gender=Customer.OTHER, created_by=cls.user)
+        customer.save()
+        sale = Sale(customer=customer, created_by=cls.user)
+        sale.save()
+        SaleDetail(
+            sale=sale, product=cls.product, quantity=20, unit_price=10, subtotal=200, total_price=200, created_by=cls.user,
+        ).save()
+        # 2 unidades diarias, 5 dias de entrega: punto de reorden 10
+        Product.objects.filter(pk=cls.product.pk).update(stock=5)
+
+    def test_compute_reorder_points(self):
+        self.assertEqual(compute_reorder_points(), (2, 0))
+        point = ReorderPoint.objects.get(product=self.product)
+        self.assertEqual((point.supplier_id, point.reorder_point), (self.supplier.id, 10))
+        # Cubrir 5 + 10 dias a 2 diarias menos el stock
+        self.assertEqual(point.suggested_quantity, 25)
+        self.assertEqual(ReorderPoint.objects.get(product=self.idle).suggested_quantity, 0)
+        # Sin cambios no se reescribe nada
+        self.assertEqual(compute_reorder_points(), (0, 0))
+
+    def test_draft_orders_are_created_once(self):
+        compute_reorder_points()
+        orders = draft_purchase_orders(self.user)
+        self.assertEqual(len(orders), 1)
+        item = orders[0].items.get()
+        self.assertTrue(orders[0].draft)
+        self.assertEqual((item.product_id, item.quantity), (self.product.id, 25))
+        self.assertEqual(ReorderPoint.objects.get(product=self.product).suggested_quantity, 0)
+
+        # Otro envio no duplica la orden, y el recalculo cuenta lo pedido como stock en camino
+        self.assertEqual(draft_purchase_orders(self.user), [])
+        compute_reorder_points()
+        self.assertEqual(ReorderPoint.objects.get(product=self.product).suggested_quantity, 0)
+        self.assertEqual(PurchaseOrder.objects.filter(draft=True).count(), 1)
+
+    def test_drafts_are_not_counted_as_purchases(self):
+        compute_reorder_points()
+        draft_purchase_orders(self.user)
+        self.client.force_login(self.user)
+        with mock.patch('applications.purchases.reports.render_to_pdf', return_value=HttpResponse()) as render:
+            self.client.get(reverse('purchases:purchase_report_pdf'))
+        self.assertEqual(render.call_args.args[1]['count_purchases'], 1)
+
+        response = self.client.get(reverse('home:dashboard'))
+        self.assertEqual(response.context['monthly_purchases']['count'], 1)
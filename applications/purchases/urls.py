@@ -20,4 +20,6 @@ urlpatterns = [
     path('purchases/report/pdf/',reports.purshase_repotr_to_pdf, name='purchase_report_pdf'),
     path('purchases/report/filter/', reports.purchase_report_filter, name='purchase_report_filter'),
     path('purchases/report/print/<int:purchase_id>', reports.print_purchase_report, name='pirnt_purchase_report'),
+    path('purchases/suggested/', views.SuggestedPurchaseOrdersView.as_view(), name='suggested_orders'),
+    path('purchases/receive/<int:purchase_id>/', views.PurchaseReceiveView.as_view(), name='purchase_receive'),
 ]
\ No newline at end of file
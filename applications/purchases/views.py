@@ -14,12 +14,13 @@ from django.utils.decorators import method_decorator
 from .models import Supplier, PurchaseItem, PurchaseOrder
 from applications.inv.models import Product
 from .forms import SupplierForm
-from applications.home.mixins import AdminRequiredMixin, SellerRequiredMixin
+from applications.home.mixins import AdminRequiredMixin, SellerRequiredMixin, AsyncAdminRequiredMixin, AsyncToggleStatusMixin, KeysetPaginationMixin, ReplicaReadMixin
 from .forms import PurchaseForm
+from .reorder import pending_suggestions, draft_purchase_orders
 
 # Create your views here.
 
-class SupplierListView(LoginRequiredMixin, AdminRequiredMixin, ListView):
+class SupplierListView(LoginRequiredMixin, AdminRequiredMixin, ReplicaReadMixin, ListView):
     model = Supplier
     template_name = 'purchases/suppliers_list.html'
     context_object_name = 'suppliers'
@@ -63,15 +64,10 @@ class CreateSupplierView(LoginRequiredMixin, AdminRequiredMixin, CreateView):
     def get_success_url(self):
         return reverse_lazy('purchases:suppliers_list')
     
-class ToggleSupplierStatusView(AdminRequiredMixin, View):
-    def post(self, request, *args, **kwargs):
-        supplier_id = request.POST.get('supplier_id')
-        try:
-            supplier = Supplier.objects.get(id=supplier_id)
-            new_status = supplier.toggle_status()
-            return JsonResponse({'success': True, 'new_status': new_status})
-        except Supplier.DoesNotExist:
-            return JsonResponse({'success': False, 'error': 'Proveedor no encontrada'})
+class ToggleSupplierStatusView(AsyncAdminRequiredMixin, AsyncToggleStatusMixin, View):
+    model = Supplier
+    id_param = 'supplier_id'
+    not_found_error = 'Proveedor no encontrada'
         
 class UpdateSupplierView(LoginRequiredMixin, AdminRequiredMixin, UpdateView):
     model = Supplier
@@ -111,11 +107,28 @@ class UpdateSupplierView(LoginRequiredMixin, AdminRequiredMixin, UpdateView):
         return reverse_lazy('purchases:suppliers_list')
     
 # Purchases Views    
-class PurchasesListView(LoginRequiredMixin, AdminRequiredMixin, ListView):
+class PurchasesListView(LoginRequiredMixin, AdminRequiredMixin, ReplicaReadMixin, KeysetPaginationMixin, ListView):
     model = PurchaseOrder
+    queryset = PurchaseOrder.objects.select_related('supplier')
     template_name = 'purchases/purchases_list.html'
     context_object_name = 'purchases'
     login_url = reverse_lazy('home:login')
+    keyset_field = 'buy_date'
+
+    def serialize(self, purchase):
+        return {
+            'id': purchase.id,
+            'order_number': purchase.order_number,
+            'order_date': purchase.order_date.isoformat(),
+            'buy_date': purchase.buy_date.isoformat(),
+            'supplier': purchase.supplier.name,
+            'subtotal': str(purchase.subtotal),
+            'discount': str(purchase.discount),
+            'tax': str(purchase.tax),
+            'total_amount': str(purchase.total_amount),
+            'draft': purchase.draft,
+            'status': purchase.status,
+        }
 
 
 @login_required(login_url='/login/')
@@ -127,10 +140,10 @@ def purchase_order_view(request, purchase_id=None):
 
     if request.method =='GET':
         purchase_form = PurchaseForm()
-        header = PurchaseOrder.objects.filter(pk=purchase_id).first() if purchase_id else None
+        header = PurchaseOrder.objects.select_related('supplier').filter(pk=purchase_id).first() if purchase_id else None
 
         if header:
-            purchase_item = PurchaseItem.objects.filter(purchase_order=header)
+            purchase_item = PurchaseItem.objects.filter(purchase_order=header).select_related('product')
             buy_date = datetime.date.isoformat(header.buy_date)
             order_date = datetime.date.isoformat(header.order_date)
             e = {
@@ -280,11 +293,9 @@ class PurchaseDeleteView(LoginRequiredMixin, AdminRequiredMixin, View):
             purchase_item = PurchaseItem.objects.get(pk=pk, purchase_order_id=purchase_id)
             purchase_order = purchase_item.purchase_order
             
-            # Eliminar el item
+            # Eliminar el item; update_purchase_oder_delete ajusta el stock y recalcula la orden
             purchase_item.delete()
-            
-            # Recalcular totales
-            self.update_purchase_totals(purchase_order)
+            purchase_order.refresh_from_db()
             
             # Devolver respuesta JSON para AJAX
             return JsonResponse({
@@ -308,17 +319,32 @@ class PurchaseDeleteView(LoginRequiredMixin, AdminRequiredMixin, View):
                 'success': False,
                 'error': str(e)
             }, status=500)
-    
-    def update_purchase_totals(self, purchase_order):
-        """Recalcular totales después de eliminar un item"""
-        items = PurchaseItem.objects.filter(purchase_order=purchase_order)
-        
-        subtotal = items.aggregate(Sum('subtotal'))['subtotal__sum'] or 0
-        discount = items.aggregate(Sum('discount'))['discount__sum'] or 0
-        tax = items.aggregate(Sum('tax'))['tax__sum'] or 0
-        
-        purchase_order.subtotal = subtotal
-        purchase_order.discount = discount
-        purchase_order.tax = tax
-        purchase_order.total_amount = subtotal - discount + tax
-        purchase_order.save()
\ No newline at end of file
+
+# Sugerencias de compra
+class SuggestedPurchaseOrdersView(LoginRequiredMixin, AdminRequiredMixin, View):
+    template_name = 'purchases/suggested_orders.html'
+
+    def get(self, request):
+        context = {'suggestions': pending_suggestions()}
+        return render(request, self.template_name, context)
+
+    def post(self, request):
+        supplier_ids = request.POST.getlist('supplier_ids')
+        orders = draft_purchase_orders(request.user, supplier_ids)
+        if orders:
+            messages.success(request, f'✅ Se crearon {len(orders)} ordenes de compra en borrador.')
+        else:
+            messages.warning(request, 'No hay sugerencias de compra para los proveedores seleccionados.')
+        return redirect('purchases:purchase_list')
+
+
+class PurchaseReceiveView(LoginRequiredMixin, AdminRequiredMixin, View):
+    def post(self, request, purchase_id):
+        purchase_order = PurchaseOrder.objects.filter(pk=purchase_id, draft=True).first()
+        if not purchase_order:
+            messages.error(request, 'La orden no existe o ya fue recibida.')
+            return redirect('purchases:purchase_list')
+
+        purchase_order.receive(request.user)
+        messages.success(request, f'✅ Orden {purchase_order.order_number} recibida, stock actualizado.')
+        return redirect('purchases:purchase_list')
@@ -1,7 +1,9 @@
 from django.contrib import admin
 
-from .models import Sale
+from .models import Register, Sale, SaleReturn
 
 # Register your models here.
 
 admin.site.register(Sale)
+admin.site.register(SaleReturn)
+admin.site.register(Register)
@@ -0,0 +1,216 @@
+import gzip
+import json
+from datetime import date, datetime, time
+
+from django.apps import apps as global_apps
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connection, transaction
+from django.utils import timezone
+
+
+# Tablas con archivo: (modelo, columna de particion en la tabla de archivo).
+# Las lineas de venta guardan la fecha de su venta en sale_date para poder
+# particionarse por mes igual que las ventas.
+ARCHIVED_MODELS = [
+    ('Sale', 'date'),
+    ('SaleDetail', 'sale_date'),
+    ('CashRegister', 'date'),
+]
+
+
+def archive_table(model):
+    return f'{model._meta.db_table}_archive'
+
+
+def history_view(model):
+    return f'{model._meta.db_table}_history'
+
+
+def _models(apps):
+    return [(apps.get_model('sales', name), key) for name, key in ARCHIVED_MODELS]
+
+
+def _columns(model):
+    return [field.column for field in model._meta.concrete_fields]
+
+
+def sync_archive_schema(schema_editor, apps=global_apps):
+    """
+    Crea las tablas de archivo que falten (en PostgreSQL particionadas por
+    rango de mes), les agrega las columnas nuevas de las tablas activas y
+    recrea las vistas *_history (tabla activa UNION ALL archivo). Se llama
+    desde las migraciones y antes de cada archivado.
+    """
+    conn = schema_editor.connection
+    qn = schema_editor.quote_name
+    with conn.cursor() as cursor:
+        existing = set(conn.introspection.table_names(cursor, include_views=True))
+
+    for model, key in _models(apps):
+        table, archive, view = model._meta.db_table, archive_table(model), history_view(model)
+        columns = _columns(model)
+        if view in existing:
+            schema_editor.execute(f'DROP VIEW {qn(view)}')
+
+        if archive not in existing:
+            if conn.vendor == 'postgresql':
+                extra = f', {qn(key)} date NOT NULL' if key not in columns else ''
+                schema_editor.execute(
+                    f'CREATE TABLE {qn(archive)} (LIKE {qn(table)} INCLUDING DEFAULTS{extra}) '
+                    f'PARTITION BY RANGE ({qn(key)})'
+                )
+                schema_editor.execute(f'ALTER TABLE {qn(archive)} ADD PRIMARY KEY ({qn("id")}, {qn(key)})')
+            else:
+                extra = f', CAST(NULL AS date) AS {qn(key)}' if key not in columns else ''
+                schema_editor.execute(f'CREATE TABLE {qn(archive)} AS SELECT *{extra} FROM {qn(table)} WHERE 1 = 0')
+        else:
+            with conn.cursor() as cursor:
+                archived = {c.name for c in conn.introspection.get_table_description(cursor, archive)}
+            for field in model._meta.concrete_fields:
+                if field.column not in archived:
+                    schema_editor.execute(
+                        f'ALTER TABLE {qn(archive)} ADD COLUMN {qn(field.column)} {field.db_type(conn)} NULL'
+                    )
+
+        select = ', '.join(qn(column) for column in columns)
+        schema_editor.execute(
+            f'CREATE VIEW {qn(view)} AS '
+            f'SELECT {select} FROM {qn(table)} UNION ALL SELECT {select} FROM {qn(archive)}'
+        )
+
+
+def drop_history_views(schema_editor, apps=global_apps):
+    """
+    Elimina las vistas *_history. Una migracion que cambie el tipo o borre una
+    columna de las tablas activas debe llamarla antes y sync_archive_schema
+    despues, porque la base no permite alterar columnas usadas por una vista.
+    """
+    qn = schema_editor.quote_name
+    for model, _ in _models(apps):
+        schema_editor.execute(f'DROP VIEW IF EXISTS {qn(history_view(model))}')
+
+
+def drop_archive_schema(schema_editor, apps=global_apps):
+    """Elimina vistas y tablas de archivo (reversa de la migracion)"""
+    drop_history_views(schema_editor, apps)
+    for model, _ in _models(apps):
+        schema_editor.execute(f'DROP TABLE IF EXISTS {schema_editor.quote_name(archive_table(model))}')
+
+
+def month_start(day):
+    return day.replace(day=1)
+
+
+def next_month(day):
+    return date(day.year + day.month // 12, day.month % 12 + 1, 1)
+
+
+def _bound(model, day):
+    """Limite de particion: fecha para DateField, medianoche local para DateTimeField"""
+    if model is global_apps.get_model('sales', 'CashRegister'):
+        return timezone.make_aware(datetime.combine(day, time.min))
+    return day
+
+
+def ensure_partitions(model, key, first, cutoff):
+    """Particiones mensuales del archivo desde el mes de first hasta cutoff"""
+    if connection.vendor != 'postgresql':
+        return
+    qn = connection.ops.quote_name
+    archive = archive_table(model)
+    month = month_start(first)
+    with connection.cursor() as cursor:
+        while month < cutoff:
+            end = next_month(month)
+            partition = f'{archive}_{month:%Y_%m}'
+            cursor.execute(
+                f'CREATE TABLE IF NOT EXISTS {qn(partition)} PARTITION OF {qn(archive)} '
+                f'FOR VALUES FROM (%s) TO (%s)',
+                [_bound(model, month), _bound(model, end)],
+            )
+            month = end
+
+
+def _export(cursor, table, where, params, stream):
+    cursor.execute(f'SELECT * FROM {table} WHERE {where}', params)
+    names = [column[0] for column in cursor.description]
+    rows = 0
+    for row in cursor.fetchall():
+        stream.write(json.dumps({'table': table, 'row': dict(zip(names, row))}, cls=DjangoJSONEncoder) + '\n')
+        rows += 1
+    return rows
+
+
+def archive_before(cutoff, export=None, dry_run=False):
+    """
+    Mueve a las tablas de archivo las ventas, lineas y movimientos de caja
+    anteriores a cutoff (primer dia de un mes cerrado). Todo ocurre en una
+    transaccion; el DELETE es SQL directo para no devolver stock con las
+    senales de SaleDetail. Con export las filas movidas se escriben ademas en
+    un JSON Lines comprimido con gzip.
+    Devuelve {tabla: filas}.
+    """
+    Sale = global_apps.get_model('sales', 'Sale')
+    SaleDetail = global_apps.get_model('sales', 'SaleDetail')
+    CashRegister = global_apps.get_model('sales', 'CashRegister')
+    qn = connection.ops.quote_name
+    sale, detail, cash = Sale._meta.db_table, SaleDetail._meta.db_table, CashRegister._meta.db_table
+    cash_cutoff = _bound(CashRegister, cutoff)
+    first_sale = Sale.objects.filter(date__lt=cutoff).order_by('date').values_list('date', flat=True).first()
+    first_cash = CashRegister.objects.filter(date__lt=cash_cutoff).order_by('date').values_list('date', flat=True).first()
+
+    # (modelo, tabla, condicion, parametros, columna de particion, primera fecha).
+    # Las lineas van antes que sus ventas por la clave foranea.
+    batches = [
+        (SaleDetail, detail, f'{qn("sale_id")} IN (SELECT {qn("id")} FROM {qn(sale)} WHERE {qn("date")} < %s)',
+         [cutoff], 'sale_date', first_sale),
+        (Sale, sale, f'{qn("date")} < %s', [cutoff], 'date', first_sale),
+        (CashRegister, cash, f'{qn("date")} < %s', [cash_cutoff], 'date', first_cash),
+    ]
+
+    moved = {}
+    stream = gzip.open(export, 'wt', encoding='utf-8') if export and not dry_run else None
+    try:
+        with transaction.atomic():
+            if not dry_run:
+                with connection.schema_editor(atomic=False) as schema_editor:
+                    sync_archive_schema(schema_editor)
+
+            with connection.cursor() as cursor:
+                for model, table, where, params, key, first in batches:
+                    if dry_run:
+                        cursor.execute(f'SELECT COUNT(*) FROM {qn(table)} WHERE {where}', params)
+                        moved[table] = cursor.fetchone()[0]
+                        continue
+                    if first is None:
+                        moved[table] = 0
+                        continue
+                    if isinstance(first, datetime):
+                        first = timezone.localdate(first)
+                    ensure_partitions(model, key, first, cutoff)
+
+                    if stream:
+                        _export(cursor, qn(table), where, params, stream)
+                    columns = [qn(column) for column in _columns(model)]
+                    select = ', '.join(columns)
+                    if key not in _columns(model):
+                        # La fecha de la venta se copia como columna de particion
+                        cursor.execute(
+                            f'INSERT INTO {qn(archive_table(model))} ({select}, {qn(key)}) '
+                            f'SELECT {", ".join(f"d.{c}" for c in columns)}, s.{qn("date")} '
+                            f'FROM {qn(table)} d JOIN {qn(sale)} s ON s.{qn("id")} = d.{qn("sale_id")} '
+                            f'WHERE s.{qn("date")} < %s',
+                            params,
+                        )
+                    else:
+                        cursor.execute(
+                            f'INSERT INTO {qn(archive_table(model))} ({select}) '
+                            f'SELECT {select} FROM {qn(table)} WHERE {where}',
+                            params,
+                        )
+                    cursor.execute(f'DELETE FROM {qn(table)} WHERE {where}', params)
+                    moved[table] = cursor.rowcount
+    finally:
+        if stream:
+            stream.close()
+    return moved
@@ -0,0 +1,187 @@
+import logging
+import threading
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import connections, transaction
+from django.db.models import Count, DecimalField, F, Sum
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from applications.home.money import ZERO
+from applications.home.replica import primary_reads
+from applications.inv.models import sale_cost_field
+from .models import (
+    CashRegister, DailyReport, DailyReportBrand, DailyReportCustomer, DailyReportProduct, Sale, SaleDetail,
+)
+
+
+logger = logging.getLogger(__name__)
+
+TOP_CUSTOMERS = 5
+
+
+def _cash_figures(cash_model, day):
+    """
+    Apertura, ingresos y retiros del dia y el saldo de cierre: el monto de
+    cada cierre (el cierre deja current_balance en 0) mas el ultimo saldo de
+    las cajas que siguen abiertas.
+    """
+    movements = cash_model.objects.filter(business_day=day, status=True)
+    sums = dict(
+        movements.order_by().values('operation_type').annotate(total=Sum('amount'))
+        .values_list('operation_type', 'total')
+    )
+    open_balances = {}
+    for register_id, operation_type, balance in movements.order_by('date').values_list(
+        'register_id', 'operation_type', 'current_balance',
+    ):
+        if operation_type == CashRegister.CASH_CLOSE:
+            open_balances.pop(register_id, None)
+        else:
+            open_balances[register_id] = balance
+    return {
+        'opening_balance': sums.get(CashRegister.CASH_OPEN) or ZERO,
+        'cash_ins': sums.get(CashRegister.CASH_IN) or ZERO,
+        'cash_outs': sums.get(CashRegister.CASH_OUT) or ZERO,
+        'closing_balance': (sums.get(CashRegister.CASH_CLOSE) or ZERO) + sum(open_balances.values(), ZERO),
+    }
+
+
+def compute_day(day, models=None):
+    """
+    Calcula todas las cifras del dia con cinco consultas de agregados: totales
+    de ventas, productos por precio de venta, clientes, sumas de caja y saldos
+    por caja. models es (venta, linea, caja), por defecto las tablas activas.
+    """
+    sale_model, detail_model, cash_model = models or (Sale, SaleDetail, CashRegister)
+    sales = sale_model.objects.filter(date=day, status=True)
+    totals = sales.aggregate(
+        total=Sum('total_amount'), subtotal=Sum('subtotal'), discount=Sum('discount'), tax=Sum('tax'),
+        count=Count('id'), customers=Count('customer', distinct=True),
+    )
+
+    products = []
+    brands = {}
+    lines = detail_model.objects.filter(sale__date=day, sale__status=True, status=True)
+    for row in lines.order_by().values(
+        'product_id', 'product__name', 'product__code', 'product__brand__name', 'unit_price',
+    ).annotate(
+        qty=Sum('quantity'),
+        amount=Sum('total_price'),
+        # Costo guardado en la linea; las lineas sin costo (antes del backfill) usan el del producto
+        cost=Sum(
+            F('quantity') * Coalesce('unit_cost', f'product__{sale_cost_field()}'),
+            output_field=DecimalField(),
+        ),
+    ):
+        cost = row['cost'] or ZERO
+        product = DailyReportProduct(
+            product_id=row['product_id'], name=row['product__name'], code=row['product__code'],
+            brand=row['product__brand__name'], unit_price=row['unit_price'], quantity=row['qty'],
+            sales_amount=row['amount'], cost=cost, profit=row['amount'] - cost,
+        )
+        products.append(product)
+        brand = brands.setdefault(product.brand, DailyReportBrand(brand=product.brand))
+        brand.quantity += product.quantity
+        brand.sales_amount += product.sales_amount
+        brand.cost += product.cost
+        brand.profit += product.profit
+    products.sort(key=lambda p: -p.quantity)
+
+    customers = [
+        DailyReportCustomer(
+            customer_id=row['customer_id'],
+            name=f"{row['customer__name']} {row['customer__last_name']}",
+            total_amount=row['total'], count_sales=row['count'],
+        )
+        for row in sales.order_by().values('customer_id', 'customer__name', 'customer__last_name')
+        .annotate(total=Sum('total_amount'), count=Count('id')).order_by('-total')[:TOP_CUSTOMERS]
+    ]
+
+    cash = _cash_figures(cash_model, day)
+    total = totals['total'] or ZERO
+    expected = cash['opening_balance'] + total + cash['cash_ins'] - cash['cash_outs']
+    return {
+        'report': {
+            'total_sales': total,
+            'subtotal': totals['subtotal'] or ZERO,
+            'discount': totals['discount'] or ZERO,
+            'tax': totals['tax'] or ZERO,
+            'count_sales': totals['count'],
+            'total_customers': totals['customers'],
+            'total_products_sold': sum(p.quantity for p in products),
+            'total_cost': sum((p.cost for p in products), ZERO),
+            'total_profit': sum((p.profit for p in products), ZERO),
+            'opening_balance': cash['opening_balance'],
+            'cash_ins': cash['cash_ins'],
+            'cash_outs': cash['cash_outs'],
+            'closing_balance': cash['closing_balance'],
+            'cash_difference': cash['closing_balance'] - expected,
+        },
+        'products': products,
+        'brands': sorted(brands.values(), key=lambda b: -b.sales_amount),
+        'customers': customers,
+    }
+
+
+def close_day(day, user, models=None):
+    """
+    Cierre del dia: calcula las cifras una vez y las guarda en DailyReport y
+    sus tablas de detalle, reemplazando un cierre anterior del mismo dia.
+    Las cifras se leen de la base principal aunque se llame desde una vista
+    con replica_reads. Devuelve el informe.
+    """
+    # Lo modificado despues de este instante deja el informe desactualizado
+    computed_at = timezone.now()
+    with primary_reads():
+        figures = compute_day(day, models)
+    with transaction.atomic():
+        report, _ = DailyReport.objects.update_or_create(
+            report_date=day,
+            defaults={**figures['report'], 'generated_by': user, 'modified_by': user.id, 'computed_at': computed_at},
+            create_defaults={**figures['report'], 'generated_by': user, 'created_by': user, 'computed_at': computed_at},
+        )
+        for detail_model, key in (
+            (DailyReportProduct, 'products'), (DailyReportBrand, 'brands'), (DailyReportCustomer, 'customers'),
+        ):
+            detail_model.objects.filter(report=report).delete()
+            for row in figures[key]:
+                row.report = report
+            detail_model.objects.bulk_create(figures[key])
+    return report
+
+
+def is_stale(report):
+    """Hubo ventas o movimientos de caja del dia despues del ultimo cierre (no lee lineas)"""
+    if report.computed_at is None:
+        return True
+    # En la principal: una replica atrasada aun no tiene las ventas recientes
+    with primary_reads():
+        return (
+            Sale.objects.filter(date=report.report_date, updated_at__gt=report.computed_at).exists()
+            or CashRegister.objects.filter(business_day=report.report_date, updated_at__gt=report.computed_at).exists()
+        )
+
+
+def _close_in_thread(day, user_id):
+    try:
+        close_day(day, User.objects.get(pk=user_id))
+    except Exception:
+        logger.exception('Error en el cierre del dia %s', day)
+    finally:
+        # La conexion del hilo no la cierra el ciclo de la solicitud
+        connections.close_all()
+
+
+def schedule_day_close(day, user):
+    """
+    Programa el cierre del dia para cuando se confirme la transaccion en curso.
+    Con DAY_CLOSE_ASYNC corre en un hilo aparte y no demora la respuesta.
+    """
+    def run():
+        if settings.DAY_CLOSE_ASYNC:
+            threading.Thread(target=_close_in_thread, args=(day, user.pk), daemon=True).start()
+        else:
+            close_day(day, user)
+    transaction.on_commit(run)
@@ -0,0 +1,110 @@
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction, sync_to_async
+
+from django.db import IntegrityError, transaction
+from django.http import HttpResponse, JsonResponse
+
+from .models import IdempotencyKey
+
+
+HEADER = 'Idempotency-Key'
+MAX_KEY_LENGTH = 64
+
+
+def _replay(record, user, path):
+    """Respuesta guardada de la solicitud original"""
+    if record.user_id != user.id or record.path != path:
+        return JsonResponse({'success': False, 'error': 'La clave de idempotencia ya se uso en otra solicitud'}, status=422)
+    if record.status_code is None:
+        # La solicitud original aun no termina; el cliente reintenta mas tarde
+        return JsonResponse({'success': False, 'error': 'La solicitud original sigue en proceso'}, status=409)
+
+    response = HttpResponse(record.body, status=record.status_code, content_type=record.content_type or None)
+    if record.location:
+        response['Location'] = record.location
+    response['Idempotent-Replayed'] = 'true'
+    return response
+
+
+def begin(key, user, path):
+    """
+    Reserva la clave con una sola consulta por el indice unico. Devuelve el
+    registro reservado, o la respuesta a enviar si la clave ya existe.
+    """
+    if len(key) > MAX_KEY_LENGTH:
+        return JsonResponse({'success': False, 'error': 'Clave de idempotencia invalida'}, status=400)
+
+    record = IdempotencyKey.objects.filter(key=key).first()
+    if record is not None and record.is_expired():
+        record.delete()
+        record = None
+    if record is not None:
+        return _replay(record, user, path)
+
+    try:
+        with transaction.atomic():
+            return IdempotencyKey.objects.create(key=key, user=user, path=path)
+    except IntegrityError:
+        # Otro reintento reservo la clave al mismo tiempo
+        return _replay(IdempotencyKey.objects.get(key=key), user, path)
+
+
+def finish(record, response):
+    """
+    Guarda solo las respuestas 2xx/3xx. Los errores (4xx y 5xx) liberan la
+    clave: el cliente corrige la causa (p. ej. abre la caja) y reintenta.
+    """
+    if response.status_code >= 400 or getattr(response, 'streaming', False):
+        record.delete()
+        return
+    record.status_code = response.status_code
+    record.content_type = response.get('Content-Type', '')
+    record.location = response.get('Location', '')
+    record.body = response.content.decode(response.charset)
+    record.save(update_fields=['status_code', 'content_type', 'location', 'body'])
+
+
+def idempotent(view):
+    """
+    Hace reintentable un POST: con la cabecera Idempotency-Key la primera
+    respuesta se guarda y las repeticiones la reciben sin ejecutar la vista.
+    Sirve para vistas sync y async; requiere usuario autenticado.
+    """
+    if iscoroutinefunction(view):
+        @wraps(view)
+        async def wrapper(request, *args, **kwargs):
+            key = request.headers.get(HEADER)
+            if request.method != 'POST' or not key:
+                return await view(request, *args, **kwargs)
+
+            user = await request.auser()
+            record = await sync_to_async(begin)(key, user, request.path)
+            if isinstance(record, HttpResponse):
+                return record
+            try:
+                response = await view(request, *args, **kwargs)
+            except Exception:
+                await record.adelete()
+                raise
+            await sync_to_async(finish)(record, response)
+            return response
+        return wrapper
+
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        key = request.headers.get(HEADER)
+        if request.method != 'POST' or not key:
+            return view(request, *args, **kwargs)
+
+        record = begin(key, request.user, request.path)
+        if isinstance(record, HttpResponse):
+            return record
+        try:
+            response = view(request, *args, **kwargs)
+        except Exception:
+            record.delete()
+            raise
+        finish(record, response)
+        return response
+    return wrapper
@@ -0,0 +1,43 @@
+from datetime import datetime
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from applications.sales.archive import archive_before, month_start
+
+
+class Command(BaseCommand):
+    help = (
+        'Mueve ventas, lineas de venta y movimientos de caja de meses cerrados a las tablas '
+        'de archivo (particionadas por mes en PostgreSQL)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--before', help='Archivar lo anterior a este mes (YYYY-MM)')
+        parser.add_argument('--months', type=int, help='Meses cerrados que se conservan, por defecto ARCHIVE_KEEP_MONTHS')
+        parser.add_argument('--export', help='Copia de las filas movidas en JSON Lines comprimido (.jsonl.gz)')
+        parser.add_argument('--dry-run', action='store_true', help='Solo contar las filas a archivar')
+
+    def handle(self, *args, **options):
+        current_month = month_start(timezone.localdate())
+        if options['before']:
+            try:
+                cutoff = datetime.strptime(options['before'], '%Y-%m').date()
+            except ValueError:
+                raise CommandError('Formato de mes invalido, use YYYY-MM')
+        else:
+            months = settings.ARCHIVE_KEEP_MONTHS if options['months'] is None else options['months']
+            if months < 0:
+                raise CommandError('--months no puede ser negativo')
+            index = current_month.year * 12 + current_month.month - 1 - months
+            cutoff = current_month.replace(year=index // 12, month=index % 12 + 1)
+
+        if cutoff > current_month:
+            raise CommandError('Solo se pueden archivar meses cerrados')
+
+        moved = archive_before(cutoff, export=options['export'], dry_run=options['dry_run'])
+        verb = 'a archivar' if options['dry_run'] else 'archivadas'
+        for table, rows in moved.items():
+            self.stdout.write(f'{table}: {rows} filas {verb}')
+        self.stdout.write(self.style.SUCCESS(f'Archivo anterior a {cutoff:%Y-%m} completado'))
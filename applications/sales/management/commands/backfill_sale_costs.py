@@ -0,0 +1,45 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db.models import OuterRef, Subquery
+from django.db.models.functions import Coalesce, NullIf
+
+from applications.inv.models import COST_LAST, SALE_COST_FIELDS, Product
+from applications.purchases.models import PurchaseItem
+from applications.sales.models import Sale, SaleDetail
+
+
+class Command(BaseCommand):
+    help = (
+        'Completa el costo unitario de las lineas de venta con el costo de la ultima compra '
+        'recibida hasta la fecha de la venta (o el costo actual del producto si no hay compras)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--method', choices=sorted(SALE_COST_FIELDS), help='Costo a usar, por defecto SALE_COST_METHOD')
+        parser.add_argument('--batch-size', type=int, default=5000, help='Lineas por UPDATE')
+        parser.add_argument('--overwrite', action='store_true', help='Recalcular tambien las lineas que ya tienen costo')
+
+    def handle(self, *args, **options):
+        method = options['method'] or settings.SALE_COST_METHOD
+        # Precio de la compra para 'last'; costo promedio resultante de esa compra para 'average'
+        column = 'unit_price' if method == COST_LAST else 'cost'
+        sale_date = Sale.objects.filter(pk=OuterRef(OuterRef('sale'))).values('date')[:1]
+        purchase_cost = PurchaseItem.objects.filter(
+            product=OuterRef('product'),
+            purchase_order__draft=False,
+            purchase_order__buy_date__lte=Subquery(sale_date),
+        ).order_by('-purchase_order__buy_date', '-id').values(column)[:1]
+        current_cost = Product.objects.filter(pk=OuterRef('product')).values(SALE_COST_FIELDS[method])[:1]
+        unit_cost = Coalesce(NullIf(Subquery(purchase_cost), 0), Subquery(current_cost))
+
+        lines = SaleDetail.objects.all() if options['overwrite'] else SaleDetail.objects.filter(unit_cost__isnull=True)
+        last_id, updated = 0, 0
+        while True:
+            # Lotes por rango de id: cada UPDATE es corto y confirma por separado
+            ids = list(lines.filter(pk__gt=last_id).order_by('pk').values_list('pk', flat=True)[:options['batch_size']])
+            if not ids:
+                break
+            updated += SaleDetail.objects.filter(pk__in=ids).update(unit_cost=unit_cost)
+            last_id = ids[-1]
+
+        self.stdout.write(self.style.SUCCESS(f'{updated} lineas de venta con costo ({method})'))
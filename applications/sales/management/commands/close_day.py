@@ -0,0 +1,39 @@
+from datetime import datetime, timedelta
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from applications.sales.closing import close_day
+
+
+class Command(BaseCommand):
+    help = 'Calcula y guarda el informe diario (DailyReport y detalle) de uno o varios dias'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--date', help='Dia a cerrar (YYYY-MM-DD), por defecto hoy')
+        parser.add_argument('--days', type=int, default=1, help='Cantidad de dias hacia atras desde --date')
+        parser.add_argument('--username', help='Usuario que registra el informe, por defecto el primer superusuario')
+
+    def handle(self, *args, **options):
+        if options['date']:
+            try:
+                day = datetime.strptime(options['date'], '%Y-%m-%d').date()
+            except ValueError:
+                raise CommandError('Formato de fecha invalido, use YYYY-MM-DD')
+        else:
+            day = timezone.localdate()
+        if options['days'] < 1:
+            raise CommandError('--days debe ser mayor que cero')
+
+        if options['username']:
+            user = User.objects.filter(username=options['username']).first()
+        else:
+            user = User.objects.filter(is_superuser=True).order_by('id').first()
+        if not user:
+            raise CommandError('No se encontro un usuario para registrar el informe')
+
+        for offset in range(options['days']):
+            report = close_day(day - timedelta(days=offset), user)
+            self.stdout.write(f'{report.report_date}: {report.count_sales} ventas, ${report.total_sales}')
+        self.stdout.write(self.style.SUCCESS('Cierre completado'))
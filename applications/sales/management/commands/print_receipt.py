@@ -0,0 +1,35 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from applications.sales.models import Sale
+from applications.sales.receipt import load_sale, receipt_lines, render_escpos, render_text, send_to_printer
+
+
+class Command(BaseCommand):
+    help = 'Genera el ticket termico de una venta y lo muestra o lo envia a una impresora/archivo'
+
+    def add_arguments(self, parser):
+        parser.add_argument('sale_id', type=int)
+        parser.add_argument('--output', help="Impresora 'host:puerto' o archivo; por defecto RECEIPT_PRINTER")
+        parser.add_argument('--text', action='store_true', help='Mostrar el ticket en texto en lugar de enviarlo')
+
+    def handle(self, *args, **options):
+        start = time.perf_counter()
+        try:
+            sale, items = load_sale(options['sale_id'])
+        except Sale.DoesNotExist:
+            raise CommandError(f"La venta {options['sale_id']} no existe")
+        lines = receipt_lines(sale, items)
+
+        if options['text']:
+            self.stdout.write(render_text(lines), ending='')
+            return
+
+        data = render_escpos(lines)
+        try:
+            send_to_printer(data, options['output'])
+        except (OSError, ValueError) as e:
+            raise CommandError(f'No se pudo imprimir el ticket: {e}')
+        elapsed = (time.perf_counter() - start) * 1000
+        self.stdout.write(f'Ticket {sale.invoice_number}: {len(data)} bytes en {elapsed:.1f} ms')
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from applications.sales.models import IdempotencyKey
+
+
+class Command(BaseCommand):
+    help = 'Elimina las claves de idempotencia vencidas (IDEMPOTENCY_KEY_TTL)'
+
+    def handle(self, *args, **options):
+        deleted, _ = IdempotencyKey.expired().delete()
+        self.stdout.write(f'Claves eliminadas: {deleted}')
@@ -0,0 +1,34 @@
+# Generated by Django 5.2.5 on 2026-10-19 13:19
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sales', '0011_customer_customer_name_prefix_idx_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='IdempotencyKey',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(max_length=64, unique=True, verbose_name='Clave')),
+                ('path', models.CharField(max_length=255, verbose_name='Ruta')),
+                ('status_code', models.PositiveSmallIntegerField(blank=True, null=True, verbose_name='Codigo de Estado')),
+                ('content_type', models.CharField(blank=True, default='', max_length=100, verbose_name='Tipo de Contenido')),
+                ('location', models.CharField(blank=True, default='', max_length=255, verbose_name='Redireccion')),
+                ('body', models.TextField(blank=True, default='', verbose_name='Respuesta')),
+                ('created_at', models.DateTimeField(auto_now_add=True, db_index=True, verbose_name='Fecha de Creacion')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='idempotency_keys', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Clave de Idempotencia',
+                'verbose_name_plural': 'Claves de Idempotencia',
+            },
+        ),
+    ]
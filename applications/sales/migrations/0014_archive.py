@@ -0,0 +1,83 @@
+# Generated by Django 5.2.5 on 2026-10-19 13:28
+
+from django.db import migrations, models
+
+from applications.sales.archive import drop_archive_schema, sync_archive_schema
+
+
+def create_archive(apps, schema_editor):
+    sync_archive_schema(schema_editor, apps)
+
+
+def drop_archive(apps, schema_editor):
+    drop_archive_schema(schema_editor, apps)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sales', '0013_keyset_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CashRegisterHistory',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('operation_type', models.CharField(choices=[('open', 'Apertura de Caja'), ('close', 'Cierre de Caja'), ('in', 'Ingreso de Efectivo'), ('out', 'Retiro de Efectivo')], max_length=10, verbose_name='Tipo de Operación')),
+                ('amount', models.DecimalField(decimal_places=2, max_digits=10, verbose_name='Monto')),
+                ('date', models.DateTimeField(verbose_name='Fecha y Hora')),
+                ('description', models.TextField(blank=True, null=True, verbose_name='Descripción')),
+                ('current_balance', models.DecimalField(decimal_places=2, max_digits=10, verbose_name='Saldo Actual')),
+                ('status', models.BooleanField(verbose_name='Estado')),
+            ],
+            options={
+                'verbose_name': 'Movimiento de Caja (historico)',
+                'verbose_name_plural': 'Movimientos de Caja (historico)',
+                'db_table': 'sales_cashregister_history',
+                'ordering': ['-date'],
+                'managed': False,
+            },
+        ),
+        migrations.CreateModel(
+            name='SaleDetailHistory',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('quantity', models.PositiveIntegerField(verbose_name='Cantidad')),
+                ('unit_price', models.DecimalField(decimal_places=2, max_digits=10, verbose_name='Precio Unitario')),
+                ('tax', models.DecimalField(decimal_places=2, max_digits=10, null=True, verbose_name='Impuesto')),
+                ('discount', models.DecimalField(decimal_places=2, max_digits=10, null=True, verbose_name='Descuento')),
+                ('subtotal', models.DecimalField(decimal_places=2, max_digits=10, verbose_name='SubTotal')),
+                ('total_price', models.DecimalField(decimal_places=2, max_digits=10, verbose_name='Precio Total')),
+                ('status', models.BooleanField(verbose_name='Estado')),
+            ],
+            options={
+                'verbose_name': 'Detalle de Venta (historico)',
+                'verbose_name_plural': 'Detalles de Ventas (historico)',
+                'db_table': 'sales_saledetail_history',
+                'managed': False,
+            },
+        ),
+        migrations.CreateModel(
+            name='SaleHistory',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('invoice_number', models.CharField(max_length=100, verbose_name='Numero de Factura')),
+                ('date', models.DateField(verbose_name='Fecha de Venta')),
+                ('observation', models.TextField(blank=True, null=True, verbose_name='Observacion')),
+                ('subtotal', models.DecimalField(decimal_places=2, max_digits=10, verbose_name='Subtotal')),
+                ('tax', models.DecimalField(decimal_places=2, max_digits=10, null=True, verbose_name='Impuesto')),
+                ('discount', models.DecimalField(decimal_places=2, max_digits=10, null=True, verbose_name='Descuento')),
+                ('total_amount', models.DecimalField(decimal_places=2, max_digits=10, verbose_name='Monto Total')),
+                ('status', models.BooleanField(verbose_name='Estado')),
+            ],
+            options={
+                'verbose_name': 'Venta (historico)',
+                'verbose_name_plural': 'Ventas (historico)',
+                'db_table': 'sales_sale_history',
+                'ordering': ['-date'],
+                'managed': False,
+            },
+        ),
+        migrations.RunPython(create_archive, drop_archive),
+    ]
@@ -0,0 +1,58 @@
+# Generated by Django 5.2.5 on 2026-10-19 13:32
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inv', '0010_product_updated_at_idx'),
+        ('sales', '0014_archive'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SaleReturn',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status', models.BooleanField(default=True, verbose_name='Estado')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Fecha de creacion')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Fecha de modificacion')),
+                ('modified_by', models.IntegerField(blank=True, null=True, verbose_name='Modificado por')),
+                ('number', models.CharField(editable=False, max_length=100, unique=True, verbose_name='Numero de Devolucion')),
+                ('date', models.DateTimeField(auto_now_add=True, verbose_name='Fecha de Devolucion')),
+                ('reason', models.TextField(blank=True, null=True, verbose_name='Motivo')),
+                ('subtotal', models.DecimalField(decimal_places=2, default=0, max_digits=10, verbose_name='Subtotal')),
+                ('tax', models.DecimalField(decimal_places=2, default=0, max_digits=10, verbose_name='Impuesto')),
+                ('discount', models.DecimalField(decimal_places=2, default=0, max_digits=10, verbose_name='Descuento')),
+                ('total_amount', models.DecimalField(decimal_places=2, default=0, max_digits=10, verbose_name='Monto Total')),
+                ('authorized_by', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='authorized_returns', to=settings.AUTH_USER_MODEL)),
+                ('created_by', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='%(class)s_created_by', to=settings.AUTH_USER_MODEL, verbose_name='Creado por')),
+                ('sale', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='returns', to='sales.sale')),
+            ],
+            options={
+                'verbose_name': 'Devolucion',
+                'verbose_name_plural': 'Devoluciones',
+                'ordering': ['-date'],
+            },
+        ),
+        migrations.CreateModel(
+            name='SaleReturnDetail',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('quantity', models.PositiveIntegerField(verbose_name='Cantidad')),
+                ('unit_price', models.DecimalField(decimal_places=2, max_digits=10, verbose_name='Precio Unitario')),
+                ('total_price', models.DecimalField(decimal_places=2, max_digits=10, verbose_name='Precio Total')),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='+', to='inv.product')),
+                ('sale_detail', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='sales.saledetail')),
+                ('sale_return', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='details', to='sales.salereturn')),
+            ],
+            options={
+                'verbose_name': 'Detalle de Devolucion',
+                'verbose_name_plural': 'Detalles de Devoluciones',
+            },
+        ),
+    ]
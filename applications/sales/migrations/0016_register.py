@@ -0,0 +1,89 @@
+# Generated by Django 5.2.5 on 2026-10-19 13:38
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+from applications.sales.archive import drop_history_views, sync_archive_schema
+
+
+def create_main_register(apps, schema_editor):
+    """Los movimientos y ventas existentes pasan a una caja principal con su ultimo estado"""
+    Register = apps.get_model('sales', 'Register')
+    CashRegister = apps.get_model('sales', 'CashRegister')
+    Sale = apps.get_model('sales', 'Sale')
+    first = CashRegister.objects.order_by('date').first() or Sale.objects.order_by('date').first()
+    if first is None:
+        return
+    movements = CashRegister.objects.filter(status=True)
+    last = movements.order_by('-date').first()
+    register = Register.objects.create(
+        name='Caja Principal',
+        created_by_id=first.created_by_id,
+        balance=last.current_balance if last else 0,
+        opened_at=movements.filter(operation_type='open').order_by('-date').values_list('date', flat=True).first(),
+        closed_at=movements.filter(operation_type='close').order_by('-date').values_list('date', flat=True).first(),
+    )
+    CashRegister.objects.update(register=register)
+    Sale.objects.update(register=register)
+
+
+def sync_views(apps, schema_editor):
+    sync_archive_schema(schema_editor, apps)
+
+
+def drop_views(apps, schema_editor):
+    drop_history_views(schema_editor, apps)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sales', '0015_salereturn'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        # Al revertir, las vistas se recrean sin la columna register_id
+        migrations.RunPython(migrations.RunPython.noop, sync_views),
+        migrations.CreateModel(
+            name='Register',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status', models.BooleanField(default=True, verbose_name='Estado')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Fecha de creacion')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Fecha de modificacion')),
+                ('modified_by', models.IntegerField(blank=True, null=True, verbose_name='Modificado por')),
+                ('name', models.CharField(max_length=100, unique=True, verbose_name='Nombre')),
+                ('balance', models.DecimalField(decimal_places=2, default=0, max_digits=10, verbose_name='Saldo Actual')),
+                ('opened_at', models.DateTimeField(blank=True, null=True, verbose_name='Abierta')),
+                ('closed_at', models.DateTimeField(blank=True, null=True, verbose_name='Cerrada')),
+                ('created_by', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='%(class)s_created_by', to=settings.AUTH_USER_MODEL, verbose_name='Creado por')),
+            ],
+            options={
+                'verbose_name': 'Caja',
+                'verbose_name_plural': 'Cajas',
+                'ordering': ['name'],
+            },
+        ),
+        migrations.AddField(
+            model_name='cashregister',
+            name='register',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='movements', to='sales.register', verbose_name='Caja'),
+        ),
+        migrations.AddField(
+            model_name='sale',
+            name='register',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='sales', to='sales.register', verbose_name='Caja'),
+        ),
+        migrations.AddIndex(
+            model_name='cashregister',
+            index=models.Index(fields=['register', 'date'], name='cashregister_register_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='sale',
+            index=models.Index(fields=['register', 'date'], name='sale_register_date_idx'),
+        ),
+        migrations.RunPython(create_main_register, migrations.RunPython.noop),
+        migrations.RunPython(sync_views, drop_views),
+    ]
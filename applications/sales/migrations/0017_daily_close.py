@@ -0,0 +1,114 @@
+# Generated by Django 5.2.5 on 2026-10-19 13:42
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inv', '0010_product_updated_at_idx'),
+        ('sales', '0016_register'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='dailyreport',
+            name='cash_ins',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=10, verbose_name='Ingresos de Efectivo'),
+        ),
+        migrations.AddField(
+            model_name='dailyreport',
+            name='cash_outs',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=10, verbose_name='Retiros de Efectivo'),
+        ),
+        migrations.AddField(
+            model_name='dailyreport',
+            name='computed_at',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Calculado'),
+        ),
+        migrations.AddField(
+            model_name='dailyreport',
+            name='count_sales',
+            field=models.PositiveIntegerField(default=0, verbose_name='Cantidad de Ventas'),
+        ),
+        migrations.AddField(
+            model_name='dailyreport',
+            name='discount',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=10, verbose_name='Descuento'),
+        ),
+        migrations.AddField(
+            model_name='dailyreport',
+            name='subtotal',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=10, verbose_name='SubTotal'),
+        ),
+        migrations.AddField(
+            model_name='dailyreport',
+            name='tax',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=10, verbose_name='Impuesto'),
+        ),
+        migrations.AddField(
+            model_name='dailyreport',
+            name='total_cost',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=12, verbose_name='Costo Total'),
+        ),
+        migrations.AddField(
+            model_name='dailyreport',
+            name='total_profit',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=12, verbose_name='Ganancia Total'),
+        ),
+        migrations.CreateModel(
+            name='DailyReportBrand',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('brand', models.CharField(blank=True, max_length=100, null=True, verbose_name='Marca')),
+                ('quantity', models.PositiveIntegerField(default=0, verbose_name='Cantidad')),
+                ('sales_amount', models.DecimalField(decimal_places=2, default=0, max_digits=12, verbose_name='Ventas')),
+                ('cost', models.DecimalField(decimal_places=2, default=0, max_digits=12, verbose_name='Costo')),
+                ('profit', models.DecimalField(decimal_places=2, default=0, max_digits=12, verbose_name='Ganancia')),
+                ('report', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='brands', to='sales.dailyreport')),
+            ],
+            options={
+                'verbose_name': 'Marca del Informe Diario',
+                'verbose_name_plural': 'Marcas del Informe Diario',
+                'ordering': ['-sales_amount', 'id'],
+            },
+        ),
+        migrations.CreateModel(
+            name='DailyReportCustomer',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=255, verbose_name='Cliente')),
+                ('total_amount', models.DecimalField(decimal_places=2, default=0, max_digits=12, verbose_name='Total Compras')),
+                ('count_sales', models.PositiveIntegerField(default=0, verbose_name='Cantidad de Compras')),
+                ('customer', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='sales.customer')),
+                ('report', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='customers', to='sales.dailyreport')),
+            ],
+            options={
+                'verbose_name': 'Cliente del Informe Diario',
+                'verbose_name_plural': 'Clientes del Informe Diario',
+                'ordering': ['-total_amount', 'id'],
+            },
+        ),
+        migrations.CreateModel(
+            name='DailyReportProduct',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, verbose_name='Producto')),
+                ('code', models.CharField(blank=True, max_length=50, verbose_name='Codigo')),
+                ('brand', models.CharField(blank=True, max_length=100, null=True, verbose_name='Marca')),
+                ('unit_price', models.DecimalField(decimal_places=2, max_digits=10, verbose_name='Precio Unitario')),
+                ('quantity', models.PositiveIntegerField(default=0, verbose_name='Cantidad')),
+                ('sales_amount', models.DecimalField(decimal_places=2, default=0, max_digits=12, verbose_name='Ventas')),
+                ('cost', models.DecimalField(decimal_places=2, default=0, max_digits=12, verbose_name='Costo')),
+                ('profit', models.DecimalField(decimal_places=2, default=0, max_digits=12, verbose_name='Ganancia')),
+                ('product', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='inv.product')),
+                ('report', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='products', to='sales.dailyreport')),
+            ],
+            options={
+                'verbose_name': 'Producto del Informe Diario',
+                'verbose_name_plural': 'Productos del Informe Diario',
+                'ordering': ['-quantity', 'id'],
+            },
+        ),
+    ]
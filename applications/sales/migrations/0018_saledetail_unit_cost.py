@@ -0,0 +1,31 @@
+# Generated by Django 5.2.5 on 2026-10-19 13:44
+
+from django.db import migrations, models
+
+from applications.sales.archive import drop_history_views, sync_archive_schema
+
+
+def sync_views(apps, schema_editor):
+    sync_archive_schema(schema_editor, apps)
+
+
+def drop_views(apps, schema_editor):
+    drop_history_views(schema_editor, apps)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sales', '0017_daily_close'),
+    ]
+
+    operations = [
+        # Al revertir, las vistas se recrean sin la columna unit_cost
+        migrations.RunPython(migrations.RunPython.noop, sync_views),
+        migrations.AddField(
+            model_name='saledetail',
+            name='unit_cost',
+            field=models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True, verbose_name='Costo Unitario'),
+        ),
+        migrations.RunPython(sync_views, drop_views),
+    ]
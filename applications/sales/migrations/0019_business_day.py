@@ -0,0 +1,80 @@
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models.functions import ExtractHour, TruncDate
+
+from applications.sales.archive import archive_table, drop_history_views, sync_archive_schema
+
+
+def drop_views(apps, schema_editor):
+    drop_history_views(schema_editor, apps)
+
+
+def sync_views(apps, schema_editor):
+    sync_archive_schema(schema_editor, apps)
+
+
+def backfill(apps, schema_editor):
+    """Dia y hora locales (TIME_ZONE) de las filas existentes, activas y archivadas"""
+    Sale = apps.get_model('sales', 'Sale')
+    CashRegister = apps.get_model('sales', 'CashRegister')
+    Sale.objects.update(hour=ExtractHour('created_at'))
+    CashRegister.objects.update(business_day=TruncDate('date'))
+
+    sync_archive_schema(schema_editor, apps)
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    qn = schema_editor.quote_name
+    schema_editor.execute(
+        f'UPDATE {qn(archive_table(Sale))} SET {qn("hour")} = '
+        f'EXTRACT(HOUR FROM {qn("created_at")} AT TIME ZONE %s)',
+        [settings.TIME_ZONE],
+    )
+    schema_editor.execute(
+        f'UPDATE {qn(archive_table(CashRegister))} SET {qn("business_day")} = '
+        f'({qn("date")} AT TIME ZONE %s)::date',
+        [settings.TIME_ZONE],
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sales', '0018_saledetail_unit_cost'),
+    ]
+
+    operations = [
+        # Las vistas se recrean al final con las columnas nuevas
+        migrations.RunPython(drop_views, sync_views),
+        migrations.AddField(
+            model_name='sale',
+            name='hour',
+            field=models.PositiveSmallIntegerField(editable=False, null=True, verbose_name='Hora'),
+        ),
+        migrations.AddField(
+            model_name='cashregister',
+            name='business_day',
+            field=models.DateField(editable=False, null=True, verbose_name='Dia Operativo'),
+        ),
+        migrations.RunPython(backfill, migrations.RunPython.noop),
+        # backfill recrea las vistas; se quitan otra vez para cambiar las columnas
+        migrations.RunPython(drop_views, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='sale',
+            name='hour',
+            field=models.PositiveSmallIntegerField(editable=False, verbose_name='Hora'),
+        ),
+        migrations.AlterField(
+            model_name='cashregister',
+            name='business_day',
+            field=models.DateField(editable=False, verbose_name='Dia Operativo'),
+        ),
+        migrations.AddIndex(
+            model_name='sale',
+            index=models.Index(fields=['date', 'hour'], name='sale_date_hour_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='cashregister',
+            index=models.Index(fields=['business_day', 'register'], name='cashregister_day_register_idx'),
+        ),
+        migrations.RunPython(sync_views, drop_views),
+    ]
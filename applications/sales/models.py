@@ -1,11 +1,18 @@
+from datetime import timedelta
+
 from django.db import models, transaction
 from django.db.models.signals import post_save, post_delete
 from django.dispatch import receiver
-from django.db.models import Sum
+from django.db.models import Q, Sum
+from django.db.models.functions import Upper
+from django.contrib.postgres.indexes import OpClass
 from django.conf import settings
+from django.utils import timezone
 
+from applications.home.batching import batched_changes, record_change
 from applications.home.models import BaseModel
-from applications.inv.models import Product
+from applications.home.money import document_total, line_totals
+from applications.inv.models import Product, adjust_stock
 
 
 
@@ -25,6 +32,16 @@ class ControlSequence(models.Model):
             control_seq.save()
             return next_number
 
+    @classmethod
+    def reserve_sequence_numbers(cls, sequence_name, count):
+        """Reserva count numeros consecutivos con un solo bloqueo y devuelve el primero"""
+        with transaction.atomic():
+            control_seq = cls.objects.select_for_update().get(name=sequence_name)
+            first_number = control_seq.sequence_number + 1
+            control_seq.sequence_number += count
+            control_seq.save()
+            return first_number
+
 class Customer(BaseModel):
     NAT = 'Natural'
     JUR = 'Juridica'
@@ -56,6 +73,19 @@ class Customer(BaseModel):
     
     def full_name(self):
         return f'{self.name} {self.last_name}'
+
+    @classmethod
+    def search(cls, term):
+        """
+        Clientes activos cuyo DNI, nombre o apellido empiezan por cada palabra
+        del termino. Las busquedas por prefijo usan los indices de Meta.
+        """
+        customers = cls.objects.filter(status=True)
+        for word in term.split():
+            customers = customers.filter(
+                Q(dni__startswith=word) | Q(name__istartswith=word) | Q(last_name__istartswith=word)
+            )
+        return customers.order_by('name', 'last_name', 'id')
     
     def save(self):
         self.name = self.name.title()
@@ -67,6 +97,11 @@ class Customer(BaseModel):
         verbose_name = 'Cliente'
         verbose_name_plural = 'Clientes'
         ordering = ['name']
+        indexes = [
+            # istartswith genera UPPER(campo) LIKE 'X%'
+            models.Index(OpClass(Upper('name'), name='text_pattern_ops'), name='customer_name_prefix_idx'),
+            models.Index(OpClass(Upper('last_name'), name='text_pattern_ops'), name='customer_lastname_prefix_idx'),
+        ]
 
     def toggle_status(self):
         self.status = not self.status
@@ -74,8 +109,52 @@ class Customer(BaseModel):
         return self.status
     
 
+class Register(BaseModel):
+    """
+    Caja o terminal de cobro. Guarda su saldo y su estado de apertura para
+    que cada caja encadene sus movimientos sin competir con las demas.
+    """
+    name = models.CharField('Nombre', max_length=100, unique=True)
+    balance = models.DecimalField('Saldo Actual', max_digits=10, decimal_places=2, default=0)
+    opened_at = models.DateTimeField('Abierta', null=True, blank=True)
+    closed_at = models.DateTimeField('Cerrada', null=True, blank=True)
+
+    class Meta:
+        verbose_name = 'Caja'
+        verbose_name_plural = 'Cajas'
+        ordering = ['name']
+
+    def __str__(self):
+        return self.name
+
+    def is_open(self):
+        """Abierta hoy y sin cerrar"""
+        if not self.opened_at or timezone.localdate(self.opened_at) != timezone.localdate():
+            return False
+        return not self.closed_at or self.closed_at < self.opened_at
+
+    def is_closed_today(self):
+        return bool(self.closed_at) and timezone.localdate(self.closed_at) == timezone.localdate()
+
+    def record(self, operation_type, amount):
+        """Aplica un movimiento al saldo y estado de la caja (fila bloqueada); devuelve el saldo"""
+        if operation_type in (CashRegister.CASH_OPEN, CashRegister.CASH_IN):
+            self.balance += amount
+        elif operation_type == CashRegister.CASH_OUT:
+            self.balance -= amount
+        elif operation_type == CashRegister.CASH_CLOSE:
+            self.balance = 0  # Al cerrar caja, el saldo vuelve a 0
+        if operation_type == CashRegister.CASH_OPEN:
+            self.opened_at = timezone.now()
+        elif operation_type == CashRegister.CASH_CLOSE:
+            self.closed_at = timezone.now()
+        self.save(update_fields=['balance', 'opened_at', 'closed_at', 'updated_at'])
+        return self.balance
+
+
 class Sale(BaseModel):
     customer = models.ForeignKey(Customer, on_delete=models.CASCADE)
+    register = models.ForeignKey(Register, on_delete=models.PROTECT, related_name='sales', null=True, blank=True, verbose_name='Caja')
     invoice_number = models.CharField('Numero de Factura', max_length=100, unique=True, editable=False) 
     date = models.DateField('Fecha de Venta', auto_now_add=True)
     observation = models.TextField('Observacion', blank=True, null=True)
@@ -83,6 +162,8 @@ class Sale(BaseModel):
     tax = models.DecimalField('Impuesto', max_digits=10, decimal_places=2, default=0.00, null=True, blank=True)
     discount = models.DecimalField('Descuento', max_digits=10, decimal_places=2, default=0.00, null=True, blank=True)
     total_amount = models.DecimalField('Monto Total', max_digits=10, decimal_places=2, default=0.00)
+    # Hora local de la venta (0-23) para agrupar las ventas del dia por hora
+    hour = models.PositiveSmallIntegerField('Hora', editable=False)
 
     def __str__(self):
         return f'Venta {self.invoice_number} - {self.customer.full_name()} - {self.total_amount}'
@@ -95,13 +176,21 @@ class Sale(BaseModel):
             # Formatear el número con ceros a la izquierda, e.g., 00001
             self.invoice_number = f"INV-{next_number:05d}"
         self.invoice_number = self.invoice_number.upper()
-        self.total_amount = float(self.subtotal) - float(self.discount) + float(self.tax)
+        self.total_amount = document_total(self.subtotal, self.discount, self.tax)
+        if self.hour is None:
+            self.hour = timezone.localtime(self.created_at).hour if self.created_at else timezone.localtime().hour
         return super(Sale, self).save()
     
     class Meta:
         verbose_name = 'Venta'
         verbose_name_plural = 'Ventas'
         ordering = ['-date']
+        indexes = [
+            # Paginacion por keyset del listado de ventas
+            models.Index(fields=['date', 'id'], name='sale_date_id_idx'),
+            models.Index(fields=['register', 'date'], name='sale_register_date_idx'),
+            models.Index(fields=['date', 'hour'], name='sale_date_hour_idx'),
+        ]
         permissions = [
             ('supervisor_cashier_envoice',' Permiso para agregar o quitar elementos de una factura (devoluciones)')
             ]
@@ -111,6 +200,14 @@ class Sale(BaseModel):
         self.save()
         return self.status
 
+class LineQuerySet(models.QuerySet):
+    """Borrado de lineas con un solo recalculo de stock y cabeceras por lote"""
+
+    def delete(self):
+        with transaction.atomic(using=self.db), batched_changes():
+            return super().delete()
+
+
 class SaleDetail(BaseModel):
     sale = models.ForeignKey(Sale, on_delete=models.CASCADE, related_name='details')
     product = models.ForeignKey(Product, on_delete=models.CASCADE)
@@ -120,13 +217,18 @@ class SaleDetail(BaseModel):
     discount = models.DecimalField('Descuento', max_digits=10, decimal_places=2, default=0, null=True, blank=True)
     subtotal = models.DecimalField('SubTotal', max_digits=10, decimal_places=2)
     total_price = models.DecimalField('Precio Total', max_digits=10, decimal_places=2)
+    # Costo unitario al momento de la venta; los margenes no leen el catalogo
+    unit_cost = models.DecimalField('Costo Unitario', max_digits=10, decimal_places=2, null=True, blank=True)
+
+    objects = LineQuerySet.as_manager()
 
     def __str__(self):
         return f'{self.product.name} - {self.quantity} x {self.unit_price} = {self.total_price}'
     
     def save(self):
-        self.subtotal = float(self.quantity) * float(self.unit_price)
-        self.total_price = float(self.subtotal) + float(self.tax) - float(self.discount)
+        self.subtotal, self.total_price = line_totals(self.quantity, self.unit_price, self.tax, self.discount)
+        if self.unit_cost is None:
+            self.unit_cost = self.product.sale_cost()
         return super(SaleDetail, self).save()
     
     class Meta:
@@ -139,26 +241,35 @@ class SaleDetail(BaseModel):
         ]
 
 
+def recompute_sale_totals(sale_ids):
+    """Recalcula los totales de las ventas con una consulta de agregados por lote"""
+    totals = {
+        row['sale']: row
+        for row in SaleDetail.objects.filter(sale__in=sale_ids, status=True).order_by()
+        .values('sale').annotate(Sum('subtotal'), Sum('discount'), Sum('tax'))
+    }
+    for sale in Sale.objects.filter(pk__in=sale_ids):
+        row = totals.get(sale.pk, {})
+        sale.subtotal = row.get('subtotal__sum') or 0
+        sale.discount = row.get('discount__sum') or 0
+        sale.tax = row.get('tax__sum') or 0
+        sale.save()
+
+
+def apply_sale_line_deletes(changes):
+    """Devuelve al stock las lineas activas borradas y recalcula sus ventas"""
+    restock = {}
+    for sale_id, product_id, quantity in changes:
+        restock[product_id] = restock.get(product_id, 0) + quantity
+    adjust_stock(restock)
+    recompute_sale_totals({sale_id for sale_id, _, _ in changes})
+
+
 @receiver(post_delete, sender=SaleDetail)
 def update_sale_delete(sender, instance, **kwargs):
-    id_product = instance.product.id
-    id_sale = instance.sale.id
-
-    header = SaleDetail.objects.filter(pk=id_sale).first()
-    if header:
-            sub_total = SaleDetail.objects.filter(purchase_order=id_sale).aggregate(Sum('subtotal'))
-            discount = SaleDetail.objects.filter(purchase_order=id_sale).aggregate(Sum('discount'))
-            tax = SaleDetail.objects.filter(purchase_order=id_sale).aggregate(Sum('tax'))
-            header.subtotal = sub_total["subtotal__sum"]
-            header.discount = discount["discount__sum"]
-            header.tax = tax["tax__sum"]
-            header.save()
-    
-    product = Product.objects.filter(pk=id_product).first()
-    if product:
-        quantity = int(product.stock) + int(instance.quantity)
-        product.stock = quantity
-        product.save()
+    # Las lineas anuladas ya devolvieron su stock
+    quantity = instance.quantity if instance.status else 0
+    record_change(apply_sale_line_deletes, (instance.sale_id, instance.product_id, quantity))
 
 @receiver(post_save, sender=SaleDetail)
 def update_sale_save(sender, instance, created, **kwargs):
@@ -171,6 +282,45 @@ def update_sale_save(sender, instance, created, **kwargs):
         product.save()
 
 
+class SaleReturn(BaseModel):
+    """Documento de devolucion: lineas de una venta anuladas en una sola operacion"""
+    # Sin restriccion en la base: la venta puede pasar al archivo (archive_sales)
+    sale = models.ForeignKey(Sale, on_delete=models.DO_NOTHING, db_constraint=False, related_name='returns')
+    number = models.CharField('Numero de Devolucion', max_length=100, unique=True, editable=False)
+    date = models.DateTimeField('Fecha de Devolucion', auto_now_add=True)
+    authorized_by = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.PROTECT, related_name='authorized_returns')
+    reason = models.TextField('Motivo', blank=True, null=True)
+    subtotal = models.DecimalField('Subtotal', max_digits=10, decimal_places=2, default=0)
+    tax = models.DecimalField('Impuesto', max_digits=10, decimal_places=2, default=0)
+    discount = models.DecimalField('Descuento', max_digits=10, decimal_places=2, default=0)
+    total_amount = models.DecimalField('Monto Total', max_digits=10, decimal_places=2, default=0)
+
+    class Meta:
+        verbose_name = 'Devolucion'
+        verbose_name_plural = 'Devoluciones'
+        ordering = ['-date']
+
+    def __str__(self):
+        return f'Devolucion {self.number} - {self.total_amount}'
+
+
+class SaleReturnDetail(models.Model):
+    """Linea devuelta: copia de la linea de venta anulada"""
+    sale_return = models.ForeignKey(SaleReturn, on_delete=models.CASCADE, related_name='details')
+    sale_detail = models.ForeignKey(SaleDetail, on_delete=models.DO_NOTHING, db_constraint=False, related_name='+')
+    product = models.ForeignKey(Product, on_delete=models.PROTECT, related_name='+')
+    quantity = models.PositiveIntegerField('Cantidad')
+    unit_price = models.DecimalField('Precio Unitario', max_digits=10, decimal_places=2)
+    total_price = models.DecimalField('Precio Total', max_digits=10, decimal_places=2)
+
+    class Meta:
+        verbose_name = 'Detalle de Devolucion'
+        verbose_name_plural = 'Detalles de Devoluciones'
+
+    def __str__(self):
+        return f'{self.product_id} - {self.quantity} x {self.unit_price}'
+
+
 class DailyReport(BaseModel):
     """Modelo para registrar informes diarios generados"""
     report_date = models.DateField('Fecha del Reporte', unique=True)
@@ -182,6 +332,16 @@ class DailyReport(BaseModel):
     closing_balance = models.DecimalField('Saldo Final', max_digits=10, decimal_places=2, default=0)
     cash_difference = models.DecimalField('Diferencia en Caja', max_digits=10, decimal_places=2, default=0)
     observations = models.TextField('Observaciones', blank=True, null=True)
+    # Cifras del cierre del dia (applications/sales/closing.py)
+    count_sales = models.PositiveIntegerField('Cantidad de Ventas', default=0)
+    subtotal = models.DecimalField('SubTotal', max_digits=10, decimal_places=2, default=0)
+    discount = models.DecimalField('Descuento', max_digits=10, decimal_places=2, default=0)
+    tax = models.DecimalField('Impuesto', max_digits=10, decimal_places=2, default=0)
+    total_cost = models.DecimalField('Costo Total', max_digits=12, decimal_places=2, default=0)
+    total_profit = models.DecimalField('Ganancia Total', max_digits=12, decimal_places=2, default=0)
+    cash_ins = models.DecimalField('Ingresos de Efectivo', max_digits=10, decimal_places=2, default=0)
+    cash_outs = models.DecimalField('Retiros de Efectivo', max_digits=10, decimal_places=2, default=0)
+    computed_at = models.DateTimeField('Calculado', null=True, blank=True)
 
     class Meta:
         verbose_name = 'Informe Diario'
@@ -191,8 +351,65 @@ class DailyReport(BaseModel):
     def __str__(self):
         return f'Informe {self.report_date}'
 
+
+class DailyReportProduct(models.Model):
+    """Producto vendido en el dia, por precio de venta; copia nombre y marca del momento"""
+    report = models.ForeignKey(DailyReport, on_delete=models.CASCADE, related_name='products')
+    product = models.ForeignKey(Product, on_delete=models.SET_NULL, null=True, related_name='+')
+    name = models.CharField('Producto', max_length=100)
+    code = models.CharField('Codigo', max_length=50, blank=True)
+    brand = models.CharField('Marca', max_length=100, blank=True, null=True)
+    unit_price = models.DecimalField('Precio Unitario', max_digits=10, decimal_places=2)
+    quantity = models.PositiveIntegerField('Cantidad', default=0)
+    sales_amount = models.DecimalField('Ventas', max_digits=12, decimal_places=2, default=0)
+    cost = models.DecimalField('Costo', max_digits=12, decimal_places=2, default=0)
+    profit = models.DecimalField('Ganancia', max_digits=12, decimal_places=2, default=0)
+
+    class Meta:
+        verbose_name = 'Producto del Informe Diario'
+        verbose_name_plural = 'Productos del Informe Diario'
+        ordering = ['-quantity', 'id']
+
+    def __str__(self):
+        return f'{self.report_id} - {self.name}: {self.quantity}'
+
+
+class DailyReportBrand(models.Model):
+    """Ventas, costo y ganancia del dia por marca"""
+    report = models.ForeignKey(DailyReport, on_delete=models.CASCADE, related_name='brands')
+    brand = models.CharField('Marca', max_length=100, blank=True, null=True)
+    quantity = models.PositiveIntegerField('Cantidad', default=0)
+    sales_amount = models.DecimalField('Ventas', max_digits=12, decimal_places=2, default=0)
+    cost = models.DecimalField('Costo', max_digits=12, decimal_places=2, default=0)
+    profit = models.DecimalField('Ganancia', max_digits=12, decimal_places=2, default=0)
+
+    class Meta:
+        verbose_name = 'Marca del Informe Diario'
+        verbose_name_plural = 'Marcas del Informe Diario'
+        ordering = ['-sales_amount', 'id']
+
+    def __str__(self):
+        return f'{self.report_id} - {self.brand}: {self.sales_amount}'
+
+
+class DailyReportCustomer(models.Model):
+    """Clientes que mas compraron en el dia"""
+    report = models.ForeignKey(DailyReport, on_delete=models.CASCADE, related_name='customers')
+    customer = models.ForeignKey(Customer, on_delete=models.SET_NULL, null=True, related_name='+')
+    name = models.CharField('Cliente', max_length=255)
+    total_amount = models.DecimalField('Total Compras', max_digits=12, decimal_places=2, default=0)
+    count_sales = models.PositiveIntegerField('Cantidad de Compras', default=0)
+
+    class Meta:
+        verbose_name = 'Cliente del Informe Diario'
+        verbose_name_plural = 'Clientes del Informe Diario'
+        ordering = ['-total_amount', 'id']
+
+    def __str__(self):
+        return f'{self.report_id} - {self.name}: {self.total_amount}'
+
 class CashRegister(BaseModel):
-    """Modelo para control de caja"""
+    """Movimiento de caja de una terminal (Register)"""
     CASH_IN = 'in'
     CASH_OUT = 'out'
     CASH_OPEN = 'open'
@@ -205,10 +422,14 @@ class CashRegister(BaseModel):
         (CASH_OUT, 'Retiro de Efectivo'),
     ]
 
+    register = models.ForeignKey(Register, on_delete=models.PROTECT, related_name='movements', null=True, blank=True, verbose_name='Caja')
     operation_type = models.CharField('Tipo de Operación', max_length=10, choices=OPERATION_TYPES)
     amount = models.DecimalField('Monto', max_digits=10, decimal_places=2)
     date = models.DateTimeField('Fecha y Hora', auto_now_add=True)
-    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='cash_register_movements')
+    # Fecha local del movimiento (TIME_ZONE): las consultas por dia la comparan
+    # directo en lugar de convertir date en cada fila
+    business_day = models.DateField('Dia Operativo', editable=False)
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
     description = models.TextField('Descripción', blank=True, null=True)
     current_balance = models.DecimalField('Saldo Actual', max_digits=10, decimal_places=2, default=0)
 
@@ -216,15 +437,25 @@ class CashRegister(BaseModel):
         verbose_name = 'Movimiento de Caja'
         verbose_name_plural = 'Movimientos de Caja'
         ordering = ['-date']
+        indexes = [
+            models.Index(fields=['register', 'date'], name='cashregister_register_date_idx'),
+            models.Index(fields=['business_day', 'register'], name='cashregister_day_register_idx'),
+        ]
 
     def __str__(self):
         return f'{self.get_operation_type_display()} - ${self.amount} - {self.date.strftime("%d/%m/%Y %H:%M")}'
 
     def save(self, *args, **kwargs):
-        # Asignar el usuario actual si no hay created_by
-        if not self.created_by_id and hasattr(self, '_current_user'):
-            self.created_by = self._current_user
-        
+        if self.business_day is None:
+            self.business_day = timezone.localdate(self.date) if self.date else timezone.localdate()
+        if not self.pk and self.register_id:
+            # El saldo de cada caja se encadena sobre su propia fila bloqueada
+            with transaction.atomic():
+                register = Register.objects.select_for_update().get(pk=self.register_id)
+                self.current_balance = register.record(self.operation_type, self.amount)
+                super().save(*args, **kwargs)
+            return
+
         # Calcular saldo actual basado en movimientos anteriores
         if not self.pk:  # Solo para nuevos registros
             last_balance = CashRegister.objects.filter(
@@ -242,49 +473,103 @@ class CashRegister(BaseModel):
                 self.current_balance = 0  # Al cerrar caja, el saldo vuelve a 0
         
         super().save(*args, **kwargs)
-    """Modelo para control de caja"""
-    CASH_IN = 'in'
-    CASH_OUT = 'out'
-    CASH_OPEN = 'open'
-    CASH_CLOSE = 'close'
-    
-    OPERATION_TYPES = [
-        (CASH_OPEN, 'Apertura de Caja'),
-        (CASH_CLOSE, 'Cierre de Caja'),
-        (CASH_IN, 'Ingreso de Efectivo'),
-        (CASH_OUT, 'Retiro de Efectivo'),
-    ]
 
-    operation_type = models.CharField('Tipo de Operación', max_length=10, choices=OPERATION_TYPES)
-    amount = models.DecimalField('Monto', max_digits=10, decimal_places=2)
-    date = models.DateTimeField('Fecha y Hora', auto_now_add=True)
-    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
-    description = models.TextField('Descripción', blank=True, null=True)
-    current_balance = models.DecimalField('Saldo Actual', max_digits=10, decimal_places=2, default=0)
+
+class IdempotencyKey(models.Model):
+    """
+    Respuesta de una solicitud enviada con la cabecera Idempotency-Key. Los
+    reintentos con la misma clave reciben esta respuesta sin repetir la venta
+    (ver applications/sales/idempotency.py).
+    """
+    key = models.CharField('Clave', max_length=64, unique=True)
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='idempotency_keys')
+    path = models.CharField('Ruta', max_length=255)
+    status_code = models.PositiveSmallIntegerField('Codigo de Estado', null=True, blank=True)
+    content_type = models.CharField('Tipo de Contenido', max_length=100, blank=True, default='')
+    location = models.CharField('Redireccion', max_length=255, blank=True, default='')
+    body = models.TextField('Respuesta', blank=True, default='')
+    created_at = models.DateTimeField('Fecha de Creacion', auto_now_add=True, db_index=True)
 
     class Meta:
-        verbose_name = 'Movimiento de Caja'
-        verbose_name_plural = 'Movimientos de Caja'
+        verbose_name = 'Clave de Idempotencia'
+        verbose_name_plural = 'Claves de Idempotencia'
+
+    def __str__(self):
+        return f'{self.key} - {self.path}'
+
+    @classmethod
+    def expired(cls):
+        """Claves con mas de IDEMPOTENCY_KEY_TTL segundos"""
+        limit = timezone.now() - timedelta(seconds=settings.IDEMPOTENCY_KEY_TTL)
+        return cls.objects.filter(created_at__lt=limit)
+
+    def is_expired(self):
+        return (timezone.now() - self.created_at).total_seconds() > settings.IDEMPOTENCY_KEY_TTL
+
+
+class SaleHistory(models.Model):
+    """
+    Ventas activas y archivadas (vista sales_sale_history, ver
+    applications/sales/archive.py). Solo lectura, para reportes historicos.
+    """
+    customer = models.ForeignKey(Customer, on_delete=models.DO_NOTHING, db_constraint=False, related_name='+')
+    register = models.ForeignKey(Register, on_delete=models.DO_NOTHING, db_constraint=False, related_name='+', null=True)
+    invoice_number = models.CharField('Numero de Factura', max_length=100)
+    date = models.DateField('Fecha de Venta')
+    observation = models.TextField('Observacion', blank=True, null=True)
+    subtotal = models.DecimalField('Subtotal', max_digits=10, decimal_places=2)
+    tax = models.DecimalField('Impuesto', max_digits=10, decimal_places=2, null=True)
+    discount = models.DecimalField('Descuento', max_digits=10, decimal_places=2, null=True)
+    total_amount = models.DecimalField('Monto Total', max_digits=10, decimal_places=2)
+    hour = models.PositiveSmallIntegerField('Hora', null=True)
+    status = models.BooleanField('Estado')
+
+    class Meta:
+        managed = False
+        db_table = 'sales_sale_history'
+        verbose_name = 'Venta (historico)'
+        verbose_name_plural = 'Ventas (historico)'
         ordering = ['-date']
 
     def __str__(self):
-        return f'{self.get_operation_type_display()} - ${self.amount} - {self.date.strftime("%d/%m/%Y %H:%M")}'
+        return f'Venta {self.invoice_number} - {self.total_amount}'
 
-    def save(self, *args, **kwargs):
-        # Calcular saldo actual basado en movimientos anteriores
-        if not self.pk:  # Solo para nuevos registros
-            last_balance = CashRegister.objects.filter(
-                status=True
-            ).order_by('-date').values_list('current_balance', flat=True).first()
-            
-            if last_balance is None:
-                last_balance = 0
-            
-            if self.operation_type == self.CASH_OPEN or self.operation_type == self.CASH_IN:
-                self.current_balance = last_balance + self.amount
-            elif self.operation_type == self.CASH_OUT:
-                self.current_balance = last_balance - self.amount
-            elif self.operation_type == self.CASH_CLOSE:
-                self.current_balance = 0  # Al cerrar caja, el saldo vuelve a 0
-        
-        super().save(*args, **kwargs)
\ No newline at end of file
+
+class SaleDetailHistory(models.Model):
+    """Lineas de venta activas y archivadas (vista sales_saledetail_history)"""
+    sale = models.ForeignKey(SaleHistory, on_delete=models.DO_NOTHING, db_constraint=False, related_name='details')
+    product = models.ForeignKey(Product, on_delete=models.DO_NOTHING, db_constraint=False, related_name='+')
+    quantity = models.PositiveIntegerField('Cantidad')
+    unit_price = models.DecimalField('Precio Unitario', max_digits=10, decimal_places=2)
+    tax = models.DecimalField('Impuesto', max_digits=10, decimal_places=2, null=True)
+    discount = models.DecimalField('Descuento', max_digits=10, decimal_places=2, null=True)
+    subtotal = models.DecimalField('SubTotal', max_digits=10, decimal_places=2)
+    total_price = models.DecimalField('Precio Total', max_digits=10, decimal_places=2)
+    unit_cost = models.DecimalField('Costo Unitario', max_digits=10, decimal_places=2, null=True)
+    status = models.BooleanField('Estado')
+
+    class Meta:
+        managed = False
+        db_table = 'sales_saledetail_history'
+        verbose_name = 'Detalle de Venta (historico)'
+        verbose_name_plural = 'Detalles de Ventas (historico)'
+
+
+class CashRegisterHistory(models.Model):
+    """Movimientos de caja activos y archivados (vista sales_cashregister_history)"""
+    register = models.ForeignKey(Register, on_delete=models.DO_NOTHING, db_constraint=False, related_name='+', null=True)
+    operation_type = models.CharField('Tipo de Operación', max_length=10, choices=CashRegister.OPERATION_TYPES)
+    amount = models.DecimalField('Monto', max_digits=10, decimal_places=2)
+    date = models.DateTimeField('Fecha y Hora')
+    business_day = models.DateField('Dia Operativo', null=True)
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.DO_NOTHING, db_constraint=False, related_name='+')
+    description = models.TextField('Descripción', blank=True, null=True)
+    current_balance = models.DecimalField('Saldo Actual', max_digits=10, decimal_places=2)
+    status = models.BooleanField('Estado')
+
+    class Meta:
+        managed = False
+        db_table = 'sales_cashregister_history'
+        verbose_name = 'Movimiento de Caja (historico)'
+        verbose_name_plural = 'Movimientos de Caja (historico)'
+        ordering = ['-date']
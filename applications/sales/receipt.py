@@ -0,0 +1,132 @@
+import socket
+
+from django.conf import settings
+
+from .models import Sale, SaleDetail
+
+
+COMPANY_NAME = 'Tienda RammerBot'
+COMPANY_ADDRESS = 'Calle principal de la Campiña 2'
+FOOTER = ['© RammerBot DEBS Consultores', 'rammer@rammerbot.com']
+
+# Comandos ESC/POS (Epson y compatibles)
+ESC = b'\x1b'
+GS = b'\x1d'
+INIT = ESC + b'@'
+CODEPAGE_1252 = ESC + b't\x10'
+ALIGN = {'left': ESC + b'a\x00', 'center': ESC + b'a\x01', 'right': ESC + b'a\x02'}
+BOLD_ON, BOLD_OFF = ESC + b'E\x01', ESC + b'E\x00'
+DOUBLE_ON, DOUBLE_OFF = GS + b'!\x11', GS + b'!\x00'
+FEED_AND_CUT = ESC + b'd\x04' + GS + b'V\x00'
+ENCODING = 'cp1252'
+
+# Estilos de linea
+NORMAL = 'normal'
+BOLD = 'bold'
+DOUBLE = 'double'
+
+
+def load_sale(sale_id):
+    """
+    Venta y sus items activos con una sola consulta: la cabecera viaja en el
+    select_related de los items. Los items anulados no salen en el ticket; solo
+    si no queda ninguno activo se consulta la venta.
+    """
+    items = list(
+        SaleDetail.objects.filter(sale_id=sale_id, status=True)
+        .select_related('product', 'sale__customer', 'sale__created_by')
+        .order_by('id')
+    )
+    if items:
+        return items[0].sale, items
+    return Sale.objects.select_related('customer', 'created_by').get(pk=sale_id), items
+
+
+def _columns(left, right, width):
+    """Texto a la izquierda y monto a la derecha en un ancho fijo"""
+    left = left[:max(width - len(right) - 1, 0)]
+    return left + ' ' * (width - len(left) - len(right)) + right
+
+
+def receipt_lines(sale, items, width=None):
+    """Lineas del ticket como (texto, alineacion, estilo)"""
+    width = width or settings.RECEIPT_WIDTH
+    rule = ('-' * width, 'left', NORMAL)
+    lines = [
+        (COMPANY_NAME, 'center', DOUBLE),
+        (COMPANY_ADDRESS, 'center', NORMAL),
+        (f'FACTURA No. {sale.invoice_number}', 'center', BOLD),
+        rule,
+        (f'Fecha: {sale.date:%d/%m/%Y}', 'left', NORMAL),
+        (f'Cliente: {sale.customer.full_name()}'[:width], 'left', NORMAL),
+        (f'DNI: {sale.customer.dni}', 'left', NORMAL),
+        rule,
+    ]
+
+    for item in items:
+        lines.append((item.product.name[:width], 'left', NORMAL))
+        detail = f'  {item.product.code} {item.quantity} x {item.unit_price}'
+        lines.append((_columns(detail, f'{item.total_price}', width), 'left', NORMAL))
+        if item.discount:
+            lines.append((_columns('  Descuento', f'-{item.discount}', width), 'left', NORMAL))
+
+    lines.append(rule)
+    lines.append((_columns('Sub Total:', f'{sale.subtotal}', width), 'left', NORMAL))
+    if sale.tax:
+        lines.append((_columns('IVA:', f'{sale.tax}', width), 'left', NORMAL))
+    if sale.discount:
+        lines.append((_columns('Descuento:', f'-{sale.discount}', width), 'left', NORMAL))
+    lines.append((_columns('TOTAL:', f'{sale.total_amount}', width), 'left', BOLD))
+    lines.append(('=' * width, 'left', NORMAL))
+    lines.append((f'Atendido por: {sale.created_by}'[:width], 'center', NORMAL))
+    lines.extend((text, 'center', NORMAL) for text in FOOTER)
+    return lines
+
+
+def render_text(lines, width=None):
+    """Ticket en texto de ancho fijo"""
+    width = width or settings.RECEIPT_WIDTH
+    output = []
+    for text, align, style in lines:
+        if align == 'center':
+            text = text.center(width).rstrip()
+        elif align == 'right':
+            text = text.rjust(width)
+        output.append(text)
+    return '\n'.join(output) + '\n'
+
+
+def render_escpos(lines):
+    """Ticket como flujo de bytes ESC/POS listo para la impresora"""
+    output = bytearray(INIT + CODEPAGE_1252)
+    for text, align, style in lines:
+        output += ALIGN[align]
+        if style == DOUBLE:
+            output += DOUBLE_ON
+        elif style == BOLD:
+            output += BOLD_ON
+        output += text.encode(ENCODING, errors='replace') + b'\n'
+        if style == DOUBLE:
+            output += DOUBLE_OFF
+        elif style == BOLD:
+            output += BOLD_OFF
+    output += ALIGN['left'] + FEED_AND_CUT
+    return bytes(output)
+
+
+def send_to_printer(data, target=None):
+    """
+    Envia el ticket a la impresora: 'host:puerto' para impresoras de red
+    (p.ej. 192.168.1.50:9100) o la ruta de un archivo/dispositivo (/dev/usb/lp0).
+    """
+    target = target or settings.RECEIPT_PRINTER
+    if not target:
+        raise ValueError('No hay impresora de tickets configurada (RECEIPT_PRINTER)')
+
+    host, _, port = target.rpartition(':')
+    if host and port.isdigit():
+        with socket.create_connection((host, int(port)), timeout=5) as connection:
+            connection.sendall(data)
+    else:
+        with open(target, 'ab') as printer:
+            printer.write(data)
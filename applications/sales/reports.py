@@ -1,55 +1,36 @@
-import os
 from datetime import datetime, date, timedelta
 
 from django.shortcuts import render,redirect
-from django.conf import settings
-from django.contrib.staticfiles import finders
-from django.http import HttpResponse
-from django.template.loader import get_template
-from django.db.models import Sum, Q, Count, Avg
+from django.http import HttpResponse, JsonResponse
+from django.contrib.auth.decorators import login_required
+from django.views.decorators.http import require_POST
+from django.db.models import Sum, Q, Count, Avg, Value
 from django.utils import timezone
 from django.db.models.functions import TruncMonth
 from django.db import models
 
-from xhtml2pdf import pisa
-
-from .models import Sale, SaleDetail, Customer, CashRegister, DailyReport
+from applications.home.pdf import render_to_pdf
+from applications.home.replica import primary_reads, replica_reads
+from .models import (
+    Sale, SaleDetail, Customer, CashRegister, DailyReport,
+    SaleHistory, SaleDetailHistory, CashRegisterHistory,
+)
+from .closing import close_day, is_stale
+from .receipt import load_sale, receipt_lines, render_escpos, render_text, send_to_printer
 from applications.inv.models import Product, Category
 
 
-def link_callback(uri, rel):
+def report_models(request):
     """
-    Convert HTML URIs to absolute system paths so xhtml2pdf can access those
-    resources
+    Modelos de venta, linea y caja del reporte. Con ?include_archive=1 se
+    leen las vistas historicas, que suman los meses archivados.
     """
-    result = finders.find(uri)
-
-    if result:
-        if not isinstance(result, (list, tuple)):
-            result = [result]
-        result = list(os.path.realpath(path) for path in result)
-        path = result[0]
-    else:
-        static_url = settings.STATIC_URL    # Usually /static/
-        static_root = settings.STATIC_ROOT  # Usually /home/user/project_static/
-        media_url = settings.MEDIA_URL      # Usually /media/
-        media_root = settings.MEDIA_ROOT    # Usually /home/user/project_static/media/
-
-        if uri.startswith(media_url):
-            path = os.path.join(media_root, uri.replace(media_url, ""))
-        elif uri.startswith(static_url):
-            path = os.path.join(static_root, uri.replace(static_url, ""))
-        else:
-            return uri
-
-    # make sure that file exists
-    if not os.path.isfile(path):
-        raise RuntimeError(
-            f'media URI must start with {static_url} or {media_url}'
-        )
-    return path
+    if request.GET.get('include_archive'):
+        return SaleHistory, SaleDetailHistory, CashRegisterHistory
+    return Sale, SaleDetail, CashRegister
 
 
+@replica_reads
 def sales_report_to_pdf(request):
     template_path = 'sales/sales_report.html'
     today = timezone.now()
@@ -59,7 +40,8 @@ def sales_report_to_pdf(request):
     end_date_str = request.GET.get('end_date')
     
     # Filtrar ventas por rango de fechas si se proporciona
-    sales = Sale.objects.all()
+    sale_model, detail_model, _ = report_models(request)
+    sales = sale_model.objects.all()
     
     if start_date_str and end_date_str:
         try:
@@ -80,7 +62,7 @@ def sales_report_to_pdf(request):
     )
     
     # Productos más vendidos por categoría
-    top_products_by_category = SaleDetail.objects.filter(
+    top_products_by_category = detail_model.objects.filter(
         sale__in=sales
     ).values(
         'product__subcategory__category__name',
@@ -93,7 +75,7 @@ def sales_report_to_pdf(request):
     ).order_by('product__subcategory__category__name', '-total_vendido')
     
     # Productos más vendidos por proveedor
-    top_products_by_supplier = SaleDetail.objects.filter(
+    top_products_by_supplier = detail_model.objects.filter(
         sale__in=sales
     ).values(
         'product__brand__name',  # Asumiendo que brand representa al proveedor
@@ -107,18 +89,18 @@ def sales_report_to_pdf(request):
     ).order_by('product__brand__name', '-total_vendido')
     
     # Ventas por categoría
-    sales_by_category = SaleDetail.objects.filter(
+    sales_by_category = detail_model.objects.filter(
         sale__in=sales
     ).values(
         'product__subcategory__category__name'
     ).annotate(
         total_ventas=Sum('quantity'),
         total_ingresos=Sum('total_price'),
-        porcentaje_ingresos=Sum('total_price') * 100 / total_general['total_sum'] if total_general['total_sum'] else 0
+        porcentaje_ingresos=Sum('total_price') * 100 / total_general['total_sum'] if total_general['total_sum'] else Value(0)
     ).order_by('-total_ingresos')
     
     # Ventas por proveedor (marca)
-    sales_by_supplier = SaleDetail.objects.filter(
+    sales_by_supplier = detail_model.objects.filter(
         sale__in=sales
     ).values(
         'product__brand__name'
@@ -126,7 +108,7 @@ def sales_report_to_pdf(request):
         total_ventas=Sum('quantity'),
         total_ingresos=Sum('total_price'),
         cantidad_productos=Count('product', distinct=True),
-        porcentaje_ingresos=Sum('total_price') * 100 / total_general['total_sum'] if total_general['total_sum'] else 0
+        porcentaje_ingresos=Sum('total_price') * 100 / total_general['total_sum'] if total_general['total_sum'] else Value(0)
     ).order_by('-total_ingresos')
     
     # Ventas por cliente
@@ -150,22 +132,29 @@ def sales_report_to_pdf(request):
         cantidad_ventas=Count('id')
     ).order_by('month')
     
-    # Productos con mejor margen (basado en precio de venta vs último precio de compra)
-    high_margin_products = SaleDetail.objects.filter(
-        sale__in=sales
-    ).values(
-        'product__name',
-        'product__code',
-        'product__brand__name'
-    ).annotate(
+    # Productos con mejor margen, sobre el costo guardado en cada linea: el
+    # agregado no une el catalogo y solo se leen los 15 productos resultantes
+    high_margin_products = list(detail_model.objects.filter(
+        sale__in=sales,
+        unit_cost__isnull=False,
+    ).values('product_id').annotate(
         precio_venta_promedio=Avg('unit_price'),
         cantidad_vendida=Sum('quantity'),
-        total_ingresos=Sum('total_price')
-    ).order_by('-cantidad_vendida')[:15]
+        total_ingresos=Sum('total_price'),
+        total_costo=Sum(models.F('quantity') * models.F('unit_cost'), output_field=models.DecimalField()),
+    ).annotate(
+        ganancia=models.F('total_ingresos') - models.F('total_costo'),
+    ).order_by('-ganancia')[:15])
+    names = Product.objects.select_related('brand').in_bulk([row['product_id'] for row in high_margin_products])
+    for row in high_margin_products:
+        product = names.get(row['product_id'])
+        row['product__name'] = product.name if product else ''
+        row['product__code'] = product.code if product else ''
+        row['product__brand__name'] = product.brand.name if product else ''
     
     # Calcular métricas adicionales
     avg_sale_value = total_general['total_sum'] / total_general['count_sales'] if total_general['count_sales'] > 0 else 0
-    discount_percentage = (total_general['discount_sum'] / total_general['subtotal_sum'] * 100) if total_general['subtotal_sum'] > 0 else 0
+    discount_percentage = (total_general['discount_sum'] / total_general['subtotal_sum'] * 100) if total_general['subtotal_sum'] else 0
 
     context = {
         'sales': sales,
@@ -189,22 +178,7 @@ def sales_report_to_pdf(request):
         'request': request,
     }
 
-    response = HttpResponse(content_type='application/pdf')
-    response['Content-Disposition'] = 'inline; filename="reporte_ventas_analitico.pdf"'
-    template = get_template(template_path)
-    html = template.render(context)
-    
-    # create a pdf
-    pisa_status = pisa.CreatePDF(
-       html,
-       dest=response,
-       link_callback=link_callback,
-    )
-
-    if pisa_status.err:
-       return HttpResponse('We had some errors <pre>' + html + '</pre>')
-
-    return response
+    return render_to_pdf(template_path, context, 'reporte_ventas_analitico.pdf')
 
 
 def sales_report_filter(request):
@@ -214,46 +188,34 @@ def sales_report_filter(request):
 
 def print_sale_invoice(request, sale_id):
     """Generar PDF de factura individual de venta"""
-    template_path = 'sales/print_sale_invoice.html'
+    # Mismo ticket que la impresion desde el navegador
+    template_path = 'sales/print_invoice.html'
     today = timezone.now()
     
     # Obtener la venta específica
     try:
-        sale = Sale.objects.get(id=sale_id)
+        sale = Sale.objects.select_related('customer', 'created_by').get(id=sale_id)
     except Sale.DoesNotExist:
         return HttpResponse('Venta no encontrada')
     
-    sale_items = SaleDetail.objects.filter(sale=sale)
+    sale_items = SaleDetail.objects.filter(sale=sale).select_related('product')
     
     context = {
         'sale': sale,
         'items': sale_items,
+        'header': sale,
+        'detail': sale_items,
         'today': today,
         'request': request,
     }
 
-    response = HttpResponse(content_type='application/pdf')
-    response['Content-Disposition'] = f'inline; filename="factura_venta_{sale.invoice_number}.pdf"'
-    template = get_template(template_path)
-    html = template.render(context)
-    
-    # create a pdf
-    pisa_status = pisa.CreatePDF(
-       html,
-       dest=response,
-       link_callback=link_callback,
-    )
-
-    if pisa_status.err:
-       return HttpResponse('We had some errors <pre>' + html + '</pre>')
-
-    return response
+    return render_to_pdf(template_path, context, f'factura_venta_{sale.invoice_number}.pdf')
 
 def print_invoice(request, id):
     template_name = 'sales/print_invoice.html'
 
-    header = Sale.objects.get(id=id)
-    detail = SaleDetail.objects.filter(sale=header)
+    header = Sale.objects.select_related('customer', 'created_by').get(id=id)
+    detail = SaleDetail.objects.filter(sale=header).select_related('product')
 
     context = {
         'request':request,
@@ -263,6 +225,37 @@ def print_invoice(request, id):
 
     return render(request, template_name, context)
 
+@login_required(login_url='/login/')
+def print_receipt(request, sale_id):
+    """Ticket termico de la venta en texto plano o ESC/POS (?format=escpos)"""
+    try:
+        sale, items = load_sale(sale_id)
+    except Sale.DoesNotExist:
+        return HttpResponse('Venta no encontrada', status=404)
+
+    lines = receipt_lines(sale, items)
+    if request.GET.get('format') == 'escpos':
+        response = HttpResponse(render_escpos(lines), content_type='application/octet-stream')
+        response['Content-Disposition'] = f'attachment; filename="ticket_{sale.invoice_number}.bin"'
+        return response
+    return HttpResponse(render_text(lines), content_type='text/plain; charset=utf-8')
+
+@login_required(login_url='/login/')
+@require_POST
+def send_receipt(request, sale_id):
+    """Envia el ticket ESC/POS de la venta a la impresora configurada"""
+    try:
+        sale, items = load_sale(sale_id)
+    except Sale.DoesNotExist:
+        return JsonResponse({'success': False, 'error': 'Venta no encontrada'}, status=404)
+
+    try:
+        send_to_printer(render_escpos(receipt_lines(sale, items)))
+    except (OSError, ValueError) as e:
+        return JsonResponse({'success': False, 'error': f'No se pudo imprimir el ticket: {e}'}, status=503)
+
+    return JsonResponse({'success': True, 'message': f'Ticket {sale.invoice_number} enviado a la impresora'})
+
 def generate_budget_pdf(request):
     """Generar PDF del presupuesto"""
     template_path = 'sales/budget_pdf.html'
@@ -322,24 +315,11 @@ def generate_budget_pdf(request):
             'budget_number': f"PRE-{datetime.now().strftime('%Y%m%d')}-{request.user.id}",
         }
 
-        response = HttpResponse(content_type='application/pdf')
-        response['Content-Disposition'] = 'inline; filename="presupuesto.pdf"'
-        template = get_template(template_path)
-        html = template.render(context)
-        
-        pisa_status = pisa.CreatePDF(
-           html,
-           dest=response,
-           link_callback=link_callback,
-        )
-
-        if pisa_status.err:
-            return HttpResponse('We had some errors <pre>' + html + '</pre>')
-
-        return response
+        return render_to_pdf(template_path, context, 'presupuesto.pdf')
     
     return redirect('sales:create_budget')
 
+@replica_reads
 def daily_sales_report_to_pdf(request):
     """Generar PDF del informe diario de ventas"""
     template_path = 'sales/daily_sales_report.html'
@@ -350,165 +330,57 @@ def daily_sales_report_to_pdf(request):
         try:
             selected_date = datetime.strptime(date_param, '%Y-%m-%d').date()
         except ValueError:
-            selected_date = datetime.now().date()
+            selected_date = timezone.localdate()
     else:
-        selected_date = datetime.now().date()
-    
-    now = datetime.now()
-    
-    # Filtrar ventas de la fecha seleccionada
-    sales_today = Sale.objects.filter(date=selected_date, status=True)
-    
-    # Obtener información de caja del día seleccionado
-    start_of_day = datetime.combine(selected_date, datetime.min.time())
-    end_of_day = datetime.combine(selected_date, datetime.max.time())
-    
-    cash_movements = CashRegister.objects.filter(
-        date__range=(start_of_day, end_of_day), 
-        status=True
-    )
-    opening_balance = cash_movements.filter(operation_type=CashRegister.CASH_OPEN).aggregate(Sum('amount'))['amount__sum'] or 0
-    cash_ins = cash_movements.filter(operation_type=CashRegister.CASH_IN).aggregate(Sum('amount'))['amount__sum'] or 0
-    cash_outs = cash_movements.filter(operation_type=CashRegister.CASH_OUT).aggregate(Sum('amount'))['amount__sum'] or 0
-    
-    # Obtener último saldo registrado
-    last_movement = cash_movements.order_by('-date').first()
-    current_balance = last_movement.current_balance if last_movement else 0
-    
-    # Calcular diferencia en caja
-    expected_balance = opening_balance + (sales_today.aggregate(Sum('total_amount'))['total_amount__sum'] or 0) + cash_ins - cash_outs
-    cash_difference = current_balance - expected_balance
-    
-    # Calcular totales del día
-    daily_totals = sales_today.aggregate(
-        total_sum=Sum('total_amount'),
-        subtotal_sum=Sum('subtotal'),
-        discount_sum=Sum('discount'),
-        tax_sum=Sum('tax'),
-        count_sales=Count('id')
-    )
-    
-    # PRODUCTOS VENDIDOS CON DETALLE COMPLETO
-    products_sold_today = SaleDetail.objects.filter(
-        sale__in=sales_today,
-        status=True
-    ).values(
-        'product__id',
-        'product__name',
-        'product__code',
-        'product__brand__name',  # Proveedor
-        'product__last_purchase_price',  # Costo de compra
-        'unit_price'  # Precio de venta unitario
-    ).annotate(
-        total_quantity=Sum('quantity'),
-        total_sales_amount=Sum('total_price'),
-        total_cost=Sum('quantity') * models.F('product__last_purchase_price'),
-        total_profit=Sum('total_price') - (Sum('quantity') * models.F('product__last_purchase_price'))
-    ).order_by('-total_quantity')
-    
-    # Calcular totales generales de productos
-    total_products_summary = products_sold_today.aggregate(
-        total_quantity_all=Sum('total_quantity'),
-        total_sales_all=Sum('total_sales_amount'),
-        total_cost_all=Sum('total_cost'),
-        total_profit_all=Sum('total_profit')
-    )
-    
-    # RESUMEN POR PROVEEDOR
-    supplier_summary = SaleDetail.objects.filter(
-        sale__in=sales_today,
-        status=True
-    ).values(
-        'product__brand__name'
-    ).annotate(
-        total_quantity=Sum('quantity'),
-        total_sales=Sum('total_price'),
-        total_cost=Sum('quantity') * models.F('product__last_purchase_price'),
-        total_profit=Sum('total_price') - (Sum('quantity') * models.F('product__last_purchase_price'))
-    ).order_by('-total_sales')
-    
-    # Productos más vendidos (versión simplificada)
-    top_products_today = products_sold_today[:10]
-    
-    # Clientes que más compraron hoy
-    top_customers_today = sales_today.values(
-        'customer__id',
-        'customer__name',
-        'customer__last_name'
-    ).annotate(
-        total_compras=Sum('total_amount'),
-        cantidad_compras=Count('id')
-    ).order_by('-total_compras')[:5]
-    
-    # Guardar registro del informe
-    if sales_today.exists() or cash_movements.exists():
-        total_products_sold = products_sold_today.aggregate(Sum('total_quantity'))['total_quantity__sum'] or 0
-        
-        try:
-            daily_report, created = DailyReport.objects.get_or_create(
-                report_date=selected_date,
-                defaults={
-                    'generated_by': request.user,
-                    'total_sales': daily_totals['total_sum'] or 0,
-                    'total_customers': sales_today.values('customer').distinct().count(),
-                    'total_products_sold': total_products_sold,
-                    'opening_balance': opening_balance,
-                    'closing_balance': current_balance,
-                    'cash_difference': cash_difference,
-                    'created_by': request.user,
-                }
-            )
-            
-            if not created:
-                daily_report.generated_by = request.user
-                daily_report.total_sales = daily_totals['total_sum'] or 0
-                daily_report.total_customers = sales_today.values('customer').distinct().count()
-                daily_report.total_products_sold = total_products_sold
-                daily_report.opening_balance = opening_balance
-                daily_report.closing_balance = current_balance
-                daily_report.cash_difference = cash_difference
-                daily_report.modified_by = request.user.id
-                daily_report.save()
-                
-        except Exception as e:
-            print(f"Error al guardar DailyReport: {e}")
+        selected_date = timezone.localdate()
+    
+    now = timezone.localtime()
+    
+    # Las cifras salen del cierre del dia; solo se recalcula si falta o si
+    # hubo ventas o movimientos despues del cierre. Se leen las vistas
+    # historicas para que un dia ya archivado tambien quede completo.
+    # El cierre y su detalle se leen de la principal: en la replica aun no
+    # estaria lo recien guardado
+    with primary_reads():
+        report = DailyReport.objects.filter(report_date=selected_date).first()
+        if report is None or is_stale(report):
+            report = close_day(selected_date, request.user, (SaleHistory, SaleDetailHistory, CashRegisterHistory))
+        products_sold_today = list(report.products.all())
+        top_customers = list(report.customers.all())
+        supplier_summary = list(report.brands.all())
+    
+    total_products_summary = {
+        'total_quantity_all': report.total_products_sold,
+        'total_sales_all': sum((p.sales_amount for p in products_sold_today), 0),
+        'total_cost_all': report.total_cost,
+        'total_profit_all': report.total_profit,
+    }
     
     context = {
-        'sales_today': sales_today,
+        'sales_today': SaleHistory.objects.filter(date=selected_date, status=True).select_related('customer'),
+        # Indice (date, hour): agrupa por la hora guardada sin convertir created_at
+        'sales_by_hour': SaleHistory.objects.filter(date=selected_date, status=True).order_by('hour')
+        .values('hour').annotate(count=Count('id'), total=Sum('total_amount')),
         'products_sold_today': products_sold_today,
-        'top_products_today': top_products_today,
-        'top_customers_today': top_customers_today,
+        'top_products_today': products_sold_today[:10],
+        'top_customers_today': top_customers,
         'supplier_summary': supplier_summary,
         'total_products_summary': total_products_summary,
         'today': selected_date,  # Usar la fecha seleccionada
         'selected_date': selected_date,  # Nueva variable para el template
         'now': now,
-        'total_general': daily_totals['total_sum'] or 0,
-        'subtotal_general': daily_totals['subtotal_sum'] or 0,
-        'discount_general': daily_totals['discount_sum'] or 0,
-        'tax_general': daily_totals['tax_sum'] or 0,
-        'count_sales': daily_totals['count_sales'] or 0,
-        'avg_sale_value': daily_totals['total_sum'] / daily_totals['count_sales'] if daily_totals['count_sales'] > 0 else 0,
-        'opening_balance': opening_balance,
-        'cash_ins': cash_ins,
-        'cash_outs': cash_outs,
-        'current_balance': current_balance,
-        'cash_difference': cash_difference,
-        'cash_movements': cash_movements,
+        'report': report,
+        'total_general': report.total_sales,
+        'subtotal_general': report.subtotal,
+        'discount_general': report.discount,
+        'tax_general': report.tax,
+        'count_sales': report.count_sales,
+        'avg_sale_value': report.total_sales / report.count_sales if report.count_sales > 0 else 0,
+        'opening_balance': report.opening_balance,
+        'cash_ins': report.cash_ins,
+        'cash_outs': report.cash_outs,
+        'current_balance': report.closing_balance,
+        'cash_difference': report.cash_difference,
     }
 
-    response = HttpResponse(content_type='application/pdf')
-    response['Content-Disposition'] = f'inline; filename="reporte_ventas_diario_{selected_date}.pdf"'
-    template = get_template(template_path)
-    html = template.render(context)
-    
-    pisa_status = pisa.CreatePDF(
-       html,
-       dest=response,
-       link_callback=link_callback,
-    )
-
-    if pisa_status.err:
-       return HttpResponse('We had some errors <pre>' + html + '</pre>')
-
-    return response
\ No newline at end of file
+    return render_to_pdf(template_path, context, f'reporte_ventas_diario_{selected_date}.pdf')
@@ -0,0 +1,75 @@
+from collections import defaultdict
+
+from django.db import transaction
+from django.db.models import Count, Sum
+from django.utils import timezone
+
+from applications.home.money import ZERO
+from applications.inv.models import adjust_stock
+from .models import ControlSequence, SaleDetail, SaleReturn, SaleReturnDetail
+
+
+RETURN_SEQUENCE = 'sale_return'
+
+
+def return_sale_lines(sale, user, line_ids=None, reason=None):
+    """
+    Anula las lineas activas line_ids de la venta (todas si es None) en una
+    transaccion: marca las lineas, devuelve el stock con un solo UPDATE,
+    recalcula los totales una vez y registra el documento de devolucion.
+    Las actualizaciones son por queryset y no disparan las senales de stock
+    de SaleDetail. Devuelve (devolucion, ids de las lineas anuladas);
+    ValueError si no hay lineas que devolver.
+    """
+    with transaction.atomic():
+        lines = SaleDetail.objects.select_for_update().filter(sale=sale, status=True)
+        if line_ids is not None:
+            lines = lines.filter(pk__in=line_ids)
+        lines = list(lines.order_by('id'))
+        if not lines:
+            raise ValueError('No hay items activos para devolver')
+
+        ControlSequence.objects.get_or_create(name=RETURN_SEQUENCE)
+        number = ControlSequence.get_next_sequence_number(RETURN_SEQUENCE)
+        sale_return = SaleReturn.objects.create(
+            sale=sale,
+            number=f'DEV-{number:05d}',
+            authorized_by=user,
+            reason=reason or None,
+            subtotal=sum((line.subtotal for line in lines), ZERO),
+            tax=sum((line.tax or ZERO for line in lines), ZERO),
+            discount=sum((line.discount or ZERO for line in lines), ZERO),
+            total_amount=sum((line.total_price for line in lines), ZERO),
+            created_by=user,
+        )
+        SaleReturnDetail.objects.bulk_create([
+            SaleReturnDetail(
+                sale_return=sale_return, sale_detail=line, product_id=line.product_id,
+                quantity=line.quantity, unit_price=line.unit_price, total_price=line.total_price,
+            )
+            for line in lines
+        ])
+
+        now = timezone.now()
+        SaleDetail.objects.filter(pk__in=[line.pk for line in lines]).update(
+            status=False, modified_by=user.id, updated_at=now,
+        )
+
+        returned = defaultdict(int)
+        for line in lines:
+            returned[line.product_id] += line.quantity
+        adjust_stock(returned, now)
+
+        totals = SaleDetail.objects.filter(sale=sale, status=True).aggregate(
+            Sum('subtotal'), Sum('discount'), Sum('tax'), Count('id'),
+        )
+        sale.subtotal = totals['subtotal__sum'] or 0
+        sale.discount = totals['discount__sum'] or 0
+        sale.tax = totals['tax__sum'] or 0
+        # Una factura sin lineas activas queda anulada
+        if not totals['id__count']:
+            sale.status = False
+        sale.modified_by = user.id
+        sale.save()
+
+    return sale_return, [line.pk for line in lines]
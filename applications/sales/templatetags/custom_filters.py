@@ -1,13 +1,17 @@
+from decimal import InvalidOperation
+
 from django import template
 
+from applications.home import money
+
 register = template.Library()
 
 @register.filter
 def add(value, arg):
     """Add the arg to the value."""
     try:
-        return float(value) + float(arg)
-    except (ValueError, TypeError):
+        return money.to_decimal(value) + money.to_decimal(arg)
+    except (InvalidOperation, ValueError, TypeError):
         try:
             return value + arg
         except Exception:
@@ -17,8 +21,8 @@ def add(value, arg):
 def sub(value, arg):
     """Subtract the arg from the value."""
     try:
-        return float(value) - float(arg)
-    except (ValueError, TypeError):
+        return money.to_decimal(value) - money.to_decimal(arg)
+    except (InvalidOperation, ValueError, TypeError):
         try:
             return value - arg
         except Exception:
@@ -28,26 +32,22 @@ def sub(value, arg):
 def calculate_percentage(value, total):
     """Calculate percentage: (value / total) * 100"""
     try:
-        if float(total) > 0:
-            return (float(value) / float(total)) * 100
-        return 0
-    except (ValueError, TypeError, ZeroDivisionError):
+        return money.percentage(value, total)
+    except (InvalidOperation, ValueError, TypeError):
         return 0
 
 @register.filter
 def multiply(value, arg):
     """Multiply value by arg"""
     try:
-        return float(value) * float(arg)
-    except (ValueError, TypeError):
+        return money.money(money.to_decimal(value) * money.to_decimal(arg))
+    except (InvalidOperation, ValueError, TypeError):
         return 0
 
 @register.filter
 def divide(value, arg):
     """Divide value by arg"""
     try:
-        if float(arg) != 0:
-            return float(value) / float(arg)
+        return money.divide(value, arg)
+    except (InvalidOperation, ValueError, TypeError):
         return 0
-    except (ValueError, TypeError, ZeroDivisionError):
-        return 0
\ No newline at end of file
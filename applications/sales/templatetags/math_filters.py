@@ -1,19 +1,23 @@
+from decimal import InvalidOperation
+
 from django import template
 
+from applications.home.money import to_decimal
+
 register = template.Library()
 
 @register.filter
 def add(value, arg):
     """Add the arg to the value."""
     try:
-        return float(value) + float(arg)
-    except (ValueError, TypeError):
+        return to_decimal(value) + to_decimal(arg)
+    except (InvalidOperation, ValueError, TypeError):
         return value
 
 @register.filter
 def sub(value, arg):
     """Subtract the arg from the value."""
     try:
-        return float(value) - float(arg)
-    except (ValueError, TypeError):
-        return value
\ No newline at end of file
+        return to_decimal(value) - to_decimal(arg)
+    except (InvalidOperation, ValueError, TypeError):
+        return value
@@ -1,3 +1,703 @@
-from django.test import TestCase
+import json
+from datetime import date, datetime, time, timedelta
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+from django.http import HttpResponse
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from applications.home.replica import REPLICA, ReplicaRouter
+from applications.home.testing import QueryCountMixin, create_admin, create_products
+from applications.inv.models import Product
+from applications.purchases.models import PurchaseItem, PurchaseOrder, Supplier
+from . import receipt
+from .archive import archive_before
+from .closing import compute_day
+from .models import (
+    CashRegister, CashRegisterHistory, ControlSequence, Customer, DailyReport, DailyReportProduct, IdempotencyKey, Sale, SaleDetail, SaleDetailHistory, SaleHistory,
+    Register, SaleReturn,
+)
+from .views import REGISTER_SESSION_KEY, SalesListView
+
+
+def open_register(user, name='Caja 1', amount=0):
+    """Crea una caja y la abre con amount"""
+    register = Register.objects.create(name=name, created_by=user)
+    CashRegister(register=register, operation_type=CashRegister.CASH_OPEN, amount=amount, user=user, created_by=user).save()
+    return register
+
+
+class SaleQueryCountTest(QueryCountMixin, TestCase):
+    """Listado, edicion e impresion de ventas con un numero fijo de consultas"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_admin()
+        products = create_products(cls.user, 5)
+        ControlSequence.objects.create(name='sale_invoice')
+        open_register(cls.user)
+        for i in range(5):
+            customer = Customer(name=f'cliente {i}', last_name='prueba', dni=f'{i:08d}', gender=Customer.OTHER, created_by=cls.user)
+            customer.save()
+            sale = Sale(customer=customer, created_by=cls.user)
+            sale.save()
+            for product in products:
+                SaleDetail(
+                    sale=sale, product=product, quantity=1, unit_price=10, subtotal=10,
+                    total_price=10, created_by=cls.user,
+                ).save()
+        cls.sale = sale
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def test_customer_list(self):
+        self.assertMaxQueries(5, reverse('sales:customers_list'))
+
+    def test_sale_list(self):
+        self.assertMaxQueries(6, reverse('sales:sales_list'))
+
+    def test_sale_update(self):
+        self.assertMaxQueries(10, reverse('sales:sale_update', args=[self.sale.id]))
+
+    def test_sale_page_stock_is_live(self):
+        url = reverse('sales:sale_create')
+        self.assertMaxQueries(10, url)
+        product = Product.objects.order_by('id').first()
+        with self.captureOnCommitCallbacks(execute=True):
+            Product.objects.filter(pk=product.pk).update(stock=7)
+            product.refresh_from_db()
+            product.save()
+
+        # El fragmento sigue en cache y el stock llega aparte
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.context['product_stock'][product.pk], 7)
+        self.assertFalse([q for q in queries.captured_queries if '"inv_product"."name"' in q['sql']])
+
+    def test_deploy_version_renews_fragments(self):
+        url = reverse('sales:sale_create')
+        self.assertMaxQueries(10, url)
+        # Un despliegue con TEMPLATE_CACHE_VERSION nueva no reutiliza el HTML cacheado
+        with override_settings(TEMPLATE_CACHE_VERSION='2'):
+            with CaptureQueriesContext(connection) as queries:
+                self.client.get(url)
+        self.assertTrue([q for q in queries.captured_queries if '"inv_product"."name"' in q['sql']])
+
+    def test_sale_list_keyset_pages(self):
+        url = reverse('sales:sales_list')
+        expected = list(Sale.objects.order_by('-date', '-id').values_list('id', flat=True))
+        with mock.patch.object(SalesListView, 'paginate_by', 2):
+            first = self.client.get(url, {'format': 'json'}).json()
+            second = self.client.get(url, {'format': 'json', 'after': first['next']}).json()
+            back = self.client.get(url, {'format': 'json', 'before': second['previous']}).json()
+            self.assertMaxQueries(6, url + '?after=' + second['next'])
+
+        self.assertEqual([s['id'] for s in first['results']], expected[:2])
+        self.assertEqual([s['id'] for s in second['results']], expected[2:4])
+        self.assertEqual(back['results'], first['results'])
+        self.assertIsNone(back['previous'])
+
+    def test_print_invoice(self):
+        self.assertMaxQueries(2, reverse('sales:print_invoice', args=[self.sale.id]))
+
+    def test_print_sale_invoice(self):
+        self.assertMaxQueries(2, reverse('sales:print_sale_invoice', args=[self.sale.id]))
+
+
+class IdempotentSaleTest(TestCase):
+    """Los reintentos con la misma Idempotency-Key no duplican ventas ni lineas"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_admin()
+        cls.product = create_products(cls.user, 1)[0]
+        ControlSequence.objects.create(name='sale_invoice')
+        open_register(cls.user)
+        cls.customer = Customer(name='cliente', last_name='prueba', dni='12345678', gender=Customer.OTHER, created_by=cls.user)
+        cls.customer.save()
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def test_sale_creation_replay(self):
+        url = reverse('sales:sale_create')
+        data = {'customer': self.customer.id, 'observation': ''}
+        first = self.client.post(url, data, HTTP_X_REQUESTED_WITH='XMLHttpRequest', HTTP_IDEMPOTENCY_KEY='venta-1')
+        retry = self.client.post(url, data, HTTP_X_REQUESTED_WITH='XMLHttpRequest', HTTP_IDEMPOTENCY_KEY='venta-1')
+        self.assertEqual(Sale.objects.count(), 1)
+        self.assertEqual(retry.content, first.content)
+        self.assertEqual(retry['Idempotent-Replayed'], 'true')
+
+    def test_line_add_replay(self):
+        sale = Sale(customer=self.customer, created_by=self.user)
+        sale.save()
+        url = reverse('sales:sale_line_add', args=[sale.id])
+        data = {
+            'id_id_producto': self.product.id, 'id_cantidad_detalle': 2, 'id_precio_detalle': '10.00',
+            'id_sub_total_detalle': '20.00', 'id_total_detalle': '20.00',
+        }
+        for _ in range(3):
+            response = self.client.post(url, data, HTTP_IDEMPOTENCY_KEY='linea-1')
+            self.assertTrue(response.json()['success'])
+        self.assertEqual(SaleDetail.objects.filter(sale=sale).count(), 1)
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.stock, 98)
+
+    def test_key_reused_on_other_path(self):
+        sale = Sale(customer=self.customer, created_by=self.user)
+        sale.save()
+        data = {
+            'id_id_producto': self.product.id, 'id_cantidad_detalle': 1, 'id_precio_detalle': '10.00',
+            'id_sub_total_detalle': '10.00', 'id_total_detalle': '10.00',
+        }
+        self.client.post(reverse('sales:sale_line_add', args=[sale.id]), data, HTTP_IDEMPOTENCY_KEY='clave')
+        response = self.client.post(reverse('sales:sale_create'), {'customer': self.customer.id}, HTTP_IDEMPOTENCY_KEY='clave')
+        self.assertEqual(response.status_code, 422)
+
+    def test_error_releases_key(self):
+        # Caja cerrada: el 403 no se guarda y el reintento con la misma clave se ejecuta
+        register = Register.objects.create(name='Caja 2', created_by=self.user)
+        session = self.client.session
+        session[REGISTER_SESSION_KEY] = register.id
+        session.save()
+        url = reverse('sales:sale_create')
+        data = {'customer': self.customer.id, 'observation': ''}
+        rejected = self.client.post(url, data, HTTP_X_REQUESTED_WITH='XMLHttpRequest', HTTP_IDEMPOTENCY_KEY='venta-2')
+        self.assertEqual(rejected.status_code, 403)
+        self.assertFalse(IdempotencyKey.objects.filter(key='venta-2').exists())
+
+        CashRegister(register=register, operation_type=CashRegister.CASH_OPEN, amount=0, user=self.user, created_by=self.user).save()
+        retry = self.client.post(url, data, HTTP_X_REQUESTED_WITH='XMLHttpRequest', HTTP_IDEMPOTENCY_KEY='venta-2')
+        self.assertEqual(retry.status_code, 200)
+        self.assertNotIn('Idempotent-Replayed', retry)
+        self.assertEqual(Sale.objects.count(), 1)
+        self.assertEqual(IdempotencyKey.objects.get(key='venta-2').status_code, 200)
+
+
+class TillSyncTest(TestCase):
+    """Lotes de ventas de la caja sin conexion"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_admin()
+        cls.products = create_products(cls.user, 2)
+        ControlSequence.objects.create(name='sale_invoice')
+        open_register(cls.user)
+        cls.customer = Customer(name='cliente', last_name='prueba', dni='12345678', gender=Customer.OTHER, created_by=cls.user)
+        cls.customer.save()
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def _sync(self, sales, key):
+        return self.client.post(
+            reverse('sales:till_sync'), json.dumps({'sales': sales}),
+            content_type='application/json', HTTP_IDEMPOTENCY_KEY=key,
+        )
+
+    def test_batch_creates_sales_and_applies_stock(self):
+        first, second = self.products
+        sales = [
+            {'client_id': 'a', 'dni': '12345678', 'lines': [
+                {'product': first.id, 'quantity': 3, 'unit_price': '10.00'},
+                {'product': second.id, 'quantity': 1, 'unit_price': '0.10', 'tax': '0.02'},
+            ]},
+            {'client_id': 'b', 'customer': self.customer.id, 'lines': [{'product': first.id, 'quantity': 2, 'unit_price': '10.00'}]},
+            {'client_id': 'c', 'dni': '12345678', 'lines': [{'product': 0, 'quantity': 1, 'unit_price': '10.00'}]},
+        ]
+        data = self._sync(sales, 'lote-1').json()
+        self.assertEqual([s['invoice_number'] for s in data['created']], ['INV-00001', 'INV-00002'])
+        self.assertEqual([e['client_id'] for e in data['errors']], ['c'])
+
+        sale = Sale.objects.get(invoice_number='INV-00001')
+        self.assertEqual(str(sale.total_amount), '30.12')
+        first.refresh_from_db()
+        self.assertEqual(first.stock, 95)
+
+        # El reenvio del mismo lote no duplica ventas
+        self.assertEqual(self._sync(sales, 'lote-1').json(), data)
+        self.assertEqual(Sale.objects.count(), 2)
+
+    def test_unknown_dni_registers_customer_and_keeps_sale_time(self):
+        # Cobrada a las 23:50 de ayer y sincronizada hoy
+        yesterday = timezone.localdate() - timedelta(days=1)
+        sold_at = timezone.make_aware(datetime.combine(yesterday, time(23, 50)))
+        sales = [{'client_id': 'a', 'dni': '87654321', 'sold_at': sold_at.isoformat(), 'lines': [
+            {'product': self.products[0].id, 'quantity': 1, 'unit_price': '10.00'},
+        ]}]
+        data = self._sync(sales, 'lote-2').json()
+        self.assertEqual(data['errors'], [])
+
+        sale = Sale.objects.get(pk=data['created'][0]['sale_id'])
+        self.assertEqual(sale.customer.dni, '87654321')
+        self.assertEqual((sale.date, sale.hour), (yesterday, 23))
+
+
+class CustomerSearchTest(TestCase):
+    """El buscador de clientes exige sesion y no expone datos de contacto"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_admin()
+        cls.customer = Customer(
+            name='ana', last_name='perez', dni='00000001', gender=Customer.OTHER,
+            phone='555-0101', email='ana@example.com', created_by=cls.user,
+        )
+        cls.customer.save()
+
+    def test_requires_login(self):
+        self.assertEqual(self.client.get(reverse('sales:get_customers_json'), {'q': 'ana'}).status_code, 401)
+        url = reverse('sales:customer_detail_json', args=[self.customer.pk])
+        self.assertEqual(self.client.get(url).status_code, 401)
+
+    def test_search_returns_only_name_and_dni(self):
+        self.client.force_login(self.user)
+        data = self.client.get(reverse('sales:get_customers_json'), {'q': '0000'}).json()
+        self.assertEqual(set(data['customers'][0]), {'id', 'full_name', 'dni'})
+
+        detail = self.client.get(reverse('sales:customer_detail_json', args=[self.customer.pk])).json()
+        self.assertEqual(detail['phone'], '555-0101')
+
+
+class ArchiveTest(TestCase):
+    """Archivado de meses cerrados y lectura por las vistas historicas"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_admin()
+        cls.product = create_products(cls.user, 1)[0]
+        ControlSequence.objects.create(name='sale_invoice')
+        open_register(cls.user)
+        customer = Customer(name='cliente', last_name='prueba', dni='12345678', gender=Customer.OTHER, created_by=cls.user)
+        customer.save()
+        for day in [date(2023, 1, 15), date(2023, 3, 2), timezone.localdate()]:
+            sale = Sale(customer=customer, created_by=cls.user)
+            sale.save()
+            SaleDetail(sale=sale, product=cls.product, quantity=2, unit_price=10, subtotal=20, total_price=20, created_by=cls.user).save()
+            Sale.objects.filter(pk=sale.pk).update(date=day)
+        CashRegister.objects.update(date=timezone.make_aware(datetime(2023, 1, 15, 9)))
+
+    def test_archive_closed_months(self):
+        self.assertEqual(archive_before(date(2023, 4, 1), dry_run=True)['sales_sale'], 2)
+        moved = archive_before(date(2023, 4, 1))
+        self.assertEqual(moved, {'sales_saledetail': 2, 'sales_sale': 2, 'sales_cashregister': 1})
+
+        # Las tablas activas solo conservan el mes en curso y el stock no se devuelve
+        self.assertEqual(Sale.objects.count(), 1)
+        self.assertEqual(CashRegister.objects.count(), 0)
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.stock, 94)
+
+        self.assertEqual(SaleHistory.objects.count(), 3)
+        self.assertEqual(SaleDetailHistory.objects.filter(sale__date__lt=date(2023, 4, 1)).count(), 2)
+        self.assertEqual(CashRegisterHistory.objects.count(), 1)
+
+    def test_report_reads_archive_on_request(self):
+        archive_before(date(2023, 4, 1))
+        self.client.force_login(self.user)
+        url = reverse('sales:sales_report_pdf')
+        params = {'start_date': '2023-01-01', 'end_date': '2023-01-31'}
+        with mock.patch('applications.sales.reports.render_to_pdf', return_value=HttpResponse()) as render:
+            self.client.get(url, params)
+            self.assertEqual(len(render.call_args.args[1]['sales']), 0)
+            self.client.get(url, {**params, 'include_archive': '1'})
+            self.assertEqual(len(render.call_args.args[1]['sales']), 1)
+
+    def test_daily_report_of_archived_day(self):
+        archive_before(date(2023, 4, 1))
+        self.client.force_login(self.user)
+        with mock.patch('applications.sales.reports.render_to_pdf', return_value=HttpResponse()) as render:
+            self.client.get(reverse('sales:daily_sales_report'), {'date': '2023-01-15'})
+        self.assertEqual(render.call_args.args[1]['count_sales'], 1)
+        self.assertEqual(DailyReport.objects.get(report_date=date(2023, 1, 15)).total_products_sold, 2)
+
+
+class SaleReturnTest(QueryCountMixin, TestCase):
+    """Devolucion de varias lineas con una sola autorizacion"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_admin()
+        cls.products = create_products(cls.user, 3)
+        ControlSequence.objects.create(name='sale_invoice')
+        ControlSequence.objects.create(name='sale_return')
+        customer = Customer(name='cliente', last_name='prueba', dni='12345678', gender=Customer.OTHER, created_by=cls.user)
+        customer.save()
+        cls.sale = Sale(customer=customer, created_by=cls.user)
+        cls.sale.save()
+        cls.lines = []
+        for product in cls.products + cls.products[:1]:
+            line = SaleDetail(sale=cls.sale, product=product, quantity=2, unit_price=10, subtotal=20, total_price=20, created_by=cls.user)
+            line.save()
+            cls.lines.append(line)
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def _return(self, **data):
+        return self.client.post(
+            reverse('sales:sale_return', args=[self.sale.id]),
+            json.dumps({'admin_password': 'clave-prueba', **data}), content_type='application/json',
+        )
+
+    def test_return_selected_lines(self):
+        first, second = self.lines[0], self.lines[3]
+        # Las consultas no dependen del numero de lineas devueltas
+        with self.assertNumQueries(18):
+            data = self._return(items=[first.id, second.id], reason='producto defectuoso').json()
+        self.assertEqual(data['returned_items'], [first.id, second.id])
+        self.assertEqual(data['updated_totals']['total_amount'], '40.00')
+
+        # Ambas lineas eran del mismo producto: se devuelven las 4 unidades
+        product = self.products[0]
+        product.refresh_from_db()
+        self.assertEqual(product.stock, 100)
+        sale_return = SaleReturn.objects.get(number=data['return_number'])
+        self.assertEqual(sale_return.total_amount, 40)
+        self.assertEqual(sale_return.details.count(), 2)
+
+        # Las lineas ya devueltas no se devuelven otra vez
+        self.assertEqual(self._return(items=[first.id]).status_code, 400)
+
+    def test_return_whole_invoice(self):
+        self._return()
+        self.sale.refresh_from_db()
+        self.assertFalse(self.sale.status)
+        self.assertEqual(self.sale.total_amount, 0)
+        self.assertFalse(SaleDetail.objects.filter(sale=self.sale, status=True).exists())
+        self.assertEqual([p.stock for p in Product.objects.order_by('id')], [100, 100, 100])
+
+    def test_bulk_line_delete_recomputes_once(self):
+        self._return(items=[self.lines[1].id])
+        # Las consultas no dependen del numero de lineas borradas
+        with self.assertNumQueries(8):
+            SaleDetail.objects.filter(sale=self.sale).delete()
+
+        self.sale.refresh_from_db()
+        self.assertEqual(self.sale.total_amount, 0)
+        # La linea ya devuelta no suma stock otra vez
+        self.assertEqual([p.stock for p in Product.objects.order_by('id')], [100, 100, 100])
+
+    def test_line_add_after_return(self):
+        self._return(items=[self.lines[0].id])
+        open_register(self.user)
+        data = {
+            'id_id_producto': self.products[1].id, 'id_cantidad_detalle': 1, 'id_precio_detalle': '10.00',
+            'id_sub_total_detalle': '10.00', 'id_total_detalle': '10.00',
+        }
+        # Las lineas devueltas no vuelven a sumar en la cabecera
+        response = self.client.post(reverse('sales:sale_line_add', args=[self.sale.id]), data)
+        self.assertEqual(response.json()['updated_totals']['total_amount'], '70.00')
+
+        response = self.client.post(
+            reverse('sales:sale_update', args=[self.sale.id]), data, HTTP_X_REQUESTED_WITH='XMLHttpRequest',
+        )
+        self.assertEqual(response.json()['updated_totals']['total_amount'], '80.00')
+        self.sale.refresh_from_db()
+        self.assertEqual(self.sale.subtotal, 80)
+        self.assertEqual(self.sale.total_amount, 80)
+
+    def test_wrong_password(self):
+        response = self._return(admin_password='otra')
+        self.assertEqual(response.status_code, 403)
+        self.assertFalse(SaleReturn.objects.exists())
+
+
+class ReceiptTest(TestCase):
+    """Ticket en texto y ESC/POS solo con las lineas activas de la venta"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_admin()
+        cls.products = create_products(cls.user, 2)
+        ControlSequence.objects.create(name='sale_invoice')
+        ControlSequence.objects.create(name='sale_return')
+        customer = Customer(name='cliente', last_name='prueba', dni='12345678', gender=Customer.OTHER, created_by=cls.user)
+        customer.save()
+        cls.sale = Sale(customer=customer, created_by=cls.user)
+        cls.sale.save()
+        cls.lines = []
+        for product in cls.products:
+            line = SaleDetail(sale=cls.sale, product=product, quantity=2, unit_price=10, subtotal=20, total_price=20, created_by=cls.user)
+            line.save()
+            cls.lines.append(line)
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def _void(self, *lines):
+        self.client.post(
+            reverse('sales:sale_return', args=[self.sale.id]),
+            json.dumps({'admin_password': 'clave-prueba', 'items': [line.id for line in lines]}),
+            content_type='application/json',
+        )
+
+    def _ticket(self, **params):
+        response = self.client.get(reverse('sales:print_receipt', args=[self.sale.id]), params)
+        self.assertEqual(response.status_code, 200)
+        return response.content
+
+    def test_voided_lines_are_not_printed(self):
+        self._void(self.lines[1])
+        with self.assertNumQueries(3):
+            text = self._ticket().decode()
+        self.assertIn('PRODUCTO 0', text)
+        self.assertNotIn('PRODUCTO 1', text)
+        self.assertRegex(text, r'TOTAL: +20\.00')
+
+        escpos = self._ticket(format='escpos')
+        self.assertTrue(escpos.startswith(receipt.INIT + receipt.CODEPAGE_1252))
+        self.assertTrue(escpos.endswith(receipt.FEED_AND_CUT))
+        self.assertIn(b'PRODUCTO 0', escpos)
+        self.assertNotIn(b'PRODUCTO 1', escpos)
+
+    def test_fully_voided_sale_prints_header(self):
+        self._void(*self.lines)
+        sale, items = receipt.load_sale(self.sale.id)
+        self.assertEqual(sale, self.sale)
+        self.assertEqual(items, [])
+
+        text = self._ticket().decode()
+        self.assertIn(f'FACTURA No. {self.sale.invoice_number}', text)
+        self.assertNotIn('PRODUCTO', text)
+        self.assertIn(b'FACTURA', self._ticket(format='escpos'))
+
+    def test_missing_sale(self):
+        response = self.client.get(reverse('sales:print_receipt', args=[0]))
+        self.assertEqual(response.status_code, 404)
+
+
+class MultiRegisterTest(TestCase):
+    """Cada caja encadena su saldo y su estado sin depender de las demas"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_admin()
+        cls.first = open_register(cls.user, 'Caja 1', amount=100)
+        cls.second = Register.objects.create(name='Caja 2', created_by=cls.user)
+        ControlSequence.objects.create(name='sale_invoice')
+        cls.customer = Customer(name='cliente', last_name='prueba', dni='00000001', gender=Customer.OTHER, created_by=cls.user)
+        cls.customer.save()
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def select(self, register):
+        session = self.client.session
+        session[REGISTER_SESSION_KEY] = register.id
+        session.save()
+
+    def test_balances_are_per_register(self):
+        self.select(self.second)
+        self.client.post(reverse('sales:open_cash_register'), {'amount': '50'})
+        self.client.post(reverse('sales:cash_register'), {'operation_type': 'out', 'amount': '20', 'description': 'retiro'})
+
+        self.first.refresh_from_db()
+        self.second.refresh_from_db()
+        self.assertEqual(self.first.balance, 100)
+        self.assertEqual(self.second.balance, 30)
+        self.assertEqual(self.second.movements.first().current_balance, 30)
+        self.assertTrue(self.second.is_open())
+
+        self.client.post(reverse('sales:close_cash_register'))
+        self.second.refresh_from_db()
+        self.assertFalse(self.second.is_open())
+        self.assertTrue(self.second.is_closed_today())
+        self.assertTrue(Register.objects.get(pk=self.first.pk).is_open())
+
+    def test_sales_need_the_session_register_open(self):
+        self.select(self.second)
+        response = self.client.post(reverse('sales:sale_create'), {'customer': self.customer.id})
+        self.assertRedirects(response, reverse('sales:cash_register'))
+        self.assertFalse(Sale.objects.exists())
+
+        response = self.client.get(reverse('sales:cash_register'), {'register': self.first.id})
+        self.assertEqual(self.client.session[REGISTER_SESSION_KEY], self.first.id)
+        self.client.post(reverse('sales:sale_create'), {'customer': self.customer.id})
+        self.assertEqual(Sale.objects.get().register, self.first)
+
+    def test_admin_creates_register(self):
+        self.client.post(reverse('sales:create_register'), {'name': 'Caja 3'})
+        register = Register.objects.get(name='Caja 3')
+        self.assertEqual(self.client.session[REGISTER_SESSION_KEY], register.id)
+        response = self.client.get(reverse('sales:cash_register'))
+        self.assertContains(response, 'Caja 3')
+        self.assertFalse(response.context['is_cash_open'])
+
+
+@override_settings(DAY_CLOSE_ASYNC=False)
+class DailyCloseTest(TestCase):
+    """El cierre de caja precalcula el informe diario y la reimpresion no lee lineas"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_admin()
+        cls.products = create_products(cls.user, 2)
+        ControlSequence.objects.create(name='sale_invoice')
+        cls.register = open_register(cls.user, amount=50)
+        customer = Customer(name='cliente', last_name='prueba', dni='00000002', gender=Customer.OTHER, created_by=cls.user)
+        customer.save()
+        for quantity in (1, 3):
+            sale = Sale(customer=customer, created_by=cls.user)
+            sale.save()
+            for product in cls.products:
+                SaleDetail(
+                    sale=sale, product=product, quantity=quantity, unit_price=10, subtotal=10 * quantity,
+                    total_price=10 * quantity, created_by=cls.user,
+                ).save()
+            Sale.objects.filter(pk=sale.pk).update(total_amount=20 * quantity)
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def test_close_register_persists_report(self):
+        for operation_type, amount in ((CashRegister.CASH_IN, 20), (CashRegister.CASH_OUT, 5)):
+            CashRegister(register=self.register, operation_type=operation_type, amount=amount, user=self.user, created_by=self.user).save()
+        # Otra caja sigue abierta: cuenta con su ultimo saldo
+        open_register(self.user, name='Caja 2', amount=30)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('sales:close_cash_register'))
+
+        report = DailyReport.objects.get(report_date=timezone.localdate())
+        self.assertEqual(report.count_sales, 2)
+        self.assertEqual(report.total_sales, 80)
+        self.assertEqual(report.total_products_sold, 8)
+        self.assertEqual(report.total_cost, 32)
+        self.assertEqual(report.total_profit, 48)
+        self.assertEqual(report.opening_balance, 80)
+        # Cierre de la caja 1 (50 + 20 - 5) mas el saldo de la caja 2
+        self.assertEqual(report.closing_balance, 95)
+        self.assertEqual(report.cash_difference, 95 - (80 + 80 + 20 - 5))
+        self.assertEqual(report.products.count(), 2)
+        self.assertEqual(sum(brand.sales_amount for brand in report.brands.all()), 80)
+        self.assertEqual(report.customers.get().count_sales, 2)
+
+    def test_reprint_reads_persisted_report(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('sales:close_cash_register'))
+
+        url = reverse('sales:daily_sales_report')
+        with mock.patch('applications.sales.reports.render_to_pdf', return_value=HttpResponse()) as render:
+            with CaptureQueriesContext(connection) as queries:
+                self.client.get(url, {'date': timezone.localdate().isoformat()})
+                list(render.call_args.args[1]['sales_today'])
+        self.assertFalse([q for q in queries.captured_queries if 'sales_saledetail' in q['sql']])
+        context = render.call_args.args[1]
+        self.assertEqual(context['count_sales'], 2)
+        self.assertEqual(context['total_products_summary']['total_sales_all'], 80)
+
+    def test_report_close_reads_primary_under_replica(self):
+        routed = []
+        original = ReplicaRouter.db_for_read
+
+        def spy(router, model, **hints):
+            routed.append((model, original(router, model, **hints)))
+            # La prueba no tiene replica: todo se lee de la principal
+            return None
+
+        def render_pdf(template, context, filename):
+            # El PDF evalua los querysets dentro de la vista
+            list(context['sales_today'])
+            return HttpResponse()
+
+        url = reverse('sales:daily_sales_report')
+        with mock.patch('applications.home.replica.use_replica', return_value=True), \
+                mock.patch.object(ReplicaRouter, 'db_for_read', spy), \
+                mock.patch('applications.sales.reports.render_to_pdf', side_effect=render_pdf) as render:
+            self.client.get(url, {'date': timezone.localdate().isoformat()})
+
+        replica_models = {model for model, alias in routed if alias == REPLICA}
+        self.assertIn(SaleHistory, replica_models)
+        # El calculo, el guardado y la relectura del cierre no salen de la replica
+        for model in (DailyReport, DailyReportProduct, SaleDetailHistory, CashRegisterHistory, Sale, CashRegister):
+            self.assertNotIn(model, replica_models)
+        self.assertEqual(len(render.call_args.args[1]['products_sold_today']), 2)
+
+
+class SaleCostTest(TestCase):
+    """Cada linea guarda el costo del momento de la venta"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_admin()
+        cls.product = create_products(cls.user, 1)[0]
+        ControlSequence.objects.create(name='sale_invoice')
+        customer = Customer(name='cliente', last_name='prueba', dni='00000003', gender=Customer.OTHER, created_by=cls.user)
+        customer.save()
+        cls.lines = []
+        for day in (date(2023, 2, 1), date(2022, 12, 1)):
+            sale = Sale(customer=customer, created_by=cls.user)
+            sale.save()
+            line = SaleDetail(sale=sale, product=cls.product, quantity=1, unit_price=10, subtotal=10, total_price=10, created_by=cls.user)
+            line.save()
+            Sale.objects.filter(pk=sale.pk).update(date=day)
+            cls.lines.append(line)
+
+        supplier = Supplier(name='proveedor', phone='555-0', created_by=cls.user)
+        supplier.save()
+        order = PurchaseOrder(
+            order_date=date(2023, 1, 10), buy_date=date(2023, 1, 10), order_number='oc-costo',
+            supplier=supplier, created_by=cls.user,
+        )
+        order.save()
+        PurchaseItem(purchase_order=order, product=cls.product, quantity=5, unit_price=3, total_price=15, created_by=cls.user).save()
+
+    def test_line_keeps_cost_of_sale_time(self):
+        Product.objects.filter(pk=self.product.pk).update(average_cost=9, last_purchase_price=9)
+        line = SaleDetail.objects.get(pk=self.lines[0].pk)
+        self.assertEqual(line.unit_cost, 4)
+
+    @override_settings(SALE_COST_METHOD='last')
+    def test_last_cost_method(self):
+        Product.objects.filter(pk=self.product.pk).update(last_purchase_price=6)
+        line = SaleDetail(
+            sale_id=self.lines[0].sale_id, product=Product.objects.get(pk=self.product.pk), quantity=1,
+            unit_price=10, subtotal=10, total_price=10, created_by=self.user,
+        )
+        line.save()
+        self.assertEqual(line.unit_cost, 6)
+
+    def test_backfill_uses_purchase_at_sale_date(self):
+        SaleDetail.objects.update(unit_cost=None)
+        Product.objects.update(last_purchase_price=7)
+        call_command('backfill_sale_costs', method='last', stdout=StringIO())
+        costs = dict(SaleDetail.objects.values_list('pk', 'unit_cost'))
+        # La venta posterior a la compra toma su precio; la anterior, el costo actual
+        self.assertEqual(costs[self.lines[0].pk], 3)
+        self.assertEqual(costs[self.lines[1].pk], 7)
+
+
+class BusinessDayTest(TestCase):
+    """Los movimientos y las ventas guardan el dia y la hora locales"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_admin()
+        cls.register = Register.objects.create(name='Caja 1', created_by=cls.user)
+        ControlSequence.objects.create(name='sale_invoice')
+        cls.customer = Customer(name='cliente', last_name='prueba', dni='00000001', gender=Customer.OTHER, created_by=cls.user)
+        cls.customer.save()
+
+    def test_late_movement_belongs_to_local_day(self):
+        # 22:30 en Caracas ya es el dia siguiente en UTC
+        late = timezone.make_aware(datetime(2026, 3, 10, 22, 30))
+        with mock.patch('django.utils.timezone.now', return_value=late):
+            CashRegister(
+                register=self.register, operation_type=CashRegister.CASH_OPEN, amount=40, user=self.user, created_by=self.user,
+            ).save()
+            sale = Sale(customer=self.customer, created_by=self.user)
+            sale.save()
+
+        self.assertEqual(CashRegister.objects.get().business_day, date(2026, 3, 10))
+        self.assertEqual(sale.hour, 22)
+        with CaptureQueriesContext(connection) as queries:
+            figures = compute_day(date(2026, 3, 10))
+        self.assertEqual(figures['report']['opening_balance'], 40)
+        # El filtro por dia compara la columna guardada, sin convertir la fecha
+        self.assertFalse(any('AT TIME ZONE' in query['sql'] for query in queries.captured_queries))
@@ -0,0 +1,164 @@
+from collections import defaultdict
+from itertools import count
+
+from django.db import transaction
+from django.db.models import F
+from django.db.models.functions import Greatest
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from applications.home.money import document_lines, money
+from applications.inv.models import Product
+from .models import ControlSequence, Customer, Sale, SaleDetail
+
+
+MAX_BATCH_SALES = 200
+
+# Cliente creado desde la caja cuando el DNI no esta registrado
+UNREGISTERED_NAME = 'Cliente'
+UNREGISTERED_LAST_NAME = 'Sin Registrar'
+
+
+def _sold_at(entry, now):
+    """Momento de la venta segun la caja (sold_at ISO 8601); sin dato o futuro, now"""
+    sold_at = entry.get('sold_at')
+    try:
+        sold_at = parse_datetime(sold_at) if isinstance(sold_at, str) else None
+    except ValueError:
+        sold_at = None
+    if sold_at is None:
+        return now
+    if timezone.is_naive(sold_at):
+        sold_at = timezone.make_aware(sold_at)
+    return min(sold_at, now)
+
+
+def _register_customers(entries, by_id, by_dni, user):
+    """
+    Crea los clientes de los DNI que no estan registrados: la venta ya se
+    cobro en la caja y no debe rechazarse por el cliente. Se completan luego
+    desde el listado de clientes.
+    """
+    for entry in entries:
+        dni = str(entry.get('dni') or '').strip()
+        if by_id.get(str(entry.get('customer'))) or not dni or dni in by_dni:
+            continue
+        if len(dni) > Customer._meta.get_field('dni').max_length:
+            continue
+        customer = Customer(
+            name=UNREGISTERED_NAME, last_name=UNREGISTERED_LAST_NAME, dni=dni,
+            gender=Customer.OTHER, created_by=user,
+        )
+        customer.save()
+        by_dni[dni] = customer
+
+
+def _validate(entry, customers, products):
+    """Cliente y lineas (producto, cantidad, precio, impuesto, descuento) de una venta de la cola"""
+    by_id, by_dni = customers
+    customer = by_id.get(str(entry.get('customer'))) or by_dni.get(str(entry.get('dni') or '').strip())
+    if customer is None:
+        raise ValueError('Cliente no encontrado (DNI invalido)')
+
+    lines = []
+    for line in entry.get('lines') or []:
+        product = products.get(line.get('product'))
+        if product is None:
+            raise ValueError(f"Producto {line.get('product')} no encontrado")
+        quantity = int(line.get('quantity') or 0)
+        if quantity <= 0:
+            raise ValueError(f'Cantidad invalida para {product.code}')
+        lines.append((product, quantity, money(line.get('unit_price')),
+                      money(line.get('tax')), money(line.get('discount'))))
+    if not lines:
+        raise ValueError('La venta no tiene lineas')
+    return customer, lines
+
+
+def sync_sales(entries, user, register=None):
+    """
+    Registra un lote de ventas hechas sin conexion en una sola transaccion:
+    numeros de factura reservados de una vez, ventas y lineas con bulk_create
+    y un UPDATE de stock por producto. Las ventas invalidas se informan y no
+    bloquean al resto del lote; los DNI sin cliente registran uno nuevo. La
+    fecha y la hora de cada venta son las de la caja (sold_at), para que una
+    venta sincronizada despues de medianoche quede en su dia. Las ventas
+    quedan asociadas a la caja register.
+    Devuelve (creadas, errores) con el client_id de cada venta.
+    """
+    customer_ids = {str(e.get('customer')) for e in entries if e.get('customer')}
+    dnis = {str(e.get('dni')).strip() for e in entries if e.get('dni')}
+    product_ids = {line.get('product') for e in entries for line in e.get('lines') or []}
+    products = Product.objects.in_bulk([p for p in product_ids if isinstance(p, int)])
+    now = timezone.now()
+
+    with transaction.atomic():
+        customers = (
+            {str(c.pk): c for c in Customer.objects.filter(pk__in=[c for c in customer_ids if c.isdigit()])},
+            {c.dni: c for c in Customer.objects.filter(dni__in=dnis)},
+        )
+        _register_customers(entries, *customers, user)
+
+        valid, errors = [], []
+        for entry in entries:
+            try:
+                valid.append((entry, *_validate(entry, customers, products)))
+            except (ValueError, TypeError, ArithmeticError) as e:
+                errors.append({'client_id': entry.get('client_id'), 'error': str(e)})
+        if not valid:
+            return [], errors
+
+        first_number = ControlSequence.reserve_sequence_numbers('sale_invoice', len(valid))
+        sales, line_totals, days = [], [], defaultdict(list)
+        for number, (entry, customer, lines) in zip(count(first_number), valid):
+            totals, sums = document_lines((quantity, price, tax, discount) for _, quantity, price, tax, discount in lines)
+            line_totals.append(totals)
+            sold_at = timezone.localtime(_sold_at(entry, now))
+            sale = Sale(
+                customer=customer,
+                register=register,
+                invoice_number=f'INV-{number:05d}',
+                observation=entry.get('observation') or None,
+                subtotal=sums['subtotal'],
+                tax=sums['tax'],
+                discount=sums['discount'],
+                total_amount=sums['total'],
+                # bulk_create no pasa por Sale.save: la hora se asigna aqui
+                hour=sold_at.hour,
+                created_by=user,
+            )
+            sales.append(sale)
+            days[sold_at.date()].append(sale)
+        Sale.objects.bulk_create(sales)
+        # date es auto_now_add y bulk_create la fija en hoy: un UPDATE por cada otro dia
+        today = timezone.localdate(now)
+        for day, day_sales in days.items():
+            if day != today:
+                Sale.objects.filter(pk__in=[sale.pk for sale in day_sales]).update(date=day)
+                for sale in day_sales:
+                    sale.date = day
+
+        details = []
+        sold = defaultdict(int)
+        for sale, (_, _, lines), totals in zip(sales, valid, line_totals):
+            for (product, quantity, price, tax, discount), (subtotal, total) in zip(lines, totals):
+                details.append(SaleDetail(
+                    sale=sale, product=product, quantity=quantity, unit_price=price,
+                    tax=tax, discount=discount, subtotal=subtotal, total_price=total,
+                    unit_cost=product.sale_cost(), created_by=user,
+                ))
+                sold[product.id] += quantity
+        # bulk_create no dispara update_sale_save: el stock se descuenta aqui
+        SaleDetail.objects.bulk_create(details)
+        for product_id, quantity in sold.items():
+            # La venta ya ocurrio en la caja; el stock no puede quedar negativo
+            Product.objects.filter(pk=product_id).update(
+                stock=Greatest(F('stock') - quantity, 0),
+                updated_at=timezone.now(),
+            )
+
+    created = [
+        {'client_id': entry.get('client_id'), 'sale_id': sale.id, 'invoice_number': sale.invoice_number}
+        for sale, (entry, _, _) in zip(sales, valid)
+    ]
+    return created, errors
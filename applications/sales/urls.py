@@ -18,20 +18,30 @@ urlpatterns = [
     path('sales/create/', views.sale_order_view, name='sale_create'),
     path('sales/update/<int:sale_id>/', views.sale_order_view, name='sale_update'),
     path('sales/delete/<int:sale_id>/<int:pk>/', views.SaleDeleteView.as_view(), name='sale_delete'),
+    path('sales/lines/add/<int:sale_id>/', views.SaleLineAddView.as_view(), name='sale_line_add'),
     path('sales/print_invoice/<int:id>', reports.print_invoice, name='print_invoice'),
     path('sales/anular/<int:sale_id>/<int:pk>/', views.SaleAnularView.as_view(), name='sale_anular'),
-    path('sales/get_customers/', views.get_customers_json, name='get_customers_json'),
+    path('sales/return/<int:sale_id>/', views.SaleReturnView.as_view(), name='sale_return'),
+    path('sales/get_customers/', views.CustomerSearchView.as_view(), name='get_customers_json'),
+    path('sales/customers/<int:pk>/', views.CustomerDetailView.as_view(), name='customer_detail_json'),
+
+    # Caja sin conexion
+    path('till/', views.till_view, name='till'),
+    path('till/sync/', views.till_sync, name='till_sync'),
     
     # Control de Caja
     path('cash/register/', views.CashRegisterView.as_view(), name='cash_register'),
     path('cash/register/open/', views.OpenCashRegisterView.as_view(), name='open_cash_register'),
     path('cash/register/close/', views.CloseCashRegisterView.as_view(), name='close_cash_register'),
+    path('cash/register/create/', views.RegisterCreateView.as_view(), name='create_register'),
 
     # Report URLs
     path('sales/report/pdf/', reports.sales_report_to_pdf, name='sales_report_pdf'),
     path('sales/report/filter/', reports.sales_report_filter, name='sales_report_filter'),
     path('reports/sales/daily/', reports.daily_sales_report_to_pdf, name='daily_sales_report'),
     path('sales/print_invoice/<int:sale_id>/', reports.print_sale_invoice, name='print_sale_invoice'),
+    path('sales/receipt/<int:sale_id>/', reports.print_receipt, name='print_receipt'),
+    path('sales/receipt/<int:sale_id>/send/', reports.send_receipt, name='send_receipt'),
     path('reports/sales/daily/select-date/', views.DailyReportSelectDateView.as_view(), name='daily_report_select_date'),
 
     # Presupuestos
@@ -1,7 +1,6 @@
-from datetime import datetime, timedelta
 import json
 from decimal import Decimal, InvalidOperation
-from xhtml2pdf import pisa
+from asgiref.sync import sync_to_async
 
 from django.contrib import messages
 from django.shortcuts import render, redirect
@@ -13,6 +12,7 @@ from django.template.loader import render_to_string
 from django.contrib.auth.decorators import login_required
 from django.db.models import Sum
 from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_POST
 from django.utils.decorators import method_decorator
 from django.contrib.auth import authenticate
 from django.db import transaction
@@ -22,18 +22,22 @@ from django.template.loader import get_template
 from django.conf import settings
 
 
-from .models import Customer, Sale, SaleDetail, CashRegister
+from .models import Customer, Sale, SaleDetail, CashRegister, Register
 from applications.inv.models import Product
 from .forms import CustomerForm, SaleForm, CashRegisterForm
-from applications.home.mixins import AdminRequiredMixin, SellerRequiredMixin
+from .closing import schedule_day_close
+from .idempotency import idempotent
+from .returns import return_sale_lines
+from .till import MAX_BATCH_SALES, sync_sales
+from applications.home.mixins import AdminRequiredMixin, SellerRequiredMixin, AsyncAdminRequiredMixin, AsyncLoginRequiredMixin, AsyncToggleStatusMixin, KeysetPaginationMixin, ReplicaReadMixin
 from .forms import CustomerForm, SaleForm
 
 
 
 # Create your views here.
-class CustomerListView(LoginRequiredMixin, AdminRequiredMixin, ListView):
+class CustomerListView(LoginRequiredMixin, AdminRequiredMixin, ReplicaReadMixin, ListView):
     model = Customer
-    template_name = 'sales/Customers_list.html'
+    template_name = 'sales/customers_list.html'
     context_object_name = 'customers'
     login_url = reverse_lazy('home:login')
 
@@ -75,15 +79,10 @@ class CreateCustomerView(LoginRequiredMixin, AdminRequiredMixin, CreateView):
     def get_success_url(self):
         return reverse_lazy('sales:customers_list')
     
-class ToggleCustomerStatusView(AdminRequiredMixin, View):
-    def post(self, request, *args, **kwargs):
-        customer_id = request.POST.get('customer_id')
-        try:
-            customer = Customer.objects.get(id=customer_id)
-            new_status = customer.toggle_status()
-            return JsonResponse({'success': True, 'new_status': new_status})
-        except Customer.DoesNotExist:
-            return JsonResponse({'success': False, 'error': 'Cliente no encontrada'})
+class ToggleCustomerStatusView(AsyncAdminRequiredMixin, AsyncToggleStatusMixin, View):
+    model = Customer
+    id_param = 'customer_id'
+    not_found_error = 'Cliente no encontrada'
         
 class UpdateCustomerView(LoginRequiredMixin, AdminRequiredMixin, UpdateView):
     model = Customer
@@ -122,51 +121,43 @@ class UpdateCustomerView(LoginRequiredMixin, AdminRequiredMixin, UpdateView):
     def get_success_url(self):
         return reverse_lazy('sales:customers_list')
     
-class SalesListView(LoginRequiredMixin, ListView):
+class SalesListView(LoginRequiredMixin, ReplicaReadMixin, KeysetPaginationMixin, ListView):
     model = Sale
+    queryset = Sale.objects.select_related('customer')
     template_name = 'sales/sales_list.html'
     context_object_name = 'sales'
     login_url = reverse_lazy('home:login')
+    keyset_field = 'date'
+
+    def serialize(self, sale):
+        return {
+            'id': sale.id,
+            'invoice_number': sale.invoice_number,
+            'date': sale.date.isoformat(),
+            'customer': sale.customer.full_name(),
+            'subtotal': str(sale.subtotal),
+            'discount': str(sale.discount),
+            'tax': str(sale.tax),
+            'total_amount': str(sale.total_amount),
+            'status': sale.status,
+        }
 
     def get(self, request, *args, **kwargs):
-        # Verificar estado de la caja
-        today = datetime.now().date()
-        start_of_day = datetime.combine(today, datetime.min.time())
-        end_of_day = datetime.combine(today, datetime.max.time())
-        
-        cash_movements = CashRegister.objects.filter(
-            date__range=(start_of_day, end_of_day),
-            status=True
-        )
-        
-        is_cash_open = cash_movements.filter(operation_type=CashRegister.CASH_OPEN).exists()
-        is_cash_closed = cash_movements.filter(operation_type=CashRegister.CASH_CLOSE).exists()
-        
-        # Si la caja no está abierta o ya está cerrada, mostrar error
-        if not is_cash_open or is_cash_closed:
+        # Verificar estado de la caja de la sesion
+        if not cash_register_is_open(current_register(request)):
             messages.error(request, '❌ No se puede acceder a las ventas. La caja no está abierta o ya fue cerrada.')
             return redirect('sales:cash_register')
         
         return super().get(request, *args, **kwargs)
 
 @login_required(login_url='/login/')
+@idempotent
 def sale_order_view(request, sale_id=None):
 
-     # Verificar estado de la caja
-    today = datetime.now().date()
-    start_of_day = datetime.combine(today, datetime.min.time())
-    end_of_day = datetime.combine(today, datetime.max.time())
-    
-    cash_movements = CashRegister.objects.filter(
-        date__range=(start_of_day, end_of_day),
-        status=True
-    )
-    
-    is_cash_open = cash_movements.filter(operation_type=CashRegister.CASH_OPEN).exists()
-    is_cash_closed = cash_movements.filter(operation_type=CashRegister.CASH_CLOSE).exists()
-    
+    # Verificar estado de la caja de la sesion
+    register = current_register(request)
     # Si la caja no está abierta o ya está cerrada, mostrar error
-    if not is_cash_open or is_cash_closed:
+    if not cash_register_is_open(register):
         if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
             return JsonResponse({
                 'success': False,
@@ -178,16 +169,15 @@ def sale_order_view(request, sale_id=None):
 
     template_name = "sales/sale.html"
     products = Product.objects.filter(status=True)
-    customers = Customer.objects.filter(status=True)
     sale_form = {}
     context = {}
 
     if request.method =='GET':
         sale_form = SaleForm()
-        header = Sale.objects.filter(pk=sale_id).first() if sale_id else None
+        header = Sale.objects.select_related('customer').filter(pk=sale_id).first() if sale_id else None
 
         if header:
-            sale_item = SaleDetail.objects.filter(sale=header)
+            sale_item = SaleDetail.objects.filter(sale=header).select_related('product')
             e = {
                 'customer': header.customer,
                 'observation': header.observation,
@@ -202,7 +192,11 @@ def sale_order_view(request, sale_id=None):
         else:
             sale_item = None
         
-        context = {'products': products, 'header': header, 'sale_items': sale_item, 'sale_form': sale_form, 'customers': customers}
+        context = {
+            'products': products, 'header': header, 'sale_items': sale_item, 'sale_form': sale_form,
+            # El stock va fuera del fragmento cacheado: cambia con cada venta
+            'product_stock': dict(products.order_by().values_list('id', 'stock')),
+        }
  
 
     if request.method == 'POST':
@@ -215,6 +209,7 @@ def sale_order_view(request, sale_id=None):
             header = Sale(
                 observation=observation,
                 customer=customer_,
+                register=register,
                 created_by=request.user
             )
             if header:
@@ -283,10 +278,14 @@ def sale_order_view(request, sale_id=None):
             if det:
                 det.save()
                 # Recalcular totales
-                sub_total = SaleDetail.objects.filter(sale=sale_id).aggregate(Sum('subtotal'))['subtotal__sum'] or 0
-                discount_total = SaleDetail.objects.filter(sale=sale_id).aggregate(Sum('discount'))['discount__sum'] or 0
-                tax_total = SaleDetail.objects.filter(sale=sale_id).aggregate(Sum('tax'))['tax__sum'] or 0
-                
+                # Solo las lineas activas: las devueltas (status=False) ya no suman
+                totals = SaleDetail.objects.filter(sale=sale_id, status=True).aggregate(
+                    Sum('subtotal'), Sum('discount'), Sum('tax'),
+                )
+                sub_total = totals['subtotal__sum'] or 0
+                discount_total = totals['discount__sum'] or 0
+                tax_total = totals['tax__sum'] or 0
+
                 header.subtotal = sub_total
                 header.discount = discount_total
                 header.tax = tax_total
@@ -326,17 +325,125 @@ def sale_order_view(request, sale_id=None):
 
     return render(request, template_name, context)
 
-class SaleDeleteView(LoginRequiredMixin, AdminRequiredMixin, View):
-    def post(self, request, sale_id, pk):
+async def aupdate_sale_totals(sale_order, items):
+    """Recalcula los totales de la venta con una sola consulta de agregados sobre las lineas activas"""
+    totals = await items.filter(status=True).aaggregate(Sum('subtotal'), Sum('discount'), Sum('tax'))
+    sale_order.subtotal = totals['subtotal__sum'] or 0
+    sale_order.discount = totals['discount__sum'] or 0
+    sale_order.tax = totals['tax__sum'] or 0
+    sale_order.total_amount = sale_order.subtotal - sale_order.discount + sale_order.tax
+    # Sale.save() no acepta argumentos, por eso no se usa asave()
+    await sync_to_async(sale_order.save)()
+
+
+# Clave de sesion con la caja (Register) en la que trabaja el usuario
+REGISTER_SESSION_KEY = 'register_id'
+
+
+def current_register(request):
+    """Caja elegida en la sesion; por defecto la primera caja activa"""
+    registers = Register.objects.filter(status=True)
+    register_id = request.session.get(REGISTER_SESSION_KEY)
+    register = registers.filter(pk=register_id).first() if register_id else None
+    return register or registers.first()
+
+
+async def acurrent_register(request):
+    """Version async de current_register"""
+    registers = Register.objects.filter(status=True)
+    register_id = await request.session.aget(REGISTER_SESSION_KEY)
+    register = await registers.filter(pk=register_id).afirst() if register_id else None
+    return register or await registers.afirst()
+
+
+def cash_register_is_open(register):
+    """Caja abierta hoy y sin cerrar; el estado se lee de la fila de la caja"""
+    return register is not None and register.is_open()
+
+
+class SaleLineAddView(AsyncLoginRequiredMixin, View):
+    """Agrega una linea a una venta existente (endpoint AJAX async de la pantalla de venta)"""
+
+    @method_decorator(idempotent)
+    async def post(self, request, sale_id):
+        if not cash_register_is_open(await acurrent_register(request)):
+            return JsonResponse({
+                'success': False,
+                'error': 'No se puede realizar ventas. La caja no está abierta o ya fue cerrada.'
+            }, status=403)
+
+        header = await Sale.objects.select_related('customer').filter(pk=sale_id).afirst()
+        if not header:
+            return JsonResponse({'success': False, 'error': 'Venta no encontrada'}, status=404)
+
+        user = await request.auser()
+        header.observation = request.POST.get("observation")
+        header.modified_by = user.id
+
+        product = request.POST.get("id_id_producto")
+        quantity = request.POST.get("id_cantidad_detalle")
+        price = request.POST.get("id_precio_detalle")
+        subtotal = request.POST.get("id_sub_total_detalle")
+        discount = request.POST.get("id_descuento_detalle")
+        tax = request.POST.get("id_impuesto")
+        total_amount = request.POST.get("id_total_detalle")
+
+        if not all([product, quantity, price, subtotal, total_amount]):
+            await sync_to_async(header.save)()
+            return JsonResponse({
+                'success': False,
+                'error': 'Faltan campos requeridos'
+            })
+
+        try:
+            prod = await Product.objects.aget(pk=product)
+
+            det = SaleDetail(
+                sale=header,
+                product=prod,
+                quantity=quantity,
+                unit_price=price,
+                discount=discount or 0,
+                subtotal=subtotal,
+                tax=tax or 0,
+                total_price=total_amount,
+                created_by=user
+            )
+            # SaleDetail.save() y su señal de stock son sincronos
+            await sync_to_async(det.save)()
+            await aupdate_sale_totals(header, SaleDetail.objects.filter(sale=sale_id))
+
+            return JsonResponse({
+                'success': True,
+                'message': 'Producto agregado correctamente',
+                'updated_totals': {
+                    'subtotal': str(header.subtotal),
+                    'discount': str(header.discount),
+                    'tax': str(header.tax),
+                    'total_amount': str(header.total_amount),
+                }
+            })
+
+        except Product.DoesNotExist:
+            error_msg = 'Producto no encontrado'
+        except Exception as e:
+            error_msg = f'Error al guardar: {str(e)}'
+
+        return JsonResponse({
+            'success': False,
+            'error': error_msg
+        })
+
+
+class SaleDeleteView(AsyncAdminRequiredMixin, View):
+    async def post(self, request, sale_id, pk):
         try:
-            sale_item = SaleDetail.objects.get(pk=pk, sale_id=sale_id)
+            sale_item = await SaleDetail.objects.select_related('sale').aget(pk=pk, sale_id=sale_id)
             sale_order = sale_item.sale
             
-            # Eliminar el item
-            sale_item.delete()
-            
-            # Recalcular totales
-            self.update_sale_totals(sale_order)
+            # Eliminar el item; update_sale_delete devuelve el stock y recalcula la venta
+            await sale_item.adelete()
+            await sale_order.arefresh_from_db()
             
             # Devolver respuesta JSON para AJAX
             return JsonResponse({
@@ -360,70 +467,56 @@ class SaleDeleteView(LoginRequiredMixin, AdminRequiredMixin, View):
                 'success': False,
                 'error': str(e)
             }, status=500)
-    
-    def update_sale_totals(self, sale_order):
-        """Recalcular totales después de eliminar un item"""
-        items = SaleDetail.objects.filter(sale=sale_order)
-        
-        subtotal = items.aggregate(Sum('subtotal'))['subtotal__sum'] or 0
-        discount = items.aggregate(Sum('discount'))['discount__sum'] or 0
-        tax = items.aggregate(Sum('tax'))['tax__sum'] or 0
-        
-        sale_order.subtotal = subtotal
-        sale_order.discount = discount
-        sale_order.tax = tax
-        sale_order.total_amount = subtotal - discount + tax
-        sale_order.save()
+
+
+def authorize_return(request, data):
+    """Usuario administrador que autoriza la devolucion con su contraseña, o None"""
+    user = authenticate(username=request.user.username, password=data.get('admin_password'))
+    if not user or not user.is_staff:
+        return None
+    return user
+
+
+def sale_totals_json(sale_order):
+    return {
+        'subtotal': str(sale_order.subtotal),
+        'discount': str(sale_order.discount),
+        'tax': str(sale_order.tax),
+        'total_amount': str(sale_order.total_amount),
+    }
 
 
 class SaleAnularView(LoginRequiredMixin, View):
     def post(self, request, sale_id, pk):
         try:
             data = json.loads(request.body)
-            admin_password = data.get('admin_password')
             
             # Verificar contraseña de administrador
-            user = authenticate(username=request.user.username, password=admin_password)
-            if not user or not user.is_staff:
+            user = authorize_return(request, data)
+            if not user:
                 return JsonResponse({
                     'success': False,
                     'error': 'Contraseña de administrador incorrecta o usuario no tiene permisos'
                 }, status=403)
             
-            with transaction.atomic():
-                sale_item = SaleDetail.objects.get(pk=pk, sale_id=sale_id)
-                sale_order = sale_item.sale
-                
-                # Verificar que el item no esté ya anulado
-                if not sale_item.status:
-                    return JsonResponse({
-                        'success': False,
-                        'error': 'Este item ya está anulado'
-                    })
-                
-                # Anular el item (cambiar status a False)
-                sale_item.status = False
-                sale_item.modified_by = request.user.id  # ← CORREGIDO: usar ID en lugar de instancia
-                sale_item.save()
-                
-                # Devolver el producto al inventario
-                product = sale_item.product
-                product.stock += sale_item.quantity
-                product.save()
-                
-                # Recalcular totales de la factura
-                self.update_sale_totals(sale_order)
-                
+            sale_item = SaleDetail.objects.select_related('sale').get(pk=pk, sale_id=sale_id)
+            
+            # Verificar que el item no esté ya anulado
+            if not sale_item.status:
                 return JsonResponse({
-                    'success': True,
-                    'message': 'Item anulado correctamente',
-                    'updated_totals': {
-                        'subtotal': str(sale_order.subtotal),
-                        'discount': str(sale_order.discount),
-                        'tax': str(sale_order.tax),
-                        'total_amount': str(sale_order.total_amount),
-                    }
+                    'success': False,
+                    'error': 'Este item ya está anulado'
                 })
+            
+            # Anula el item, devuelve el producto al inventario y recalcula la factura
+            sale_order = sale_item.sale
+            return_sale_lines(sale_order, user, [sale_item.pk], data.get('reason'))
+            
+            return JsonResponse({
+                'success': True,
+                'message': 'Item anulado correctamente',
+                'updated_totals': sale_totals_json(sale_order),
+            })
                 
         except SaleDetail.DoesNotExist:
             return JsonResponse({
@@ -435,95 +528,164 @@ class SaleAnularView(LoginRequiredMixin, View):
                 'success': False,
                 'error': str(e)
             }, status=500)
-    
-    def update_sale_totals(self, sale_order):
-        """Recalcular totales considerando solo items activos"""
-        items = SaleDetail.objects.filter(sale=sale_order, status=True)
-        
-        subtotal = items.aggregate(Sum('subtotal'))['subtotal__sum'] or 0
-        discount = items.aggregate(Sum('discount'))['discount__sum'] or 0
-        tax = items.aggregate(Sum('tax'))['tax__sum'] or 0
-        
-        sale_order.subtotal = subtotal
-        sale_order.discount = discount
-        sale_order.tax = tax
-        sale_order.total_amount = subtotal - discount + tax
-        sale_order.save()
 
 
-def get_customers_json(request):
-    customers = Customer.objects.filter(status=True).values('id', 'name', 'last_name', 'dni')
-    
-    # Formatear los datos para el select
-    customers_list = []
-    for customer in customers:
-        customers_list.append({
+class SaleReturnView(LoginRequiredMixin, View):
+    """
+    Devolucion de varias lineas o de la factura completa con una sola
+    autorizacion. Recibe {admin_password, items: [ids], reason}; sin items se
+    devuelven todas las lineas activas.
+    """
+
+    def post(self, request, sale_id):
+        try:
+            data = json.loads(request.body)
+        except ValueError:
+            return JsonResponse({'success': False, 'error': 'Datos invalidos'}, status=400)
+
+        user = authorize_return(request, data)
+        if not user:
+            return JsonResponse({
+                'success': False,
+                'error': 'Contraseña de administrador incorrecta o usuario no tiene permisos'
+            }, status=403)
+
+        sale_order = Sale.objects.filter(pk=sale_id).first()
+        if sale_order is None:
+            return JsonResponse({'success': False, 'error': 'Venta no encontrada'}, status=404)
+
+        items = data.get('items')
+        if items is not None:
+            try:
+                items = [int(item) for item in items]
+            except (TypeError, ValueError):
+                return JsonResponse({'success': False, 'error': 'Items invalidos'}, status=400)
+
+        try:
+            sale_return, returned = return_sale_lines(sale_order, user, items, data.get('reason'))
+        except ValueError as e:
+            return JsonResponse({'success': False, 'error': str(e)}, status=400)
+
+        return JsonResponse({
+            'success': True,
+            'message': f'Devolucion {sale_return.number} registrada',
+            'return_number': sale_return.number,
+            'returned_items': returned,
+            'updated_totals': sale_totals_json(sale_order),
+        })
+
+
+CUSTOMER_SEARCH_LIMIT = 20
+
+
+class CustomerSearchView(AsyncLoginRequiredMixin, View):
+    """Busqueda paginada de clientes para los select2 (q, page): solo nombre y DNI"""
+
+    async def get(self, request, *args, **kwargs):
+        term = request.GET.get('q', '').strip()
+        try:
+            page = max(int(request.GET.get('page', 1)), 1)
+        except ValueError:
+            page = 1
+
+        offset = (page - 1) * CUSTOMER_SEARCH_LIMIT
+        # Se pide un registro de mas para saber si hay otra pagina sin hacer COUNT
+        customers = Customer.search(term).values('id', 'name', 'last_name', 'dni')[
+            offset:offset + CUSTOMER_SEARCH_LIMIT + 1
+        ]
+
+        customers_list = [
+            {
+                'id': customer['id'],
+                'full_name': f"{customer['name']} {customer['last_name']}",
+                'dni': customer['dni'],
+            }
+            async for customer in customers
+        ]
+
+        return JsonResponse({
+            'customers': customers_list[:CUSTOMER_SEARCH_LIMIT],
+            'more': len(customers_list) > CUSTOMER_SEARCH_LIMIT,
+        })
+
+
+class CustomerDetailView(AsyncLoginRequiredMixin, View):
+    """Datos de contacto de un cliente (presupuestos)"""
+
+    async def get(self, request, pk, *args, **kwargs):
+        customer = await Customer.objects.filter(pk=pk).values(
+            'id', 'name', 'last_name', 'dni', 'phone', 'email', 'address'
+        ).afirst()
+        if customer is None:
+            return JsonResponse({'success': False, 'error': 'Cliente no encontrado'}, status=404)
+        return JsonResponse({
             'id': customer['id'],
             'full_name': f"{customer['name']} {customer['last_name']}",
-            'dni': customer['dni']
+            'dni': customer['dni'],
+            'phone': customer['phone'] or '',
+            'email': customer['email'] or '',
+            'address': customer['address'] or '',
         })
-    
-    return JsonResponse({'customers': customers_list})
+
+@login_required(login_url='/login/')
+def till_view(request):
+    """Caja con cola local: sigue vendiendo sin conexion y sincroniza por lotes"""
+    return render(request, 'sales/till.html', {'max_batch_sales': MAX_BATCH_SALES})
+
+
+@login_required(login_url='/login/')
+@require_POST
+@idempotent
+def till_sync(request):
+    """Recibe un lote de ventas de la cola local: {"sales": [...]}"""
+    register = current_register(request)
+    if not cash_register_is_open(register):
+        return JsonResponse({
+            'success': False,
+            'error': 'No se puede realizar ventas. La caja no está abierta o ya fue cerrada.'
+        }, status=403)
+
+    try:
+        entries = json.loads(request.body)['sales']
+    except (ValueError, KeyError, TypeError):
+        return JsonResponse({'success': False, 'error': 'Lote invalido'}, status=400)
+    if not isinstance(entries, list) or not all(isinstance(e, dict) for e in entries):
+        return JsonResponse({'success': False, 'error': 'Lote invalido'}, status=400)
+    if len(entries) > MAX_BATCH_SALES:
+        return JsonResponse({'success': False, 'error': f'Maximo {MAX_BATCH_SALES} ventas por lote'}, status=400)
+
+    created, errors = sync_sales(entries, request.user, register)
+    return JsonResponse({'success': True, 'created': created, 'errors': errors})
+
 
 class CashRegisterView(LoginRequiredMixin, View):
     def get(self, request):
-        # Usar datetime.now() para obtener la fecha local correcta
-        today = datetime.now().date()
-        
-        # Obtener el inicio y fin del día para filtrar correctamente
-        start_of_day = datetime.combine(today, datetime.min.time())
-        end_of_day = datetime.combine(today, datetime.max.time())
-        
-        # Filtrar movimientos del día actual
-        cash_movements = CashRegister.objects.filter(
-            date__range=(start_of_day, end_of_day),
-            status=True
-        ).order_by('-date')
-        
-        # Obtener el saldo actual (último movimiento)
-        last_movement = cash_movements.first()
-        current_balance = last_movement.current_balance if last_movement else 0
-        
-        # Obtener saldo de apertura si existe
-        opening_record = cash_movements.filter(operation_type=CashRegister.CASH_OPEN).first()
-        opening_balance = opening_record.amount if opening_record else 0
-        
-        # Verificar si ya hay caja abierta hoy
-        is_cash_open = cash_movements.filter(
-            operation_type=CashRegister.CASH_OPEN
-        ).exists()
-        
-        # Verificar si ya hay caja cerrada hoy
-        is_cash_closed = cash_movements.filter(
-            operation_type=CashRegister.CASH_CLOSE
-        ).exists()
-        
-        # DEBUG: Información para diagnóstico
-        print(f"DEBUG - Fecha: {today}")
-        print(f"DEBUG - Rango: {start_of_day} a {end_of_day}")
-        print(f"DEBUG - Movimientos: {cash_movements.count()}")
-        print(f"DEBUG - Aperturas encontradas: {cash_movements.filter(operation_type=CashRegister.CASH_OPEN).count()}")
-        print(f"DEBUG - Cierres encontrados: {cash_movements.filter(operation_type=CashRegister.CASH_CLOSE).count()}")
-        print(f"DEBUG - is_cash_open: {is_cash_open}")
-        print(f"DEBUG - is_cash_closed: {is_cash_closed}")
-        
-        form = CashRegisterForm()
-        
-        context = {
-            'cash_movements': cash_movements,
-            'current_balance': current_balance,
-            'opening_balance': opening_balance,
-            'today': today,
-            'form': form,
-            'is_cash_open': is_cash_open,
-            'is_cash_closed': is_cash_closed,
-        }
-        return render(request, 'sales/cash_register.html', context)
-    
+        # ?register=<id> cambia la caja de la sesion
+        register_id = request.GET.get('register')
+        if register_id:
+            register = Register.objects.filter(pk=register_id, status=True).first()
+            if register:
+                request.session[REGISTER_SESSION_KEY] = register.id
+            else:
+                messages.error(request, 'Caja no encontrada.')
+            return redirect('sales:cash_register')
+
+        register = current_register(request)
+        if register is None:
+            # Primera vez: se crea la caja por defecto
+            register, _ = Register.objects.get_or_create(name='Caja 1', defaults={'created_by': request.user})
+        return render(request, 'sales/cash_register.html', self.get_context(request, register, CashRegisterForm()))
+
     def post(self, request):
+        register = current_register(request)
+        if register is None:
+            messages.error(request, 'No hay caja seleccionada.')
+            return redirect('sales:cash_register')
+
         form = CashRegisterForm(request.POST)
         if form.is_valid():
             cash_register = form.save(commit=False)
+            cash_register.register = register
             cash_register.user = request.user
             cash_register.created_by = request.user
             cash_register.save()
@@ -532,41 +694,47 @@ class CashRegisterView(LoginRequiredMixin, View):
             return redirect('sales:cash_register')
         
         # Si el formulario no es válido, recargar la página con errores
-        today = datetime.now().date()
-        
-        # Obtener el inicio y fin del día para filtrar correctamente
-        start_of_day = datetime.combine(today, datetime.min.time())
-        end_of_day = datetime.combine(today, datetime.max.time())
-        
-        cash_movements = CashRegister.objects.filter(
-            date__range=(start_of_day, end_of_day),
-            status=True
-        ).order_by('-date')
+        return render(request, 'sales/cash_register.html', self.get_context(request, register, form))
+
+    def get_context(self, request, register, form):
+        today = timezone.localdate()
         
-        last_movement = cash_movements.first()
-        current_balance = last_movement.current_balance if last_movement else 0
+        # Movimientos del día de la caja seleccionada
+        cash_movements = register.movements.filter(business_day=today, status=True).order_by('-date')
         
+        # Obtener saldo de apertura si existe
         opening_record = cash_movements.filter(operation_type=CashRegister.CASH_OPEN).first()
         opening_balance = opening_record.amount if opening_record else 0
         
-        is_cash_open = cash_movements.filter(
-            operation_type=CashRegister.CASH_OPEN
-        ).exists()
-        
-        is_cash_closed = cash_movements.filter(
-            operation_type=CashRegister.CASH_CLOSE
-        ).exists()
-        
-        context = {
+        return {
+            'registers': Register.objects.filter(status=True),
+            'register': register,
+            'is_admin': request.user.groups.filter(name='Admin').exists(),
             'cash_movements': cash_movements,
-            'current_balance': current_balance,
+            'current_balance': register.balance,
             'opening_balance': opening_balance,
             'today': today,
             'form': form,
-            'is_cash_open': is_cash_open,
-            'is_cash_closed': is_cash_closed,
+            'is_cash_open': register.is_open(),
+            'is_cash_closed': register.is_closed_today(),
         }
-        return render(request, 'sales/cash_register.html', context)
+
+
+class RegisterCreateView(LoginRequiredMixin, AdminRequiredMixin, View):
+    """Alta de una caja (terminal) nueva; queda seleccionada en la sesion"""
+
+    def post(self, request):
+        name = (request.POST.get('name') or '').strip()
+        if not name:
+            messages.error(request, 'El nombre de la caja es requerido.')
+        elif Register.objects.filter(name__iexact=name).exists():
+            messages.error(request, f'Ya existe una caja llamada {name}.')
+        else:
+            register = Register.objects.create(name=name, created_by=request.user)
+            request.session[REGISTER_SESSION_KEY] = register.id
+            messages.success(request, f'Caja {name} creada.')
+        return redirect('sales:cash_register')
+
 
 class OpenCashRegisterView(LoginRequiredMixin, View):
     def post(self, request):
@@ -581,42 +749,34 @@ class OpenCashRegisterView(LoginRequiredMixin, View):
             amount = Decimal(amount)
             if amount < 0:
                 raise ValueError("El monto no puede ser negativo")
-                
-            # Verificar si ya hay una caja abierta hoy
-            today = datetime.now().date()
-            existing_open = CashRegister.objects.filter(
-                date__date=today,
-                operation_type=CashRegister.CASH_OPEN,
-                status=True
-            ).exists()
-            
-            if existing_open:
-                messages.warning(request, 'Ya existe una apertura de caja para hoy.')
-                return redirect('sales:cash_register')
-            
-            # Verificar si ya hay caja cerrada hoy
-            existing_closed = CashRegister.objects.filter(
-                date__date=today,
-                operation_type=CashRegister.CASH_CLOSE,
-                status=True
-            ).exists()
-            
-            if existing_closed:
-                messages.warning(request, 'La caja ya fue cerrada hoy. No se puede abrir nuevamente.')
+
+            register = current_register(request)
+            if register is None:
+                messages.error(request, 'No hay caja seleccionada.')
                 return redirect('sales:cash_register')
+
+            with transaction.atomic():
+                # El estado se verifica con la caja bloqueada
+                register = Register.objects.select_for_update().get(pk=register.pk)
+                if register.is_open():
+                    messages.warning(request, f'{register.name} ya fue abierta hoy.')
+                    return redirect('sales:cash_register')
+                if register.is_closed_today():
+                    messages.warning(request, f'{register.name} ya fue cerrada hoy. No se puede abrir nuevamente.')
+                    return redirect('sales:cash_register')
+
+                # Crear registro de apertura con el usuario
+                cash_register = CashRegister(
+                    register=register,
+                    operation_type=CashRegister.CASH_OPEN,
+                    amount=amount,
+                    user=request.user,
+                    description=description,
+                )
+                cash_register.created_by = request.user
+                cash_register.save()
             
-            # Crear registro de apertura con el usuario
-            cash_register = CashRegister(
-                operation_type=CashRegister.CASH_OPEN,
-                amount=amount,
-                user=request.user,
-                description=description,
-            )
-            
-            cash_register.created_by = request.user
-            cash_register.save()
-            
-            messages.success(request, f'Caja abierta con ${amount:.2f}')
+            messages.success(request, f'{register.name} abierta con ${amount:.2f}')
             
         except (ValueError, InvalidOperation) as e:
             messages.error(request, f'Error al abrir caja: {str(e)}')
@@ -625,47 +785,42 @@ class OpenCashRegisterView(LoginRequiredMixin, View):
 
 class CloseCashRegisterView(LoginRequiredMixin, View):
     def post(self, request):
-        today = datetime.now().date()
-        
-        # Obtener el inicio y fin del día para filtrar correctamente
-        start_of_day = datetime.combine(today, datetime.min.time())
-        end_of_day = datetime.combine(today, datetime.max.time())
-        
-        # Obtener el saldo actual
-        last_movement = CashRegister.objects.filter(
-            date__range=(start_of_day, end_of_day),
-            status=True
-        ).order_by('-date').first()
-        
-        if not last_movement:
+        register = current_register(request)
+        if register is None:
             messages.error(request, 'No hay caja abierta para cerrar.')
             return redirect('sales:cash_register')
+
+        with transaction.atomic():
+            register = Register.objects.select_for_update().get(pk=register.pk)
+            if not register.is_open():
+                messages.error(request, 'No hay caja abierta para cerrar.')
+                return redirect('sales:cash_register')
+
+            current_balance = register.balance
+
+            # Crear registro de cierre
+            cash_register = CashRegister(
+                register=register,
+                operation_type=CashRegister.CASH_CLOSE,
+                amount=current_balance,
+                user=request.user,
+                description='Cierre de caja diario',
+            )
+            cash_register.created_by = request.user
+            cash_register.save()
+            # Informe del dia precalculado para reportes y reimpresiones
+            schedule_day_close(timezone.localdate(), request.user)
         
-        current_balance = last_movement.current_balance
-        
-        # Crear registro de cierre
-        cash_register = CashRegister(
-            operation_type=CashRegister.CASH_CLOSE,
-            amount=current_balance,
-            user=request.user,
-            description='Cierre de caja diario',
-        )
-        
-        cash_register.created_by = request.user
-        cash_register.save()
-        
-        messages.success(request, f'Caja cerrada. Saldo final: ${current_balance:.2f}')
+        messages.success(request, f'{register.name} cerrada. Saldo final: ${current_balance:.2f}')
         return redirect('sales:cash_register')
     
 class BudgetCreateView(LoginRequiredMixin, View):
     def get(self, request):
         template_name = "sales/budget.html"
         products = Product.objects.filter(status=True)
-        customers = Customer.objects.filter(status=True)
         
         context = {
             'products': products,
-            'customers': customers,
         }
         return render(request, template_name, context)
 
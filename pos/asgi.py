@@ -5,6 +5,26 @@ It exposes the ASGI callable as a module-level variable named ``application``.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
+
+Despliegue ASGI
+---------------
+Los endpoints AJAX de alta frecuencia (clientes, busqueda de productos,
+cambios de estado y lineas de venta) son vistas async; bajo ASGI un worker
+atiende muchas de esas peticiones pequeñas de forma concurrente. Las vistas
+sincronas siguen funcionando igual (Django las ejecuta en un hilo).
+
+    pip install uvicorn          # o daphne
+    uvicorn pos.asgi:application --host 0.0.0.0 --port 8000 --workers 4
+    daphne -b 0.0.0.0 -p 8000 pos.asgi:application
+
+Los archivos estaticos se sirven aparte (collectstatic + nginx/whitenoise).
+
+Comparar contra WSGI con el mismo numero de workers y la misma cookie de
+sesion (copiada del navegador):
+
+    gunicorn pos.wsgi:application --workers 4 --bind 0.0.0.0:8001
+    python manage.py benchmark_http http://127.0.0.1:8000/sales/sales/get_customers/ --session <id>
+    python manage.py benchmark_http http://127.0.0.1:8001/sales/sales/get_customers/ --session <id>
 """
 
 import os
@@ -14,3 +34,15 @@ from django.core.asgi import get_asgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'pos.settings')
 
 application = get_asgi_application()
+
+from django.conf import settings  # noqa: E402
+
+if settings.TEMPLATE_WARMUP:
+    # Cada worker compila las plantillas antes de atender peticiones
+    # (con gunicorn --preload se hace una vez y los workers la heredan)
+    from applications.home.warmup import warm_templates  # noqa: E402
+    warm_templates()
+
+if settings.PDF_WARMUP:
+    from applications.home.warmup import warm_pdf_backend  # noqa: E402
+    warm_pdf_backend()
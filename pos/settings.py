@@ -12,7 +12,7 @@ https://docs.djangoproject.com/en/5.2/ref/settings/
 
 from pathlib import Path
 import os
-from decouple import config
+from decouple import config, Csv
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -25,9 +25,10 @@ BASE_DIR = Path(__file__).resolve().parent.parent
 SECRET_KEY = config('SECRET_KEY')
 
 # SECURITY WARNING: don't run with debug turned on in production!
-DEBUG = True
+# En produccion: DEBUG=False y ALLOWED_HOSTS=pos.midominio.com en el entorno/.env
+DEBUG = config('DEBUG', default=True, cast=bool)
 
-ALLOWED_HOSTS = []
+ALLOWED_HOSTS = config('ALLOWED_HOSTS', default='', cast=Csv())
 
 
 # Application definition
@@ -37,7 +38,8 @@ BASE_APPS = ['django.contrib.admin',
     'django.contrib.contenttypes',
     'django.contrib.sessions',
     'django.contrib.messages',
-    'django.contrib.staticfiles',]
+    'django.contrib.staticfiles',
+    'django.contrib.postgres',]
 
 THIRD_APPS = []
 
@@ -59,6 +61,7 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'applications.home.replica.ReplicaPinMiddleware',
 ]
 
 ROOT_URLCONF = 'pos.urls'
@@ -79,6 +82,46 @@ TEMPLATES = [
     },
 ]
 
+if not DEBUG:
+    # Produccion: las plantillas se compilan una vez por proceso y no se revisan en disco
+    TEMPLATES[0]['APP_DIRS'] = False
+    TEMPLATES[0]['OPTIONS']['loaders'] = [
+        ('django.template.loaders.cached.Loader', [
+            'django.template.loaders.filesystem.Loader',
+            'django.template.loaders.app_directories.Loader',
+        ]),
+    ]
+
+# Compilar todas las plantillas al arrancar el proceso (pos/wsgi.py, pos/asgi.py)
+TEMPLATE_WARMUP = config('TEMPLATE_WARMUP', default=not DEBUG, cast=bool)
+
+# Motor de PDF (applications/home/pdf.py): 'xhtml2pdf', 'weasyprint' o ruta a una subclase de PdfBackend
+PDF_BACKEND = config('PDF_BACKEND', default='xhtml2pdf')
+
+# Cargar el motor de PDF y sus fuentes al arrancar, fuera del camino del cobro.
+# Por defecto se carga con el primer PDF: precargarlo suma su memoria a cada
+# worker; activarlo solo con gunicorn --preload (los workers lo comparten)
+PDF_WARMUP = config('PDF_WARMUP', default=False, cast=bool)
+
+# Tickets termicos (applications/sales/receipt.py): columnas del rollo de 80mm
+# e impresora como 'host:puerto' o ruta de dispositivo/archivo
+RECEIPT_WIDTH = config('RECEIPT_WIDTH', default=48, cast=int)
+RECEIPT_PRINTER = config('RECEIPT_PRINTER', default='')
+
+# Segundos que se guarda la respuesta de una venta enviada con Idempotency-Key
+IDEMPOTENCY_KEY_TTL = config('IDEMPOTENCY_KEY_TTL', default=3600, cast=int)
+
+# Meses cerrados que se mantienen en las tablas activas de ventas y caja;
+# los anteriores se mueven al archivo con manage.py archive_sales
+ARCHIVE_KEEP_MONTHS = config('ARCHIVE_KEEP_MONTHS', default=12, cast=int)
+
+# Costo copiado a cada linea de venta para calcular margenes: 'average'
+# (costo promedio ponderado) o 'last' (ultimo precio de compra)
+SALE_COST_METHOD = config('SALE_COST_METHOD', default='average')
+
+# Cierre del dia (applications/sales/closing.py) en un hilo aparte al cerrar una caja
+DAY_CLOSE_ASYNC = config('DAY_CLOSE_ASYNC', default=True, cast=bool)
+
 WSGI_APPLICATION = 'pos.wsgi.application'
 
 
@@ -96,6 +139,40 @@ DATABASES = {
     }
 }
 
+# Replica de solo lectura opcional para reportes, dashboard y listados
+# (applications/home/replica.py); las ventas siempre usan la principal
+REPLICA_DB_NAME = config('REPLICA_DB_NAME', default='')
+if REPLICA_DB_NAME:
+    DATABASES['replica'] = {
+        **DATABASES['default'],
+        'NAME': REPLICA_DB_NAME,
+        'HOST': config('REPLICA_DB_HOST', default='localhost'),
+        'PORT': config('REPLICA_DB_PORT', default=5432, cast=int),
+        'TEST': {'MIRROR': 'default'},
+    }
+
+DATABASE_ROUTERS = ['applications.home.replica.ReplicaRouter']
+
+# Segundos de retraso tolerados antes de volver a leer de la principal
+REPLICA_MAX_LAG = config('REPLICA_MAX_LAG', default=5, cast=float)
+# Segundos que un usuario lee de la principal despues de escribir
+REPLICA_PIN_SECONDS = config('REPLICA_PIN_SECONDS', default=15, cast=int)
+
+# Cache
+# Los fragmentos del catalogo y el menu se versionan (applications/home/cache.py);
+# con varios procesos conviene una cache compartida (Redis o Memcached)
+
+CACHES = {
+    'default': {
+        'BACKEND': config('CACHE_BACKEND', default='django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': config('CACHE_LOCATION', default='pos-cache'),
+    }
+}
+
+# Parte de la clave de los fragmentos cacheados ({% cache_version %}): subirla
+# en cada despliegue que cambie sus plantillas para no servir el HTML anterior
+TEMPLATE_CACHE_VERSION = config('TEMPLATE_CACHE_VERSION', default='1')
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -140,3 +217,9 @@ MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
+
+# Puntos de reorden (python manage.py compute_reorder_points)
+REORDER_VELOCITY_DAYS = config('REORDER_VELOCITY_DAYS', default=30, cast=int)
+REORDER_SAFETY_DAYS = config('REORDER_SAFETY_DAYS', default=7, cast=int)
+REORDER_COVER_DAYS = config('REORDER_COVER_DAYS', default=30, cast=int)
+REORDER_DEFAULT_LEAD_TIME_DAYS = config('REORDER_DEFAULT_LEAD_TIME_DAYS', default=7, cast=int)
@@ -14,3 +14,15 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'pos.settings')
 
 application = get_wsgi_application()
+
+from django.conf import settings  # noqa: E402
+
+if settings.TEMPLATE_WARMUP:
+    # Cada worker compila las plantillas antes de atender peticiones
+    # (con gunicorn --preload se hace una vez y los workers la heredan)
+    from applications.home.warmup import warm_templates  # noqa: E402
+    warm_templates()
+
+if settings.PDF_WARMUP:
+    from applications.home.warmup import warm_pdf_backend  # noqa: E402
+    warm_pdf_backend()